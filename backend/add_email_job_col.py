@@ -0,0 +1,24 @@
+from database import SessionLocal, engine
+from sqlalchemy import text
+import models
+
+def add_column():
+    models.Base.metadata.create_all(bind=engine, tables=[models.EmailJob.__table__])
+    db = SessionLocal()
+    try:
+        try:
+            db.execute(text("ALTER TABLE email_outbox ADD COLUMN job_id VARCHAR(32) REFERENCES email_jobs(id)"))
+            db.commit()
+            print("Added job_id column")
+        except Exception as e:
+            print(f"job_id error (maybe exists): {e}")
+            db.rollback()
+
+        db.execute(text("CREATE INDEX IF NOT EXISTS ix_email_outbox_job_id ON email_outbox (job_id)"))
+        db.commit()
+        print("Migration complete")
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    add_column()
@@ -0,0 +1,32 @@
+from database import SessionLocal, engine
+from sqlalchemy import text
+import reconcile_event_counters
+
+def add_columns():
+    db = SessionLocal()
+    try:
+        for column in ["pending_count", "registrations_count", "feedback_count", "rating_sum"]:
+            try:
+                db.execute(text(f"ALTER TABLE events ADD COLUMN {column} INTEGER DEFAULT 0"))
+                db.commit()
+                print(f"Added {column} column")
+            except Exception as e:
+                print(f"{column} error (maybe exists): {e}")
+                db.rollback()
+
+        try:
+            db.execute(text("CREATE INDEX IF NOT EXISTS ix_events_listing ON events (position, date_time DESC, id DESC)"))
+            db.commit()
+            print("Created ix_events_listing index")
+        except Exception as e:
+            print(f"Index error: {e}")
+            db.rollback()
+    finally:
+        db.close()
+
+    # Backfill every counter from the registrations table
+    reconcile_event_counters.reconcile()
+    print("Migration complete")
+
+if __name__ == "__main__":
+    add_columns()
@@ -0,0 +1,11 @@
+from database import engine
+from sqlalchemy import text
+
+def add_index():
+    with engine.connect() as conn:
+        conn.execute(text("CREATE INDEX IF NOT EXISTS ix_events_feedback_due ON events (feedback_email_sent, end_date_time)"))
+        conn.commit()
+        print("Created ix_events_feedback_due")
+
+if __name__ == "__main__":
+    add_index()
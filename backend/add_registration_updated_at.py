@@ -0,0 +1,23 @@
+from database import SessionLocal
+from sqlalchemy import text
+
+def add_column():
+    db = SessionLocal()
+    try:
+        try:
+            db.execute(text("ALTER TABLE registrations ADD COLUMN updated_at TIMESTAMP"))
+            db.commit()
+            print("Added updated_at column")
+        except Exception as e:
+            print(f"updated_at error (maybe exists): {e}")
+            db.rollback()
+
+        db.execute(text("UPDATE registrations SET updated_at = created_at WHERE updated_at IS NULL"))
+        db.execute(text("CREATE INDEX IF NOT EXISTS ix_registrations_updated_at ON registrations (updated_at)"))
+        db.commit()
+        print("Migration complete: run `python rollups.py --rebuild` to fill daily_rollups")
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    add_column()
@@ -0,0 +1,22 @@
+from database import SessionLocal
+from sqlalchemy import text
+
+def add_column():
+    db = SessionLocal()
+    try:
+        try:
+            db.execute(text("ALTER TABLE resume_blobs ADD COLUMN referenced_at TIMESTAMP"))
+            db.commit()
+            print("Added referenced_at column")
+        except Exception as e:
+            print(f"referenced_at error (maybe exists): {e}")
+            db.rollback()
+
+        db.execute(text("UPDATE resume_blobs SET referenced_at = created_at WHERE referenced_at IS NULL"))
+        db.commit()
+        print("Migration complete")
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    add_column()
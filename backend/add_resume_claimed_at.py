@@ -0,0 +1,20 @@
+from database import SessionLocal
+from sqlalchemy import text
+
+def add_column():
+    db = SessionLocal()
+    try:
+        try:
+            db.execute(text("ALTER TABLE resumes ADD COLUMN extraction_claimed_at TIMESTAMP"))
+            db.commit()
+            print("Added extraction_claimed_at column")
+        except Exception as e:
+            print(f"extraction_claimed_at error (maybe exists): {e}")
+            db.rollback()
+        # Existing "processing" rows have no claim time, so the worker's next sweep releases them
+        print("Migration complete")
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    add_column()
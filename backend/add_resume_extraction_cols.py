@@ -0,0 +1,34 @@
+from database import SessionLocal, engine
+from sqlalchemy import text
+
+COLUMNS = [
+    ("extraction_status", "VARCHAR DEFAULT 'pending'"),
+    ("extraction_attempts", "INTEGER DEFAULT 0"),
+    ("extraction_error", "TEXT"),
+    ("extracted_at", "TIMESTAMP"),
+    ("page_count", "INTEGER"),
+]
+
+def add_columns():
+    db = SessionLocal()
+    try:
+        for column, ddl in COLUMNS:
+            try:
+                db.execute(text(f"ALTER TABLE resumes ADD COLUMN {column} {ddl}"))
+                db.commit()
+                print(f"Added {column} column")
+            except Exception as e:
+                print(f"{column} error (maybe exists): {e}")
+                db.rollback()
+
+        # Resumes that already have text don't need another pass
+        db.execute(text("UPDATE resumes SET extraction_status = 'done' WHERE content_text IS NOT NULL"))
+        db.execute(text("UPDATE resumes SET extraction_status = 'pending' WHERE content_text IS NULL"))
+        db.execute(text("CREATE INDEX IF NOT EXISTS ix_resumes_extraction_status ON resumes (extraction_status)"))
+        db.commit()
+        print("Migration complete (run extract_resumes.py to backfill pending resumes)")
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    add_columns()
@@ -0,0 +1,45 @@
+import os
+from database import SessionLocal
+from sqlalchemy import text
+from resume_storage import hash_file
+
+COLUMNS = [
+    ("sha256", "VARCHAR(64)"),
+    ("size_bytes", "INTEGER"),
+]
+
+def add_columns():
+    db = SessionLocal()
+    try:
+        for column, ddl in COLUMNS:
+            try:
+                db.execute(text(f"ALTER TABLE resumes ADD COLUMN {column} {ddl}"))
+                db.commit()
+                print(f"Added {column} column")
+            except Exception as e:
+                print(f"{column} error (maybe exists): {e}")
+                db.rollback()
+
+        db.execute(text("CREATE INDEX IF NOT EXISTS ix_resumes_sha256 ON resumes (sha256)"))
+        db.commit()
+
+        # Backfill hashes for files uploaded before hashing existed
+        rows = db.execute(text("SELECT id, file_path FROM resumes WHERE sha256 IS NULL")).fetchall()
+        hashed = missing = 0
+        for resume_id, file_path in rows:
+            if not file_path or not os.path.exists(file_path):
+                missing += 1
+                continue
+            sha256, size = hash_file(file_path)
+            db.execute(
+                text("UPDATE resumes SET sha256 = :sha, size_bytes = :size WHERE id = :id"),
+                {"sha": sha256, "size": size, "id": resume_id}
+            )
+            hashed += 1
+        db.commit()
+        print(f"Migration complete: hashed {hashed} resumes, {missing} files missing on disk")
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    add_columns()
@@ -0,0 +1,20 @@
+from database import SessionLocal
+from sqlalchemy import text
+
+def add_column():
+    db = SessionLocal()
+    try:
+        try:
+            db.execute(text("ALTER TABLE resumes ADD COLUMN extraction_next_attempt_at TIMESTAMP"))
+            db.commit()
+            print("Added extraction_next_attempt_at column")
+        except Exception as e:
+            print(f"extraction_next_attempt_at error (maybe exists): {e}")
+            db.rollback()
+        # Existing pending rows have no retry time, so the next sweep submits them
+        print("Migration complete")
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    add_column()
@@ -0,0 +1,47 @@
+from database import SessionLocal, engine
+from sqlalchemy import text
+
+def add_columns():
+    db = SessionLocal()
+    try:
+        for column in ["confirmed_count", "waitlisted_count"]:
+            try:
+                db.execute(text(f"ALTER TABLE events ADD COLUMN {column} INTEGER DEFAULT 0"))
+                db.commit()
+                print(f"Added {column} column")
+            except Exception as e:
+                print(f"{column} error (maybe exists): {e}")
+                db.rollback()
+
+        # Backfill from the main (non-session) registrations
+        db.execute(text("""
+            UPDATE events SET
+                confirmed_count = (
+                    SELECT COUNT(*) FROM registrations r
+                    WHERE r.event_id = events.id AND r.session_id IS NULL AND r.status = 'confirmed'
+                ),
+                waitlisted_count = (
+                    SELECT COUNT(*) FROM registrations r
+                    WHERE r.event_id = events.id AND r.session_id IS NULL AND r.status = 'waitlisted'
+                )
+        """))
+        db.commit()
+        print("Backfilled seat counters")
+
+        try:
+            db.execute(text(
+                "CREATE UNIQUE INDEX IF NOT EXISTS uq_registrations_user_event_main "
+                "ON registrations (user_id, event_id) WHERE session_id IS NULL"
+            ))
+            db.commit()
+            print("Created uq_registrations_user_event_main index")
+        except Exception as e:
+            print(f"Index error (duplicate registrations must be cleaned up first): {e}")
+            db.rollback()
+
+        print("Migration complete")
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    add_columns()
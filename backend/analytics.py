@@ -0,0 +1,105 @@
+"""
+Admin dashboard counters.
+
+Everything /admin/analytics and /admin/stats show comes from one SELECT:
+a conditional-aggregate pass over each of users, events and registrations,
+cross joined into a single row. The row is kept as a snapshot for
+CACHE_TTL_SECONDS, so dashboard polling normally costs no DB time at all.
+
+Committed writes to users, events or registrations in this process (ORM
+changes and bulk insert/update/delete statements) mark the snapshot stale.
+A stale snapshot is still served until it is MIN_REFRESH_SECONDS old, so a
+registration rush triggers at most one recount every few seconds rather
+than one per poll. Writes from other processes show up within the TTL.
+Marking stale only bumps a generation number; commits never wait for a
+recount in progress.
+"""
+import datetime
+import itertools
+import os
+import threading
+import time
+from sqlalchemy import event, func, select
+from sqlalchemy.orm import Session
+import models
+
+CACHE_TTL_SECONDS = float(os.getenv("ANALYTICS_CACHE_SECONDS", 30))
+MIN_REFRESH_SECONDS = 2
+
+TRACKED = (models.User, models.Event, models.Registration)
+
+_lock = threading.Lock() # held by the poller that recounts
+_snapshot = None
+_computed_at = 0.0
+_writes = itertools.count(1) # next() is atomic, no lock needed
+_generation = 0 # bumped by invalidate()
+_computed_generation = 0 # _generation the snapshot was counted at
+
+def _count_if(condition):
+    # COUNT(*) FILTER (WHERE ...): Postgres 9.4+, SQLite 3.30+
+    return func.count().filter(condition)
+
+def _compute(db: Session) -> dict:
+    now = datetime.datetime.utcnow()
+    today_start = datetime.datetime(now.year, now.month, now.day)
+    User, Event, Registration = models.User, models.Event, models.Registration
+
+    users = select(
+        func.count(User.id).label("users_total"),
+        _count_if(User.role == "student").label("students"),
+        _count_if(User.role == "faculty").label("faculty"),
+        _count_if(User.role == "recruiter").label("recruiters"),
+        _count_if(User.role == "judge").label("judges"),
+        _count_if((User.is_active == False) & (User.verification_token == None)).label("pending_approvals"),
+        _count_if(User.created_at >= today_start).label("new_users_today"),
+    ).subquery()
+    events = select(
+        func.count(Event.id).label("events_total"),
+        _count_if(Event.is_active == True).label("active_events"),
+    ).subquery()
+    registrations = select(func.count(Registration.id).label("registrations_total")).subquery()
+
+    row = db.execute(select(users, events, registrations)).one()
+    return dict(row._mapping)
+
+def snapshot(db: Session) -> dict:
+    """The current counters, recomputed only when stale or expired"""
+    global _snapshot, _computed_at, _computed_generation
+    with _lock:
+        age = time.monotonic() - _computed_at
+        stale = _computed_generation != _generation
+        if _snapshot is not None and age < CACHE_TTL_SECONDS and (not stale or age < MIN_REFRESH_SECONDS):
+            return _snapshot
+        # Holding the lock: concurrent pollers wait for this one recount.
+        # Read the generation first, so a write committed mid-count stays stale.
+        generation = _generation
+        _snapshot = _compute(db)
+        _computed_at = time.monotonic()
+        _computed_generation = generation
+        return _snapshot
+
+def invalidate():
+    """Marks the snapshot stale without waiting for a recount in progress"""
+    global _generation
+    _generation = next(_writes)
+
+# --- Invalidation: committed writes to the counted tables ---
+
+@event.listens_for(Session, "after_flush")
+def _track_orm_writes(session, flush_context):
+    for obj in (*session.new, *session.dirty, *session.deleted):
+        if isinstance(obj, TRACKED):
+            session.info["analytics_changed"] = True
+            return
+
+@event.listens_for(Session, "do_orm_execute")
+def _track_bulk_writes(orm_execute_state):
+    if orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete:
+        mapper = orm_execute_state.bind_mapper
+        if mapper is not None and issubclass(mapper.class_, TRACKED):
+            orm_execute_state.session.info["analytics_changed"] = True
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_after_commit(session):
+    if session.info.pop("analytics_changed", False):
+        invalidate()
@@ -0,0 +1,156 @@
+"""
+Audit log writer.
+
+Most audit entries are not worth a transaction of their own. enqueue() puts
+the entry on an in-process queue and returns; a writer thread inserts queued
+entries as one multi-row INSERT per batch, as soon as BATCH_SIZE entries are
+waiting or FLUSH_SECONDS after the last flush, whichever comes first. So a
+mutating endpoint pays for its own commit only.
+
+Critical actions (deletions, account state changes) use add() instead: the
+entry joins the caller's session and commits atomically with the change it
+describes, so it can never be lost or written for a change that rolled back.
+
+The queue holds at most QUEUE_MAX entries. When it is full, enqueue() writes
+the entry synchronously instead of dropping it, which slows the callers down
+until the writer catches up; if that write fails too, the entry is logged
+and counted as dropped. shutdown() drains the queue.
+
+Configuration: AUDIT_BATCH_SIZE, AUDIT_FLUSH_SECONDS, AUDIT_QUEUE_MAX.
+"""
+import datetime
+import logging
+import os
+import threading
+from collections import deque
+from sqlalchemy.orm import Session
+from database import SessionLocal
+import models
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = int(os.getenv("AUDIT_BATCH_SIZE", 200))
+FLUSH_SECONDS = float(os.getenv("AUDIT_FLUSH_SECONDS", 1.0))
+QUEUE_MAX = int(os.getenv("AUDIT_QUEUE_MAX", 10000))
+
+_queue = deque()
+_cond = threading.Condition()
+_thread = None
+_stopping = False
+_stats = {"queued": 0, "written": 0, "batches": 0, "sync_writes": 0, "failed_batches": 0, "dropped": 0}
+
+def _entry(user_id: int, action: str, details: dict = None) -> dict:
+    # Timestamped here, not at insert time, so entries keep the order they happened in
+    return {"user_id": user_id, "action": action, "details": details or {},
+            "created_at": datetime.datetime.utcnow()}
+
+def add(db: Session, user_id: int, action: str, details: dict = None):
+    """Adds a critical entry to `db`; it is written by the caller's commit"""
+    audit = models.AuditLog(**_entry(user_id, action, details))
+    db.add(audit)
+    return audit
+
+def enqueue(user_id: int, action: str, details: dict = None):
+    """Queues an entry for the next batch"""
+    entry = _entry(user_id, action, details)
+    with _cond:
+        if len(_queue) < QUEUE_MAX and not _stopping:
+            _queue.append(entry)
+            _stats["queued"] += 1
+            _start_writer()
+            if len(_queue) >= BATCH_SIZE:
+                _cond.notify()
+            return
+        _stats["sync_writes"] += 1
+    if not _write([entry]):
+        with _cond:
+            _stats["dropped"] += 1
+        logger.error(f"Dropping audit entry {entry}: queue full and database unavailable")
+
+def _start_writer():
+    global _thread
+    if _thread is None or not _thread.is_alive():
+        _thread = threading.Thread(target=_run, name="audit-writer", daemon=True)
+        _thread.start()
+
+def _insert(batch: list):
+    db = SessionLocal()
+    try:
+        # One INSERT ... VALUES (...), (...), ... for the whole batch
+        db.execute(models.AuditLog.__table__.insert().values(batch))
+        db.commit()
+    finally:
+        db.close()
+
+def _write(batch: list) -> bool:
+    """Writes `batch`; returns False if nothing could be written (e.g. the DB is down)"""
+    try:
+        _insert(batch)
+        written = len(batch)
+    except Exception as e:
+        # Isolate bad rows (e.g. a user deleted in the meantime) from the rest
+        logger.warning(f"Audit batch of {len(batch)} failed, retrying row by row: {e}")
+        failed = []
+        for entry in batch:
+            try:
+                _insert([entry])
+            except Exception as e:
+                failed.append((entry, e))
+        written = len(batch) - len(failed)
+        if not written:
+            with _cond:
+                _stats["failed_batches"] += 1
+            return False
+        for entry, error in failed:
+            logger.error(f"Could not write audit entry {entry}: {error}")
+    with _cond:
+        _stats["written"] += written
+        _stats["batches"] += 1
+        _stats["dropped"] += len(batch) - written
+    return True
+
+def _take() -> list:
+    # Caller holds _cond
+    return [_queue.popleft() for _ in range(min(len(_queue), BATCH_SIZE))]
+
+def _run():
+    while True:
+        with _cond:
+            _cond.wait_for(lambda: len(_queue) >= BATCH_SIZE or _stopping, timeout=FLUSH_SECONDS)
+            batch = _take()
+            if not batch and _stopping:
+                return
+        if batch and not _write(batch):
+            with _cond:
+                if _stopping:
+                    _stats["dropped"] += len(batch)
+                    logger.error(f"Dropping {len(batch)} audit entries at shutdown, database unavailable")
+                    continue
+                # Put the batch back (oldest first) and give the database a moment
+                room = QUEUE_MAX - len(_queue)
+                _queue.extendleft(reversed(batch[:room]))
+                _stats["dropped"] += len(batch) - min(room, len(batch))
+                _cond.wait(FLUSH_SECONDS)
+
+def flush():
+    """Writes everything queued so far from the calling thread"""
+    while True:
+        with _cond:
+            batch = _take()
+        if not batch or not _write(batch):
+            return
+
+def metrics() -> dict:
+    with _cond:
+        return {"pending": len(_queue), "batch_size": BATCH_SIZE, "flush_seconds": FLUSH_SECONDS,
+                "queue_max": QUEUE_MAX, **_stats}
+
+def shutdown(timeout: float = 10):
+    """Stops the writer after it has drained the queue"""
+    global _stopping
+    with _cond:
+        _stopping = True
+        _cond.notify_all()
+    if _thread is not None:
+        _thread.join(timeout)
+    flush()
@@ -1,8 +1,17 @@
+from collections import OrderedDict
+from dataclasses import dataclass
 from datetime import datetime, timedelta
 from typing import Optional
+import hashlib
+import os
+import secrets
+import threading
+import time
+import uuid
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from jose import JWTError, jwt
+from sqlalchemy import event
 from sqlalchemy.orm import Session
 import crud, models, schemas, database
 
@@ -10,9 +19,63 @@ import crud, models, schemas, database
 SECRET_KEY = "CHANGE_ME_PLEASE"
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
+# Refreshing skips bcrypt, so clients renew access tokens instead of logging in again
+REFRESH_TOKEN_EXPIRE_DAYS = int(os.getenv("REFRESH_TOKEN_EXPIRE_DAYS", 7))
+# A token reused this soon after its rotation is taken for two tabs racing to
+# refresh, not a replay: the late request is refused, the family kept
+REFRESH_REUSE_GRACE_SECONDS = float(os.getenv("REFRESH_REUSE_GRACE_SECONDS", 30))
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="auth/login")
 
+# Authenticated users are resolved through a small per-process cache keyed by
+# the token's uid claim, so most requests never touch the users table.
+# Committed User changes in this process drop the entry at once (e.g. a role
+# change in admin.authorize_user); other workers pick them up within the TTL.
+USER_CACHE_TTL_SECONDS = float(os.getenv("AUTH_USER_CACHE_SECONDS", 60))
+USER_CACHE_SIZE = 4096
+
+@dataclass(frozen=True)
+class Principal:
+    """The authenticated user as seen by route dependencies (not an ORM object)"""
+    id: int
+    email: str
+    role: str
+    is_active: bool
+    name: Optional[str] = None
+
+_user_cache = OrderedDict() # user id -> (Principal, expires_at)
+_user_cache_lock = threading.Lock()
+
+def invalidate_user(user_id: int):
+    with _user_cache_lock:
+        _user_cache.pop(user_id, None)
+
+def _cached_principal(user_id: int):
+    with _user_cache_lock:
+        entry = _user_cache.get(user_id)
+        if entry is None:
+            return None
+        principal, expires_at = entry
+        if expires_at < time.monotonic():
+            del _user_cache[user_id]
+            return None
+        _user_cache.move_to_end(user_id)
+        return principal
+
+def _load_principal(db: Session, user_id: int = None, email: str = None):
+    User = models.User
+    query = db.query(User.id, User.email, User.role, User.is_active, User.name)
+    row = query.filter(User.id == user_id).first() if user_id is not None else query.filter(User.email == email).first()
+    if row is None:
+        return None
+    principal = Principal(id=row.id, email=row.email, role=row.role, is_active=bool(row.is_active), name=row.name)
+    with _user_cache_lock:
+        _user_cache[principal.id] = (principal, time.monotonic() + USER_CACHE_TTL_SECONDS)
+        _user_cache.move_to_end(principal.id)
+        while len(_user_cache) > USER_CACHE_SIZE:
+            _user_cache.popitem(last=False)
+    return principal
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     to_encode = data.copy()
     if expires_delta:
@@ -23,7 +86,67 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
-def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(database.get_db)):
+def hash_refresh_token(token: str) -> str:
+    # Tokens are 256 random bits, so a fast unsalted hash is enough for lookup
+    return hashlib.sha256(token.encode()).hexdigest()
+
+def issue_tokens(db: Session, user, family_id: str = None) -> dict:
+    """
+    Access token plus a new refresh token for `user` (a User or Principal).
+    The refresh token joins `family_id` (a rotation) or starts a new family
+    (a login). The caller commits.
+    """
+    refresh_token = secrets.token_urlsafe(32)
+    crud.create_refresh_token(
+        db, user_id=user.id, token_hash=hash_refresh_token(refresh_token),
+        family_id=family_id or uuid.uuid4().hex,
+        expires_at=datetime.utcnow() + timedelta(days=REFRESH_TOKEN_EXPIRE_DAYS)
+    )
+    access_token = create_access_token(
+        data={"sub": user.email, "uid": user.id, "role": user.role},
+        expires_delta=timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
+    )
+    return {
+        "access_token": access_token, "refresh_token": refresh_token,
+        "token_type": "bearer", "role": user.role, "name": user.name,
+    }
+
+def rotate_refresh_token(db: Session, refresh_token: str) -> dict:
+    """
+    Exchanges a refresh token for new tokens and commits. A token that was
+    already rotated is a replay (the token leaked, or a client kept an old
+    copy), so its whole family is revoked - unless it was rotated less than
+    REFRESH_REUSE_GRACE_SECONDS ago. Tabs share one refresh token, and the
+    loser of a concurrent refresh only gets a 401; it picks up the tokens the
+    winner stored. Only hashes are stored, so the winner's successor cannot
+    be handed out again.
+    """
+    invalid = HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail="Invalid refresh token",
+        headers={"WWW-Authenticate": "Bearer"},
+    )
+    stored = crud.get_refresh_token(db, hash_refresh_token(refresh_token))
+    if stored is None or stored.revoked_at is not None or stored.expires_at < datetime.utcnow():
+        raise invalid
+    if not crud.mark_refresh_token_rotated(db, stored.id):
+        # rotated_at is still None if the winner committed after our lookup
+        rotated_at = stored.rotated_at or datetime.utcnow()
+        if datetime.utcnow() - rotated_at > timedelta(seconds=REFRESH_REUSE_GRACE_SECONDS):
+            crud.revoke_refresh_family(db, stored.family_id)
+            db.commit()
+        raise invalid
+
+    principal = _load_principal(db, user_id=stored.user_id)
+    if principal is None or not principal.is_active:
+        crud.revoke_refresh_family(db, stored.family_id)
+        db.commit()
+        raise invalid
+    tokens = issue_tokens(db, principal, family_id=stored.family_id)
+    db.commit()
+    return tokens
+
+def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(database.get_db)) -> Principal:
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
@@ -38,35 +161,53 @@ def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(
         token_data = schemas.TokenData(email=email, role=role)
     except JWTError:
         raise credentials_exception
-    user = crud.get_user_by_email(db, email=token_data.email)
-    if user is None:
+    user_id = payload.get("uid") # Absent in tokens issued before the claim existed
+    principal = _cached_principal(user_id) if user_id is not None else None
+    if principal is None:
+        principal = _load_principal(db, user_id=user_id, email=None if user_id is not None else token_data.email)
+    if principal is None or principal.email != token_data.email:
         raise credentials_exception
-    return user
+    if not principal.is_active:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Account is inactive")
+    return principal
 
-def get_current_active_admin(current_user: models.User = Depends(get_current_user)):
+def get_current_active_admin(current_user: Principal = Depends(get_current_user)):
     if current_user.role != "admin":
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN, detail="Not authorized"
         )
     return current_user
 
-def get_current_judge(current_user: models.User = Depends(get_current_user)):
+def get_current_judge(current_user: Principal = Depends(get_current_user)):
     if current_user.role != "judge" and current_user.role != "admin": # Admin can see judge stuff too
          raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN, detail="Not authorized"
         )
     return current_user
 
-def get_current_faculty(current_user: models.User = Depends(get_current_user)):
+def get_current_faculty(current_user: Principal = Depends(get_current_user)):
     if current_user.role != "faculty" and current_user.role != "admin":
          raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN, detail="Not authorized - Faculty"
         )
     return current_user
 
-def get_current_recruiter(current_user: models.User = Depends(get_current_user)):
+def get_current_recruiter(current_user: Principal = Depends(get_current_user)):
     if current_user.role != "recruiter" and current_user.role != "admin":
          raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN, detail="Not authorized - Recruiter"
         )
     return current_user
+
+# --- Invalidation: committed changes to users ---
+
+@event.listens_for(Session, "after_flush")
+def _track_user_changes(session, flush_context):
+    for obj in (*session.dirty, *session.deleted):
+        if isinstance(obj, models.User) and obj.id is not None:
+            session.info.setdefault("changed_user_ids", set()).add(obj.id)
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_users_after_commit(session):
+    for user_id in session.info.pop("changed_user_ids", ()):
+        invalidate_user(user_id)
@@ -0,0 +1,77 @@
+"""
+Times the admin dashboard counters: the former ten COUNT queries, the
+single conditional-aggregate statement, and the cached snapshot.
+
+Usage: python bench_admin_analytics.py [users] [polls]
+Adds `users` (default 200000) users under @analytics.bench to whatever
+DATABASE_URL points to (once; rerunning reuses them), e.g.
+
+    DATABASE_URL=sqlite:///./analytics.db python bench_admin_analytics.py
+"""
+import datetime
+import sys
+import time
+from sqlalchemy import insert
+from database import SessionLocal, engine
+import models, analytics
+
+EMAIL_DOMAIN = "analytics.bench"
+ROLES = ["student"] * 8 + ["faculty", "recruiter"]
+
+def seed(db, users: int):
+    existing = db.query(models.User).filter(models.User.email.like(f"%@{EMAIL_DOMAIN}")).count()
+    now = datetime.datetime.utcnow()
+    for start in range(existing, users, 10000):
+        db.execute(insert(models.User), [
+            {"email": f"user{i}@{EMAIL_DOMAIN}", "name": f"User {i}", "hashed_password": "x",
+             "role": ROLES[i % len(ROLES)], "is_active": i % 50 != 0, "created_at": now - datetime.timedelta(hours=i % 72)}
+            for i in range(start, min(start + 10000, users))
+        ])
+    db.commit()
+
+def legacy_counts(db):
+    now = datetime.datetime.utcnow()
+    today_start = datetime.datetime(now.year, now.month, now.day)
+    User = models.User
+    return (
+        db.query(User).count(), db.query(models.Event).count(), db.query(models.Registration).count(),
+        db.query(User).filter(User.role == "student").count(),
+        db.query(User).filter(User.role == "faculty").count(),
+        db.query(User).filter(User.role == "recruiter").count(),
+        db.query(User).filter(User.is_active == False, User.verification_token == None).count(),
+        db.query(User).filter(User.created_at >= today_start).count(),
+        db.query(models.Event).filter(models.Event.is_active == True).count(),
+        db.query(User).filter(User.role == "judge").count(),
+    )
+
+def timed(fn, rounds):
+    start = time.perf_counter()
+    for _ in range(rounds):
+        result = fn()
+    return (time.perf_counter() - start) / rounds * 1000, result
+
+def bench(users: int = 200000, polls: int = 1000):
+    models.Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    try:
+        seed(db, users)
+        legacy_ms, legacy = timed(lambda: legacy_counts(db), 5)
+        single_ms, counts = timed(lambda: analytics._compute(db), 5)
+        assert legacy[0] == counts["users_total"] and legacy[3] == counts["students"]
+        assert legacy[6] == counts["pending_approvals"] and legacy[7] == counts["new_users_today"]
+
+        analytics.invalidate()
+        cached_ms, _ = timed(lambda: analytics.snapshot(db), polls)
+    finally:
+        db.close()
+
+    print(f"Dashboard counters over {counts['users_total']} users")
+    print(f"  10 COUNT queries:       {legacy_ms:.1f} ms")
+    print(f"  one aggregate SELECT:   {single_ms:.1f} ms")
+    print(f"  cached snapshot ({polls} polls): {cached_ms:.3f} ms per poll")
+
+if __name__ == "__main__":
+    bench(
+        int(sys.argv[1]) if len(sys.argv) > 1 else 200000,
+        int(sys.argv[2]) if len(sys.argv) > 2 else 1000,
+    )
@@ -0,0 +1,62 @@
+"""
+Times audit logging the old way (one add + commit per entry, as every
+mutating endpoint did after its own commit) against audit.enqueue() and the
+batched writer.
+
+Usage: python bench_audit_log.py [entries]
+Writes `entries` (default 2000) rows per mode with action BENCH_AUDIT to
+whatever DATABASE_URL points to, and deletes them afterwards, e.g.
+
+    DATABASE_URL=sqlite:///./audit.db python bench_audit_log.py
+"""
+import sys
+import time
+from database import SessionLocal, engine
+import models, audit
+
+ACTION = "BENCH_AUDIT"
+
+def per_entry_commit(entries: int):
+    db = SessionLocal()
+    try:
+        for i in range(entries):
+            db.add(models.AuditLog(user_id=None, action=ACTION, details={"i": i}))
+            db.commit()
+    finally:
+        db.close()
+
+def batched(entries: int):
+    for i in range(entries):
+        audit.enqueue(None, ACTION, {"i": i})
+    enqueued = time.perf_counter()
+    audit.shutdown()
+    return enqueued
+
+def bench(entries: int = 2000):
+    models.Base.metadata.create_all(bind=engine)
+    start = time.perf_counter()
+    per_entry_commit(entries)
+    commit_ms = (time.perf_counter() - start) * 1000
+
+    start = time.perf_counter()
+    enqueued = batched(entries)
+    enqueue_ms = (enqueued - start) * 1000
+    batched_ms = (time.perf_counter() - start) * 1000
+
+    db = SessionLocal()
+    try:
+        written = db.query(models.AuditLog).filter(models.AuditLog.action == ACTION).count()
+        db.query(models.AuditLog).filter(models.AuditLog.action == ACTION).delete()
+        db.commit()
+    finally:
+        db.close()
+    assert written == 2 * entries, written
+
+    stats = audit.metrics()
+    print(f"{entries} audit entries")
+    print(f"  commit per entry:  {commit_ms:.0f} ms ({commit_ms / entries:.2f} ms per request)")
+    print(f"  enqueue:           {enqueue_ms:.0f} ms ({enqueue_ms / entries * 1000:.1f} us per request)")
+    print(f"  batched, drained:  {batched_ms:.0f} ms in {stats['batches']} INSERTs")
+
+if __name__ == "__main__":
+    bench(int(sys.argv[1]) if len(sys.argv) > 1 else 2000)
@@ -0,0 +1,80 @@
+"""
+Benchmarks the email outbox against a local aiosmtpd server.
+
+Usage: python bench_email_outbox.py [messages] [baseline_messages]
+Needs aiosmtpd (pip install aiosmtpd). Uses DATABASE_URL like the app, so
+point it at a scratch database.
+"""
+import os
+import sys
+
+SMTP_PORT = int(os.getenv("BENCH_SMTP_PORT", 8025))
+# email_utils reads its config at import time
+os.environ.update({
+    "MAIL_SERVER": "127.0.0.1",
+    "MAIL_PORT": str(SMTP_PORT),
+    "MAIL_STARTTLS": "False",
+    "MAIL_SSL_TLS": "False",
+    "MAIL_USE_CREDENTIALS": "False",
+})
+
+import asyncio
+import time
+from aiosmtpd.controller import Controller
+import database, models, email_utils, email_outbox
+
+class CountingHandler:
+    def __init__(self):
+        self.received = 0
+
+    async def handle_DATA(self, server, session, envelope):
+        self.received += 1
+        return "250 OK"
+
+async def bench(total: int, baseline: int):
+    models.Base.metadata.create_all(bind=database.engine)
+    handler = CountingHandler()
+    controller = Controller(handler, hostname="127.0.0.1", port=SMTP_PORT)
+    controller.start()
+    try:
+        # Old path: one FastMail session per message, awaited serially
+        start = time.perf_counter()
+        for i in range(baseline):
+            await email_utils.send_feedback_request_email(f"baseline{i}@example.com", "Bench Event", i)
+        baseline_secs = time.perf_counter() - start
+
+        db = database.SessionLocal()
+        db.query(models.EmailOutbox).delete()
+        messages = []
+        for i in range(total):
+            subject, html = email_utils.render_feedback_request("Bench Event", i)
+            messages.append({"recipient": f"student{i}@example.com", "subject": subject, "body_html": html, "kind": "feedback_request"})
+
+        email_outbox.start()
+        handler.received = 0
+        start = time.perf_counter()
+        email_outbox.enqueue_many(db, messages)
+        db.commit()
+        enqueue_secs = time.perf_counter() - start
+
+        while True:
+            counts = email_outbox.status_counts(db)
+            if counts.get("sent", 0) + counts.get("dead", 0) >= total:
+                break
+            await asyncio.sleep(0.05)
+        outbox_secs = time.perf_counter() - start
+        db.close()
+        await email_outbox.stop()
+    finally:
+        controller.stop()
+
+    if baseline:
+        print(f"Per-message FastMail: {baseline} emails in {baseline_secs:.2f}s ({baseline / baseline_secs:.0f}/s)")
+    print(f"Outbox enqueue:       {total} emails in {enqueue_secs * 1000:.0f}ms")
+    print(f"Outbox delivery:      {total} emails in {outbox_secs:.2f}s ({total / outbox_secs:.0f}/s), counts={counts}")
+    print(f"SMTP server received: {handler.received}")
+
+if __name__ == "__main__":
+    total = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    baseline = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+    asyncio.run(bench(total, baseline))
@@ -0,0 +1,107 @@
+"""
+Load test for login admission control: one client hammers /auth/login with
+wrong passwords for real accounts (BENCH_VICTIMS, so every attempt costs a
+bcrypt verify) while regular users log in and an unrelated endpoint is
+probed.
+
+Usage: python bench_login_rate_limit.py [seconds] [attack_rate]
+The attacker sends `attack_rate` (default 30) logins per second regardless
+of how fast they are answered, as a stuffing tool would.
+Run the server with RATE_LIMIT_TRUST_PROXY=1: each regular user is given
+its own X-Forwarded-For address, the attacker always uses one. Logs in as
+BENCH_EMAIL / BENCH_PASSWORD against BENCH_URL. Compare against a server
+started with LOGIN_LIMIT_PER_IP and LOGIN_LIMIT_PER_USERNAME set very high
+(e.g. 1000000/1) to see the same load without the limiter.
+"""
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+import requests
+
+BASE_URL = os.getenv("BENCH_URL", "http://localhost:8000")
+EMAIL = os.getenv("BENCH_EMAIL", "student@cmis.com")
+PASSWORD = os.getenv("BENCH_PASSWORD", "student")
+VICTIMS = os.getenv("BENCH_VICTIMS", "admin@cmis.com,faculty@cmis.com,recruiter@cmis.com,judge@cmis.com").split(",")
+ATTACKER_IP = "203.0.113.66"
+USER_LOGIN_INTERVAL_SECONDS = 2
+PROBE_INTERVAL_SECONDS = 0.05
+MAX_ATTACK_IN_FLIGHT = 200
+
+def percentile(values, p):
+    if not values:
+        return float("nan")
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p / 100))]
+
+def attempt(n, statuses, lock):
+    try:
+        response = requests.post(
+            f"{BASE_URL}/auth/login", headers={"X-Forwarded-For": ATTACKER_IP},
+            data={"username": VICTIMS[n % len(VICTIMS)], "password": f"guess{n}"}, timeout=60
+        )
+        status = response.status_code
+    except requests.RequestException:
+        status = "error"
+    with lock:
+        statuses[status] = statuses.get(status, 0) + 1
+
+def attacker(stop, rate, statuses):
+    lock = threading.Lock()
+    with ThreadPoolExecutor(max_workers=MAX_ATTACK_IN_FLIGHT) as pool:
+        start = time.perf_counter()
+        n = 0
+        while not stop.is_set():
+            n += 1
+            pool.submit(attempt, n, statuses, lock)
+            delay = start + n / rate - time.perf_counter()
+            if delay > 0:
+                stop.wait(delay)
+        pool.shutdown(cancel_futures=True)
+
+def user(stop, index, latencies, statuses):
+    with requests.Session() as session:
+        while not stop.is_set():
+            start = time.perf_counter()
+            response = session.post(
+                f"{BASE_URL}/auth/login", headers={"X-Forwarded-For": f"198.51.100.{index}"},
+                data={"username": EMAIL, "password": PASSWORD}
+            )
+            latencies.append((time.perf_counter() - start) * 1000)
+            statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+            stop.wait(USER_LOGIN_INTERVAL_SECONDS)
+
+def probe(stop, latencies):
+    with requests.Session() as session:
+        while not stop.is_set():
+            start = time.perf_counter()
+            session.get(f"{BASE_URL}/events/").raise_for_status()
+            latencies.append((time.perf_counter() - start) * 1000)
+            time.sleep(PROBE_INTERVAL_SECONDS)
+
+def bench(seconds: float = 30, attack_rate: float = 30, users: int = 3):
+    stop = threading.Event()
+    attack_statuses, user_statuses = {}, {}
+    user_ms, probe_ms = [], []
+    threads = [threading.Thread(target=attacker, args=(stop, attack_rate, attack_statuses))]
+    threads += [threading.Thread(target=user, args=(stop, i + 1, user_ms, user_statuses)) for i in range(users)]
+    threads.append(threading.Thread(target=probe, args=(stop, probe_ms)))
+    for thread in threads:
+        thread.start()
+    time.sleep(seconds)
+    stop.set()
+    for thread in threads:
+        thread.join()
+
+    attempts = sum(attack_statuses.values())
+    print(f"{seconds:.0f}s, attacker at {attack_rate:.0f} logins/s from one IP, {users} regular users")
+    print(f"  attacker: {attempts} attempts answered, statuses {attack_statuses}")
+    print(f"  regular logins: statuses {user_statuses}, p50 {percentile(user_ms, 50):.0f} ms, p99 {percentile(user_ms, 99):.0f} ms")
+    print(f"  GET /events/: {len(probe_ms)} probes, p50 {percentile(probe_ms, 50):.1f} ms, p99 {percentile(probe_ms, 99):.1f} ms")
+
+if __name__ == "__main__":
+    bench(
+        float(sys.argv[1]) if len(sys.argv) > 1 else 30,
+        float(sys.argv[2]) if len(sys.argv) > 2 else 30,
+    )
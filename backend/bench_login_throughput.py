@@ -0,0 +1,82 @@
+"""
+Measures how a login storm affects unrelated requests.
+
+Usage: python bench_login_throughput.py [logins] [concurrency]
+Probes GET /events/ against BENCH_URL on its own while idle, then again while
+`logins` (default 200) logins as BENCH_EMAIL / BENCH_PASSWORD run with
+`concurrency` (default 200) at a time, and prints the probe latency
+percentiles for both phases plus the login throughput. With bcrypt on the
+event loop the probe p99 climbs to seconds; offloaded, it stays flat.
+"""
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+import requests
+
+BASE_URL = os.getenv("BENCH_URL", "http://localhost:8000")
+EMAIL = os.getenv("BENCH_EMAIL", "student@cmis.com")
+PASSWORD = os.getenv("BENCH_PASSWORD", "password")
+PROBE_INTERVAL_SECONDS = 0.02
+
+def percentile(values, p):
+    if not values:
+        return float("nan")
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p / 100))]
+
+def probe(stop: threading.Event, latencies: list):
+    with requests.Session() as session:
+        while not stop.is_set():
+            start = time.perf_counter()
+            session.get(f"{BASE_URL}/events/").raise_for_status()
+            latencies.append((time.perf_counter() - start) * 1000)
+            time.sleep(PROBE_INTERVAL_SECONDS)
+
+def login(_):
+    start = time.perf_counter()
+    response = requests.post(f"{BASE_URL}/auth/login", data={"username": EMAIL, "password": PASSWORD})
+    return response.status_code, (time.perf_counter() - start) * 1000
+
+def report(label, latencies):
+    print(f"  {label}: {len(latencies)} probes, p50 {percentile(latencies, 50):.1f} ms, "
+          f"p99 {percentile(latencies, 99):.1f} ms, max {max(latencies, default=0):.1f} ms")
+
+def bench(logins: int = 200, concurrency: int = 200):
+    if login(0)[0] != 200:
+        raise RuntimeError(f"Login as {EMAIL} failed; set BENCH_EMAIL / BENCH_PASSWORD")
+
+    idle, storm = [], []
+    stop = threading.Event()
+    thread = threading.Thread(target=probe, args=(stop, idle))
+    thread.start()
+    time.sleep(3)
+    stop.set()
+    thread.join()
+
+    stop = threading.Event()
+    thread = threading.Thread(target=probe, args=(stop, storm))
+    thread.start()
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = list(pool.map(login, range(logins)))
+    elapsed = time.perf_counter() - start
+    stop.set()
+    thread.join()
+
+    statuses = {}
+    for status, _ in results:
+        statuses[status] = statuses.get(status, 0) + 1
+    login_ms = [ms for _, ms in results]
+    print(f"{logins} logins at concurrency {concurrency}: {elapsed:.1f}s ({logins / elapsed:.1f}/s), statuses {statuses}")
+    print(f"  login latency: p50 {percentile(login_ms, 50):.0f} ms, p99 {percentile(login_ms, 99):.0f} ms")
+    print("GET /events/ latency")
+    report("idle      ", idle)
+    report("during storm", storm)
+
+if __name__ == "__main__":
+    bench(
+        int(sys.argv[1]) if len(sys.argv) > 1 else 200,
+        int(sys.argv[2]) if len(sys.argv) > 2 else 200,
+    )
@@ -0,0 +1,55 @@
+"""
+Compares repeat resume downloads with and without conditional GET.
+
+Usage: python bench_resume_downloads.py <student_id> [rounds]
+Logs in as BENCH_EMAIL / BENCH_PASSWORD (a recruiter) against BENCH_URL.
+"""
+import os
+import sys
+import time
+import requests
+
+BASE_URL = os.getenv("BENCH_URL", "http://localhost:8000")
+EMAIL = os.getenv("BENCH_EMAIL", "recruiter@cmis.com")
+PASSWORD = os.getenv("BENCH_PASSWORD", "password")
+
+def login():
+    response = requests.post(f"{BASE_URL}/auth/login", data={"username": EMAIL, "password": PASSWORD})
+    response.raise_for_status()
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+def run(session, url, headers, rounds, conditional):
+    total_bytes = 0
+    etag = None
+    start = time.perf_counter()
+    for _ in range(rounds):
+        request_headers = dict(headers)
+        if conditional and etag:
+            request_headers["If-None-Match"] = etag
+        response = session.get(url, headers=request_headers)
+        if response.status_code not in (200, 304):
+            raise RuntimeError(f"Unexpected status {response.status_code}: {response.text}")
+        etag = response.headers.get("ETag", etag)
+        total_bytes += len(response.content)
+    elapsed = time.perf_counter() - start
+    return total_bytes, elapsed / rounds * 1000
+
+def bench(student_id: int, rounds: int = 50):
+    headers = login()
+    url = f"{BASE_URL}/recruiter/students/{student_id}/resume"
+    with requests.Session() as session:
+        plain_bytes, plain_ms = run(session, url, headers, rounds, conditional=False)
+        cached_bytes, cached_ms = run(session, url, headers, rounds, conditional=True)
+
+        first_page = session.get(url, headers={**headers, "Range": "bytes=0-65535"})
+
+    print(f"{rounds} downloads of student {student_id}'s resume")
+    print(f"  unconditional: {plain_bytes} bytes, {plain_ms:.2f} ms/request")
+    print(f"  If-None-Match: {cached_bytes} bytes, {cached_ms:.2f} ms/request")
+    print(f"  Range 0-65535: HTTP {first_page.status_code}, {len(first_page.content)} bytes")
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print(__doc__)
+        sys.exit(1)
+    bench(int(sys.argv[1]), int(sys.argv[2]) if len(sys.argv) > 2 else 50)
@@ -0,0 +1,68 @@
+"""
+Compares the CPU cost of keeping users signed in for an all-day event by
+logging in again whenever the access token expires versus /auth/refresh.
+
+Usage: python bench_token_refresh.py [participants] [hours] [samples]
+Runs the auth router in-process against DATABASE_URL, measures `samples`
+of each operation (process CPU time, including the bcrypt threads) and
+extrapolates to `participants` users renewing every
+ACCESS_TOKEN_EXPIRE_MINUTES for `hours`.
+"""
+import sys
+import time
+import uuid
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from database import SessionLocal, engine
+from routers import auth_router
+import models, crud, schemas, auth
+
+PASSWORD = "bench-password"
+
+def cpu_per_call(fn, samples):
+    start = time.process_time()
+    for _ in range(samples):
+        fn()
+    return (time.process_time() - start) / samples
+
+def bench(participants: int = 800, hours: float = 6, samples: int = 30):
+    models.Base.metadata.create_all(bind=engine)
+    email = f"{uuid.uuid4().hex[:8]}@refresh.bench"
+    db = SessionLocal()
+    try:
+        crud.create_user(db, schemas.UserCreate(email=email, name="Bench", password=PASSWORD, role="student"))
+    finally:
+        db.close()
+
+    app = FastAPI()
+    app.include_router(auth_router.router)
+    client = TestClient(app)
+
+    def login():
+        response = client.post("/auth/login", data={"username": email, "password": PASSWORD})
+        assert response.status_code == 200, response.text
+        return response.json()
+
+    refresh_token = login()["refresh_token"]
+
+    def refresh():
+        nonlocal refresh_token
+        response = client.post("/auth/refresh", json={"refresh_token": refresh_token})
+        assert response.status_code == 200, response.text
+        refresh_token = response.json()["refresh_token"]
+
+    login_cpu = cpu_per_call(login, samples)
+    refresh_cpu = cpu_per_call(refresh, samples)
+
+    renewals = participants * int(hours * 60 / auth.ACCESS_TOKEN_EXPIRE_MINUTES)
+    print(f"Per call: login {login_cpu * 1000:.1f} ms CPU, refresh {refresh_cpu * 1000:.1f} ms CPU")
+    print(f"{participants} participants over {hours}h = {renewals} token renewals")
+    print(f"  re-login: {renewals * login_cpu / 60:.1f} CPU minutes")
+    print(f"  refresh:  {renewals * refresh_cpu / 60:.1f} CPU minutes ({login_cpu / refresh_cpu:.0f}x less)")
+
+if __name__ == "__main__":
+    bench(
+        int(sys.argv[1]) if len(sys.argv) > 1 else 800,
+        float(sys.argv[2]) if len(sys.argv) > 2 else 6,
+        int(sys.argv[3]) if len(sys.argv) > 3 else 30,
+    )
@@ -1,42 +1,48 @@
-from sqlalchemy.orm import Session, joinedload
-from passlib.context import CryptContext
-import models, schemas
+from sqlalchemy.orm import Session, joinedload, selectinload, contains_eager, raiseload
+import models, schemas, pagination, search_index, passwords, audit
 import datetime
-from sqlalchemy import func
-
-def create_audit_log(db: Session, user_id: int, action: str, details: dict = None):
-    try:
-        audit = models.AuditLog(
-            user_id=user_id,
-            action=action,
-            details=details or {}
-        )
-        db.add(audit)
-        db.commit()
-    except Exception as e:
-        print(f"Failed to create audit log: {e}")
-    return audit
-
-def create_audit_log(db: Session, user_id: int, action: str, details: dict = None):
-    try:
-        audit = models.AuditLog(
-            user_id=user_id,
-            action=action,
-            details=details or {}
-        )
-        db.add(audit)
-        db.commit()
-    except Exception as e:
-        print(f"Failed to create audit log: {e}")
-    return audit
-
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
-
+from sqlalchemy import func, case, or_
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+
+# --- Loading strategies per response shape ---
+# Each option set eagerly loads exactly what the response schema serializes,
+# so validating N rows costs a fixed number of queries instead of 1 + 3N.
+
+# schemas.Event: sessions
+EVENT_LOAD = (selectinload(models.Event.sessions),)
+
+# schemas.User: skills + resumes
+USER_LOAD = (
+    selectinload(models.User.skills),
+    selectinload(models.User.resumes),
+)
+
+# schemas.RegistrationDetail: student -> skills, resumes
+REGISTRATION_DETAIL_LOAD = tuple(
+    selectinload(models.Registration.student).options(option) for option in USER_LOAD
+)
+
+# schemas.Registration has no nested objects; fail loudly instead of lazy loading
+REGISTRATION_LOAD = (raiseload("*"),)
+
+# schemas.ResumeDetail (query already joins User): student -> skills, resumes
+RESUME_DETAIL_LOAD = tuple(
+    contains_eager(models.Resume.student).options(option) for option in USER_LOAD
+)
+
+# Resume book export: student -> skills; active resumes are fetched per page
+RESUME_BOOK_LOAD = (
+    selectinload(models.Registration.student).selectinload(models.User.skills),
+)
+
+# Blocking bcrypt helpers for scripts; async endpoints use the passwords module
 def verify_password(plain_password, hashed_password):
-    return pwd_context.verify(plain_password, hashed_password)
+    return passwords.pwd_context.verify(plain_password, hashed_password)
 
 def get_password_hash(password):
-    return pwd_context.hash(password)
+    return passwords.pwd_context.hash(password)
 
 # --- User Operations ---
 
@@ -46,8 +52,15 @@ def get_user_by_email(db: Session, email: str):
 def get_user(db: Session, user_id: int):
     return db.query(models.User).filter(models.User.id == user_id).first()
 
-def create_user(db: Session, user: schemas.UserCreate, verification_token: str = None):
-    hashed_password = get_password_hash(user.password)
+def update_password_hash(db: Session, user_id: int, hashed_password: str):
+    db.query(models.User).filter(models.User.id == user_id).update(
+        {"hashed_password": hashed_password}, synchronize_session=False
+    )
+    db.commit()
+
+def create_user(db: Session, user: schemas.UserCreate, verification_token: str = None, hashed_password: str = None):
+    if hashed_password is None:
+        hashed_password = get_password_hash(user.password)
     
     # New users requiring verification are inactive by default
     is_active = False if verification_token else True
@@ -64,6 +77,8 @@ def create_user(db: Session, user: schemas.UserCreate, verification_token: str =
         verification_token=verification_token
     )
     db.add(db_user)
+    db.flush()
+    search_index.refresh_student(db, db_user.id)
     db.commit()
     db.refresh(db_user)
     
@@ -77,21 +92,10 @@ def get_user_by_token(db: Session, token: str):
 def verify_user_email(db: Session, user: models.User):
     # user.is_active = True  <-- CHANGED: Do NOT activate yet. Wait for Admin.
     user.verification_token = None # Clear token to mark email as verified
+    # Audit Log - written in the same transaction as the verification
+    audit.add(db, user.id, "USER_EMAIL_VERIFIED", {"email": user.email, "role": user.role, "name": user.name})
     db.commit()
     db.refresh(user)
-    
-    # Audit Log - Log verification
-    try:
-        audit = models.AuditLog(
-            user_id=user.id,
-            action="USER_EMAIL_VERIFIED", # Changed action name to be more accurate
-            details={"email": user.email, "role": user.role, "name": user.name}
-        )
-        db.add(audit)
-        db.commit()
-    except Exception as e:
-        print(f"Failed to create audit log: {e}")
-    
     return user
 
 def update_user_profile(db: Session, user_id: int, profile: schemas.UserProfileUpdate):
@@ -99,39 +103,67 @@ def update_user_profile(db: Session, user_id: int, profile: schemas.UserProfileU
     if db_user:
         for key, value in profile.dict(exclude_unset=True).items():
             setattr(db_user, key, value)
+        search_index.refresh_student(db, user_id)
         db.commit()
         db.refresh(db_user)
     return db_user
 
+# --- Refresh Tokens ---
+
+def create_refresh_token(db: Session, user_id: int, token_hash: str, family_id: str, expires_at: datetime.datetime):
+    token = models.RefreshToken(user_id=user_id, token_hash=token_hash, family_id=family_id, expires_at=expires_at)
+    db.add(token)
+    return token
+
+def get_refresh_token(db: Session, token_hash: str):
+    return db.query(models.RefreshToken).filter(models.RefreshToken.token_hash == token_hash).first()
+
+def mark_refresh_token_rotated(db: Session, token_id: int) -> bool:
+    """Conditional update, so of two concurrent uses of one token only one wins"""
+    return db.query(models.RefreshToken).filter(
+        models.RefreshToken.id == token_id,
+        models.RefreshToken.rotated_at == None,
+        models.RefreshToken.revoked_at == None
+    ).update({"rotated_at": datetime.datetime.utcnow()}, synchronize_session=False) == 1
+
+def revoke_refresh_family(db: Session, family_id: str):
+    db.query(models.RefreshToken).filter(
+        models.RefreshToken.family_id == family_id,
+        models.RefreshToken.revoked_at == None
+    ).update({"revoked_at": datetime.datetime.utcnow()}, synchronize_session=False)
+
+def revoke_user_refresh_tokens(db: Session, user_id: int):
+    db.query(models.RefreshToken).filter(
+        models.RefreshToken.user_id == user_id,
+        models.RefreshToken.revoked_at == None
+    ).update({"revoked_at": datetime.datetime.utcnow()}, synchronize_session=False)
+
+def delete_expired_refresh_tokens(db: Session, before: datetime.datetime) -> int:
+    return db.query(models.RefreshToken).filter(models.RefreshToken.expires_at < before).delete(synchronize_session=False)
+
 # --- Event Operations ---
 
-def get_events(db: Session, skip: int = 0, limit: int = 100, visibility: str = None):
-    query = db.query(models.Event)
+# Read-only stats exposed on the Event schema
+EVENT_STATS_FIELDS = ('registrations_count', 'average_rating', 'feedback_count')
+
+# Listing order; id makes it total so keyset cursors are stable. Matches the
+# ix_events_listing index column for column; position and date_time are NOT
+# NULL, so no COALESCE hides them from it.
+EVENT_ORDER = [
+    (models.Event.position, False),
+    (models.Event.date_time, True),
+    (models.Event.id, True),
+]
+
+def get_events(db: Session, cursor: str = None, limit: int = pagination.DEFAULT_PAGE_SIZE, visibility: str = None):
+    query = db.query(models.Event).options(*EVENT_LOAD)
     if visibility:
         # Simple logic: if visibility provided, filter. 
         # Real logic should check user permissions vs visibility, but for now:
         query = query.filter(models.Event.visibility == visibility)
     
-    query = query.outerjoin(models.Registration).group_by(models.Event.id)
-    
-    # Select Event and count of registrations
-    # Select Event and count of registrations + feedback stats
-    results = query.with_entities(
-        models.Event,
-        func.count(models.Registration.id).label('registrations_count'),
-        func.avg(models.Registration.feedback_rating).label('average_rating'),
-        func.count(models.Registration.feedback_rating).label('feedback_count')
-    ).order_by(models.Event.position.asc(), models.Event.date_time.desc()).offset(skip).limit(limit).all()
-
-    # Map back to Event objects with attributes set
-    events = []
-    for event, reg_count, avg_rating, fb_count in results:
-        event.registrations_count = reg_count
-        event.average_rating = float(avg_rating) if avg_rating else 0.0
-        event.feedback_count = fb_count
-        events.append(event)
-        
-    return events
+    # Registration and feedback stats are maintained counter columns on the event row
+    return pagination.paginate(query, EVENT_ORDER, cursor, limit)
 
 def reorder_events(db: Session, event_ids: list[int]):
     for index, e_id in enumerate(event_ids):
@@ -139,33 +171,16 @@ def reorder_events(db: Session, event_ids: list[int]):
     db.commit()
 
 def get_event(db: Session, event_id: int):
-    # Get event with sessions
-    event = db.query(models.Event).options(joinedload(models.Event.sessions)).filter(models.Event.id == event_id).first()
-    if event:
-        # Get count/stats separately
-        stats = db.query(
-            func.count(models.Registration.id).label('registrations_count'),
-            func.avg(models.Registration.feedback_rating).label('average_rating'),
-            func.count(models.Registration.feedback_rating).label('feedback_count')
-        ).filter(models.Registration.event_id == event_id).first()
-        
-        event.registrations_count = stats.registrations_count
-        event.average_rating = float(stats.average_rating) if stats.average_rating else 0.0
-        event.feedback_count = stats.feedback_count
-        
-    return event
+    # Get event with sessions (stats are counter columns on the event row)
+    return db.query(models.Event).options(joinedload(models.Event.sessions)).filter(models.Event.id == event_id).first()
 
 def create_event(db: Session, event: schemas.EventCreate, user_id: int):
     # Auto-assign next position
     max_pos = db.query(func.max(models.Event.position)).scalar() or 0
     
     event_dict = event.dict()
-    if 'registrations_count' in event_dict:
-        del event_dict['registrations_count']
-    if 'average_rating' in event_dict:
-        del event_dict['average_rating']
-    if 'feedback_count' in event_dict:
-        del event_dict['feedback_count']
+    for key in EVENT_STATS_FIELDS:
+        event_dict.pop(key, None)
         
     db_event = models.Event(**event_dict, created_by_id=user_id, position=max_pos + 1)
     db.add(db_event)
@@ -179,6 +194,12 @@ def update_event(db: Session, event_id: int, event_update: schemas.EventUpdate):
         return None
     
     update_data = event_update.dict(exclude_unset=True)
+    # Stats are maintained by the registration paths, never set by clients
+    for key in EVENT_STATS_FIELDS:
+        update_data.pop(key, None)
+    # The date can be moved but not cleared (the listing orders on it)
+    if "date_time" in update_data and update_data["date_time"] is None:
+        del update_data["date_time"]
     for key, value in update_data.items():
         setattr(db_event, key, value)
     
@@ -212,63 +233,109 @@ def create_event_session(db: Session, session: schemas.EventSessionCreate, event
 
 # --- Registration Operations ---
 
+def _waitlist_limit():
+    # User defined limit or default to 10% of capacity (minimum 2)
+    ten_percent = models.Event.registration_cap / 10
+    return func.coalesce(
+        models.Event.waitlist_limit,
+        case((ten_percent < 2, 2), else_=ten_percent)
+    )
+
+STATUS_COUNTERS = {
+    "confirmed": models.Event.confirmed_count,
+    "waitlisted": models.Event.waitlisted_count,
+    "pending": models.Event.pending_count,
+}
+
+def _adjust_event_counters(db: Session, event_id: int, deltas: dict):
+    """
+    Applies {counter column: delta} to an event in one UPDATE, inside the caller's
+    transaction. Callers pass Event columns, or a status key from STATUS_COUNTERS.
+    """
+    values = {}
+    for counter, delta in deltas.items():
+        counter = STATUS_COUNTERS.get(counter, counter)
+        if isinstance(counter, str) or not delta:
+            continue # Status without a counter (e.g. rejected)
+        values[counter] = counter + delta
+    if values:
+        db.query(models.Event).filter(models.Event.id == event_id).update(
+            values, synchronize_session=False
+        )
+
+def _reserve_seat(db: Session, event_id: int, rows: int = 1):
+    """
+    Reserves a confirmed seat (or failing that a waitlist slot) with a conditional
+    UPDATE on the event's counters. The UPDATE holds the event row lock until commit,
+    so concurrent registrations can never push the counters past the cap.
+    `rows` is added to registrations_count in the same statement.
+    Returns the status reserved, or None if nothing could be reserved.
+    """
+    Event = models.Event
+    no_approval = or_(Event.faculty_approval_required == False, Event.faculty_approval_required == None)
+    unlimited = or_(Event.registration_cap == None, Event.registration_cap == 0)
+
+    reserved = db.query(Event).filter(
+        Event.id == event_id,
+        no_approval,
+        or_(unlimited, Event.confirmed_count < Event.registration_cap)
+    ).update({
+        Event.confirmed_count: Event.confirmed_count + 1,
+        Event.registrations_count: Event.registrations_count + rows,
+    }, synchronize_session=False)
+    if reserved:
+        return "confirmed"
+
+    reserved = db.query(Event).filter(
+        Event.id == event_id,
+        no_approval,
+        Event.waitlisted_count < _waitlist_limit()
+    ).update({
+        Event.waitlisted_count: Event.waitlisted_count + 1,
+        Event.registrations_count: Event.registrations_count + rows,
+    }, synchronize_session=False)
+    if reserved:
+        return "waitlisted"
+
+    return None
+
 def register_user_for_event(db: Session, user_id: int, event_id: int, session_ids: list[int] = None):
-    # 1. Check Event
-    event = db.query(models.Event).get(event_id)
-    if not event: return None
-    
-    # 2. Check Capacity (Base Event)
-    confirmed_count = db.query(models.Registration).filter(
-        models.Registration.event_id == event_id,
-        models.Registration.status == "confirmed"
-    ).count()
-    
-    status = "confirmed"
-    if event.registration_cap and confirmed_count >= event.registration_cap:
-        status = "waitlisted"
-        
-        # User defined limit or default to 10% of capacity
-        limit = event.waitlist_limit
-        if limit is None and event.registration_cap:
-            limit = int(event.registration_cap * 0.10)
-            if limit < 2:
-                limit = 2
-        
-        # If limit is set (including 0 from calculation), enforce it
-        if limit is not None:
-            waitlist_count = db.query(models.Registration).filter(
-               models.Registration.event_id == event_id,
-               models.Registration.status == "waitlisted"
-            ).count()
-            if waitlist_count >= limit:
-                return None # Event and waitlist full
-
-    if event.faculty_approval_required and status != "rejected":
+    rows = 1 + len(session_ids or [])
+
+    # 1. Reserve a seat atomically (hot path: this UPDATE + the INSERT below)
+    status = _reserve_seat(db, event_id, rows)
+
+    if status is None:
+        # Either the event is missing, full, or requires faculty approval
+        event = db.query(models.Event).get(event_id)
+        if not event or not event.faculty_approval_required:
+            db.rollback()
+            return None # Event not found, or event and waitlist full
+
+        # Approval-required events don't hold a seat until approved,
+        # but still refuse once both the event and the waitlist are full
+        limit = db.query(_waitlist_limit()).filter(models.Event.id == event_id).scalar()
+        if event.registration_cap and (event.confirmed_count or 0) >= event.registration_cap \
+                and limit is not None and (event.waitlisted_count or 0) >= limit:
+            db.rollback()
+            return None
         status = "pending"
+        _adjust_event_counters(db, event_id, {
+            "pending": 1,
+            models.Event.registrations_count: rows,
+        })
+
+    # 2. Create Event Registration. The partial unique index on
+    # (user_id, event_id) WHERE session_id IS NULL rejects duplicates.
+    db_reg = models.Registration(
+        user_id=user_id,
+        event_id=event_id,
+        status=status,
+        session_id=None
+    )
+    db.add(db_reg)
 
-    # 3. Create Event Registration
-    # Check if already exists
-    existing = db.query(models.Registration).filter(
-        models.Registration.user_id == user_id, 
-        models.Registration.event_id == event_id,
-        models.Registration.session_id == None
-    ).first()
-
-    reg_to_return = existing
-    
-    if not existing:
-        db_reg = models.Registration(
-            user_id=user_id, 
-            event_id=event_id, 
-            status=status,
-            session_id=None
-        )
-        db.add(db_reg)
-        db.commit()
-        db.refresh(db_reg)
-        reg_to_return = db_reg
-    
-    # 4. Handle Sessions (if granular registration supported)
+    # 3. Handle Sessions (if granular registration supported)
     if session_ids:
         for sid in session_ids:
             # Check session existence/capacity? Ignoring for brevity
@@ -280,46 +347,159 @@ def register_user_for_event(db: Session, user_id: int, event_id: int, session_id
                  status="confirmed" # Simplified session logic
             )
             db.add(s_reg)
-        db.commit()
 
-    return reg_to_return
+    try:
+        db.commit()
+    except IntegrityError:
+        # Already registered: the rollback also releases the reserved seat
+        db.rollback()
+        return db.query(models.Registration).filter(
+            models.Registration.user_id == user_id,
+            models.Registration.event_id == event_id,
+            models.Registration.session_id == None
+        ).first()
+
+    db.refresh(db_reg)
+    return db_reg
 
 def delete_registration(db: Session, user_id: int, event_id: int):
+    regs = db.query(
+        models.Registration.session_id,
+        models.Registration.status,
+        models.Registration.feedback_rating
+    ).filter(
+        models.Registration.user_id == user_id,
+        models.Registration.event_id == event_id
+    ).all()
+
     # Delete primary registration
     db.query(models.Registration).filter(
         models.Registration.user_id == user_id, 
         models.Registration.event_id == event_id
     ).delete()
+
+    # Release the seat held by the main registration and drop its stats
+    deltas = {models.Event.registrations_count: -len(regs)}
+    for session_id, status, rating in regs:
+        if session_id is None and status in STATUS_COUNTERS:
+            deltas[status] = -1
+        if rating is not None:
+            deltas[models.Event.feedback_count] = deltas.get(models.Event.feedback_count, 0) - 1
+            deltas[models.Event.rating_sum] = deltas.get(models.Event.rating_sum, 0) - rating
+    _adjust_event_counters(db, event_id, deltas)
     db.commit()
     return True
 
-def get_event_registrations(db: Session, event_id: int):
+def approve_registrations(db: Session, registration_ids: list[int]):
+    # Count what is moving into "confirmed" per event so the seat counters follow
+    moving = db.query(
+        models.Registration.event_id,
+        models.Registration.status,
+        func.count(models.Registration.id)
+    ).filter(
+        models.Registration.id.in_(registration_ids),
+        models.Registration.session_id == None,
+        models.Registration.status != "confirmed"
+    ).group_by(models.Registration.event_id, models.Registration.status).all()
+
+    # Update all to confirmed
+    db.query(models.Registration).filter(
+        models.Registration.id.in_(registration_ids)
+    ).update({"status": "confirmed"}, synchronize_session=False)
+
+    for event_id, status, count in moving:
+        _adjust_event_counters(db, event_id, {status: -count, "confirmed": count})
+    db.commit()
+    return len(registration_ids)
+
+REGISTRATION_ORDER = [(models.Registration.id, False)]
+
+def get_event_registrations(db: Session, event_id: int, cursor: str = None, limit: int = None,
+                            load=REGISTRATION_DETAIL_LOAD):
     # Retrieve only main event registrations (session_id is None)
-    return db.query(models.Registration).filter(
+    query = db.query(models.Registration).options(*load).filter(
         models.Registration.event_id == event_id, 
         models.Registration.session_id == None
-    ).all()
+    )
+    return pagination.paginate(query, REGISTRATION_ORDER, cursor, limit)
 
 # --- Other Operations ---
 
 def add_student_skill(db: Session, user_id: int, skill_name: str):
     skill = models.StudentProfileSkill(user_id=user_id, skill_name=skill_name)
     db.add(skill)
+    search_index.refresh_student(db, user_id)
     db.commit()
     return skill
 
 def remove_student_skill(db: Session, user_id: int, skill_id: int):
     db.query(models.StudentProfileSkill).filter(models.StudentProfileSkill.id == skill_id).delete()
+    search_index.refresh_student(db, user_id)
     db.commit()
     return True
 
-def create_resume_record(db: Session, user_id: int, file_path: str, file_name_original: str):
+def _acquire_resume_blob(db: Session, sha256: str, file_path: str, size_bytes: int):
+    """Registers the blob if it's new and takes a reference on it"""
+    now = datetime.datetime.utcnow()
+    insert = sqlite_insert if db.get_bind().dialect.name == "sqlite" else pg_insert
+    db.execute(
+        insert(models.ResumeBlob)
+        .values(sha256=sha256, path=file_path, size_bytes=size_bytes, ref_count=0, created_at=now, referenced_at=now)
+        .on_conflict_do_nothing(index_elements=["sha256"])
+    )
+    db.query(models.ResumeBlob).filter(models.ResumeBlob.sha256 == sha256).update(
+        {"ref_count": models.ResumeBlob.ref_count + 1, "referenced_at": now}, synchronize_session=False
+    )
+
+def reserve_resume_blob(db: Session, sha256: str, file_path: str, size_bytes: int):
+    """
+    Takes (and commits) the reference for an upload before its file is trusted:
+    once committed, GC can no longer delete the blob. The reference belongs to
+    the Resume row created next with create_resume_record(blob_reserved=True);
+    if that never happens, gc_resume_blobs.py's recount drops it.
+    """
+    _acquire_resume_blob(db, sha256, file_path, size_bytes)
+    db.commit()
+
+def release_resume_blob(db: Session, sha256: str):
+    """Drops a reference; the file itself is reclaimed later by gc_resume_blobs.py"""
+    if not sha256:
+        return
+    db.query(models.ResumeBlob).filter(
+        models.ResumeBlob.sha256 == sha256,
+        models.ResumeBlob.ref_count > 0
+    ).update({"ref_count": models.ResumeBlob.ref_count - 1}, synchronize_session=False)
+
+def create_resume_record(db: Session, user_id: int, file_path: str, file_name_original: str, sha256: str = None, size_bytes: int = None,
+                         blob_reserved: bool = False):
     db.query(models.Resume).filter(models.Resume.user_id == user_id).update({"is_active": False})
-    db_resume = models.Resume(user_id=user_id, file_path=file_path, file_name_original=file_name_original, is_active=True)
+    db_resume = models.Resume(
+        user_id=user_id, file_path=file_path, file_name_original=file_name_original, is_active=True,
+        sha256=sha256, size_bytes=size_bytes
+    )
+    if sha256:
+        if not blob_reserved:
+            _acquire_resume_blob(db, sha256, file_path, size_bytes)
+        # Same content was extracted before: reuse the text instead of another pass
+        extracted = db.query(models.Resume).filter(
+            models.Resume.sha256 == sha256,
+            models.Resume.extraction_status == "done"
+        ).first()
+        if extracted:
+            db_resume.content_text = extracted.content_text
+            db_resume.page_count = extracted.page_count
+            db_resume.extracted_at = extracted.extracted_at
+            db_resume.extraction_status = "done"
     db.add(db_resume)
+    search_index.refresh_student(db, user_id)
     db.commit()
     return db_resume
 
+def get_user_registrations(db: Session, user_id: int):
+    return db.query(models.Registration).options(*REGISTRATION_LOAD).filter(
+        models.Registration.user_id == user_id
+    ).all()
+
 def get_active_resume(db: Session, user_id: int):
     return db.query(models.Resume).filter(models.Resume.user_id == user_id, models.Resume.is_active == True).first()
 
@@ -327,11 +507,29 @@ def create_feedback(db: Session, feedback: schemas.FeedbackCreate, registration_
     # db_feedback = models.Feedback(**feedback.dict(), registration_id=registration_id)
     # db.add(db_feedback)
     
-    # Update Registration directly
-    db.query(models.Registration).filter(models.Registration.id == registration_id).update({
+    # Update Registration directly. Only the first submission is stored, so the
+    # event's feedback counters only ever move by one rating: None if feedback
+    # was already submitted (e.g. by a concurrent request)
+    updated = db.query(models.Registration).filter(
+        models.Registration.id == registration_id,
+        models.Registration.feedback_rating == None
+    ).update({
         "feedback_rating": feedback.rating,
         "feedback_comments": feedback.comments
-    })
+    }, synchronize_session=False)
+
+    if not updated:
+        db.rollback()
+        return None
+
+    if feedback.rating is not None:
+        event_id = db.query(models.Registration.event_id).filter(
+            models.Registration.id == registration_id
+        ).scalar()
+        _adjust_event_counters(db, event_id, {
+            models.Event.feedback_count: 1,
+            models.Event.rating_sum: feedback.rating,
+        })
     
     db.commit()
     return {"message": "Feedback submitted successfully"}
@@ -342,40 +540,42 @@ def create_judge_rating(db: Session, rating: schemas.JudgeRatingCreate, judge_id
     db.commit()
     return db_rating
 
-def get_event_registrations_filtered(db: Session, event_id: int, skill_query: str = None, resume_query: str = None):
-    query = db.query(models.Registration).join(models.User).filter(
+def get_event_registrations_filtered(db: Session, event_id: int, skill_query: str = None, resume_query: str = None,
+                                     cursor: str = None, limit: int = None, load=REGISTRATION_DETAIL_LOAD):
+    query = db.query(models.Registration).options(*load).filter(
         models.Registration.event_id == event_id,
         models.Registration.session_id == None
     )
-    if skill_query:
-        query = query.join(models.StudentProfileSkill, models.User.id == models.StudentProfileSkill.user_id)\
-                     .filter(models.StudentProfileSkill.skill_name.ilike(f"%{skill_query}%"))
-    
-    if resume_query:
-        # Search against Name, Major, OR Skills (and resume text if available)
-        # We need an OR condition across these joined tables.
-        # This requires careful joining.
-        from sqlalchemy import or_
-        
-        # Ensure we have access to Skills and Resume tables in the query if we filter on them
-        # Note: Left Outer Joins might be safer if we want to find a user by name even if they have no skills/resume
-        # But for 'resume search' implied context, maybe we assume they have a resume? 
-        # The prompt says "Search resumes", but users expect to find people.
-        # Let's use left joins to be safe and inclusive.
-        
-        query = query.outerjoin(models.StudentProfileSkill, models.User.id == models.StudentProfileSkill.user_id)\
-                     .outerjoin(models.Resume, (models.Resume.user_id == models.User.id) & (models.Resume.is_active == True))
-        
-        query = query.filter(
-            or_(
-                models.User.name.ilike(f"%{resume_query}%"),
-                models.User.major.ilike(f"%{resume_query}%"),
-                models.StudentProfileSkill.skill_name.ilike(f"%{resume_query}%"),
-                models.Resume.content_text.ilike(f"%{resume_query}%")
-            )
-        ).distinct() # distinct needed because joining one-to-many (skills) can produce duplicates
-                     
-    return query.all()
+
+    # Full-text search over name, major, skills and resume text (see search_index)
+    matches = search_index.ranked_matches(db, q=resume_query, skill=skill_query)
+    if matches is None:
+        return pagination.paginate(query, REGISTRATION_ORDER, cursor, limit)
+
+    # Best matches first; id keeps the ordering total for the cursor. Ordering and
+    # cursor use the integer rank_key: a float rank can't round-trip exactly.
+    query = query.join(matches, matches.c.user_id == models.Registration.user_id).add_columns(
+        matches.c.rank, matches.c.rank_key
+    )
+    order = [(matches.c.rank_key, True), (models.Registration.id, False)]
+    rows = pagination.paginate(query, order, cursor, limit, key=lambda row: [row.rank_key, row[0].id])
+
+    snippets = search_index.highlights(db, [reg.user_id for reg, _, _ in rows], resume_query)
+    for reg, rank, _ in rows:
+        reg.search_rank = rank
+        reg.search_highlight = snippets.get(reg.user_id)
+    return pagination.Page([reg for reg, _, _ in rows], rows.next_cursor)
+
+def get_confirmed_recipients(db: Session, event_id: int):
+    """(registration_id, email, name) rows for confirmed attendees, in one joined query"""
+    return db.query(models.Registration.id, models.User.email, models.User.name).join(
+        models.User, models.User.id == models.Registration.user_id
+    ).filter(
+        models.Registration.event_id == event_id,
+        models.Registration.session_id == None,
+        models.Registration.status == "confirmed",
+        models.User.email != None
+    ).order_by(models.Registration.id).all()
 
 def get_all_users(db: Session):
     return db.query(models.User).all()
@@ -0,0 +1,289 @@
+"""
+Persistent email outbox.
+
+Bulk senders insert rows into email_outbox (in the same transaction as
+whatever triggered them) and return immediately. One asyncio worker, started
+with the app, claims due rows in batches and sends them over a small pool of
+persistent SMTP connections instead of opening a TLS session per message.
+Failures are retried with exponential backoff; after MAX_ATTEMPTS a message
+is marked 'dead' and left for inspection.
+
+Bulk sends go through send_bulk(), which records an EmailJob so callers get
+a job id back immediately and can poll job_progress(). Fan-out concurrency
+is the SMTP pool size (EMAIL_SMTP_CONNECTIONS).
+
+Claiming sets status='sending' plus a lease (next_attempt_at in the future),
+so rows held by a worker that crashed become claimable again on their own.
+"""
+import asyncio
+import datetime
+import logging
+import os
+import uuid
+from collections import deque
+from email.mime.text import MIMEText
+from email.utils import formataddr
+import aiosmtplib
+from sqlalchemy import and_, event, func, insert, or_, select
+from database import SessionLocal
+from email_utils import conf
+import models, crud, email_utils, notifications
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = int(os.getenv("EMAIL_OUTBOX_BATCH_SIZE", 200))
+SMTP_CONNECTIONS = int(os.getenv("EMAIL_SMTP_CONNECTIONS", 4))
+MAX_ATTEMPTS = int(os.getenv("EMAIL_MAX_ATTEMPTS", 5))
+RETRY_BASE_SECONDS = int(os.getenv("EMAIL_RETRY_SECONDS", 30))
+POLL_SECONDS = float(os.getenv("EMAIL_OUTBOX_POLL_SECONDS", 5))
+LEASE_SECONDS = 300
+# Reconnect periodically; many servers cap messages per session
+MESSAGES_PER_CONNECTION = 100
+
+_loop = None
+_wakeup = None
+_task = None
+
+# --- Producer side ---
+
+def enqueue(db, recipient: str, subject: str, body_html: str, kind: str):
+    return enqueue_many(db, [{"recipient": recipient, "subject": subject, "body_html": body_html, "kind": kind}])
+
+def enqueue_many(db, messages: list) -> int:
+    """
+    Adds messages (dicts with recipient, subject, body_html, kind) in one
+    multi-row insert. The caller commits; the worker is woken after commit.
+    """
+    if not messages:
+        return 0
+    now = datetime.datetime.utcnow()
+    db.execute(insert(models.EmailOutbox), [
+        {**message, "status": "pending", "attempts": 0, "next_attempt_at": now, "created_at": now}
+        for message in messages
+    ])
+    event.listen(db, "after_commit", lambda session: wake(), once=True)
+    return len(messages)
+
+def send_bulk(db, kind: str, messages: list, event_id: int = None, created_by: int = None) -> models.EmailJob:
+    """
+    Queues messages (dicts with recipient, subject, body_html) as one job and
+    returns it. The caller commits.
+    """
+    job = models.EmailJob(id=uuid.uuid4().hex, kind=kind, event_id=event_id, total=len(messages), created_by=created_by)
+    db.add(job)
+    db.flush()
+    enqueue_many(db, [{**message, "kind": kind, "job_id": job.id} for message in messages])
+    return job
+
+def job_progress(db, job: models.EmailJob) -> dict:
+    counts = dict(db.query(models.EmailOutbox.status, func.count(models.EmailOutbox.id)).filter(
+        models.EmailOutbox.job_id == job.id
+    ).group_by(models.EmailOutbox.status).all())
+    sent, dead = counts.get("sent", 0), counts.get("dead", 0)
+    return {
+        "job_id": job.id,
+        "event_id": job.event_id,
+        "kind": job.kind,
+        "total": job.total,
+        "pending": counts.get("pending", 0),
+        "sending": counts.get("sending", 0),
+        "sent": sent,
+        "dead": dead,
+        "done": sent + dead >= job.total,
+        "created_at": job.created_at,
+    }
+
+def queue_feedback_requests(db, event: models.Event, created_by: int = None) -> models.EmailJob:
+    """
+    Feedback requests for every confirmed attendee, shared by the manual
+    endpoint and the scheduler. Marks the event as sent; the caller commits.
+    """
+    recipients = crud.get_confirmed_recipients(db, event.id)
+    rendered = notifications.render_batch("feedback_request", [
+        {"student_name": name, "feedback_link": email_utils.feedback_link(registration_id)}
+        for registration_id, _, name in recipients
+    ], event_title=event.title)
+    messages = [
+        {"recipient": email, "subject": subject, "body_html": html}
+        for (_, email, _), (subject, html) in zip(recipients, rendered)
+    ]
+    job = send_bulk(db, "feedback_request", messages, event_id=event.id, created_by=created_by)
+    event.feedback_email_sent = True
+    return job
+
+def wake():
+    """Thread-safe nudge so new rows go out without waiting for the next poll"""
+    if _loop is not None and _wakeup is not None:
+        _loop.call_soon_threadsafe(_wakeup.set)
+
+def status_counts(db) -> dict:
+    return dict(db.query(models.EmailOutbox.status, func.count(models.EmailOutbox.id)).group_by(
+        models.EmailOutbox.status
+    ).all())
+
+# --- Worker: database side (runs in threads) ---
+
+def _claim_batch(limit: int) -> list:
+    token = uuid.uuid4().hex
+    now = datetime.datetime.utcnow()
+    Outbox = models.EmailOutbox
+    claimable = or_(
+        and_(Outbox.status == "pending", Outbox.next_attempt_at <= now),
+        and_(Outbox.status == "sending", Outbox.next_attempt_at <= now), # expired lease
+    )
+    db = SessionLocal()
+    try:
+        due = select(Outbox.id).where(claimable).order_by(Outbox.next_attempt_at, Outbox.id).limit(limit)
+        db.query(Outbox).filter(Outbox.id.in_(due.scalar_subquery()), claimable).update({
+            "status": "sending",
+            "claim_token": token,
+            "next_attempt_at": now + datetime.timedelta(seconds=LEASE_SECONDS),
+        }, synchronize_session=False)
+        db.commit()
+        rows = db.query(
+            Outbox.id, Outbox.recipient, Outbox.subject, Outbox.body_html, Outbox.attempts
+        ).filter(Outbox.claim_token == token, Outbox.status == "sending").all()
+        return [row._asdict() for row in rows]
+    finally:
+        db.close()
+
+def _record_results(sent_ids: list, failures: list):
+    """failures: (id, attempts_before, error) tuples"""
+    now = datetime.datetime.utcnow()
+    Outbox = models.EmailOutbox
+    db = SessionLocal()
+    try:
+        if sent_ids:
+            db.query(Outbox).filter(Outbox.id.in_(sent_ids)).update({
+                "status": "sent", "sent_at": now, "attempts": Outbox.attempts + 1,
+                "claim_token": None, "last_error": None,
+            }, synchronize_session=False)
+        for message_id, attempts, error in failures:
+            attempts += 1
+            values = {"attempts": attempts, "claim_token": None, "last_error": error[:1000]}
+            if attempts >= MAX_ATTEMPTS:
+                values["status"] = "dead"
+                logger.error(f"Email {message_id} is dead after {attempts} attempts: {error}")
+            else:
+                values["status"] = "pending"
+                values["next_attempt_at"] = now + datetime.timedelta(seconds=RETRY_BASE_SECONDS * 2 ** (attempts - 1))
+            db.query(Outbox).filter(Outbox.id == message_id).update(values, synchronize_session=False)
+        db.commit()
+    finally:
+        db.close()
+
+# --- Worker: SMTP side ---
+
+def _build_message(row: dict) -> MIMEText:
+    # compat32 MIMEText: the default-policy EmailMessage header parsing
+    # dominated CPU time in bulk sends
+    message = MIMEText(row["body_html"], "html", "utf-8")
+    message["From"] = formataddr((conf.MAIL_FROM_NAME or "", conf.MAIL_FROM))
+    message["To"] = row["recipient"]
+    message["Subject"] = row["subject"]
+    return message
+
+class _Connection:
+    """One persistent SMTP session, reopened on demand"""
+    def __init__(self):
+        self.smtp = None
+        self.sent = 0
+
+    async def _connect(self):
+        await self.close()
+        credentials = {}
+        if conf.USE_CREDENTIALS:
+            credentials = {"username": conf.MAIL_USERNAME, "password": conf.MAIL_PASSWORD.get_secret_value()}
+        self.smtp = aiosmtplib.SMTP(
+            hostname=conf.MAIL_SERVER, port=conf.MAIL_PORT, use_tls=conf.MAIL_SSL_TLS,
+            start_tls=conf.MAIL_STARTTLS, validate_certs=conf.VALIDATE_CERTS, timeout=conf.TIMEOUT,
+            **credentials
+        )
+        await self.smtp.connect()
+        self.sent = 0
+
+    async def send(self, message: MIMEText):
+        if self.smtp is None or not self.smtp.is_connected or self.sent >= MESSAGES_PER_CONNECTION:
+            await self._connect()
+        try:
+            await self.smtp.send_message(message)
+        except aiosmtplib.SMTPResponseException as e:
+            # The server rejected this message; the session itself is still usable
+            if e.code == 421:
+                await self.close()
+            raise
+        except Exception:
+            await self.close()
+            raise
+        self.sent += 1
+
+    async def close(self):
+        if self.smtp is not None:
+            try:
+                if self.smtp.is_connected:
+                    await self.smtp.quit()
+            except Exception:
+                self.smtp.close()
+            self.smtp = None
+
+async def _send_batch(connections, batch):
+    pending = deque(batch)
+    sent, failures = [], []
+
+    async def drain(connection):
+        while pending:
+            row = pending.popleft()
+            try:
+                await connection.send(_build_message(row))
+                sent.append(row["id"])
+            except Exception as e:
+                failures.append((row["id"], row["attempts"], str(e) or type(e).__name__))
+
+    await asyncio.gather(*(drain(connection) for connection in connections))
+    return sent, failures
+
+async def _run():
+    connections = [_Connection() for _ in range(SMTP_CONNECTIONS)]
+    try:
+        while True:
+            try:
+                _wakeup.clear()
+                batch = await asyncio.to_thread(_claim_batch, BATCH_SIZE)
+                if not batch:
+                    try:
+                        await asyncio.wait_for(_wakeup.wait(), POLL_SECONDS)
+                    except asyncio.TimeoutError:
+                        pass
+                    continue
+                sent, failures = await _send_batch(connections, batch)
+                await asyncio.to_thread(_record_results, sent, failures)
+                logger.info(f"Email outbox: sent {len(sent)}, failed {len(failures)}")
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Email outbox worker error: {e}")
+                await asyncio.sleep(POLL_SECONDS)
+    finally:
+        for connection in connections:
+            await connection.close()
+
+def start():
+    """Starts the worker on the running event loop (call from app startup)"""
+    global _loop, _wakeup, _task
+    if _task is not None:
+        return
+    _loop = asyncio.get_running_loop()
+    _wakeup = asyncio.Event()
+    _task = _loop.create_task(_run())
+    logger.info("Email outbox worker started.")
+
+async def stop():
+    global _loop, _wakeup, _task
+    if _task is None:
+        return
+    _task.cancel()
+    try:
+        await _task
+    except asyncio.CancelledError:
+        pass
+    _loop = _wakeup = _task = None
@@ -1,6 +1,6 @@
 import os
 from fastapi_mail import FastMail, MessageSchema, ConnectionConfig, MessageType
-import google.generativeai as genai
+import llm_content, notifications
 from pydantic import EmailStr, BaseModel
 from typing import List
 
@@ -16,24 +16,16 @@ conf = ConnectionConfig(
     MAIL_FROM_NAME=os.getenv("MAIL_FROM_NAME", "CMIS Admin"),
     MAIL_STARTTLS=os.getenv("MAIL_STARTTLS", "True") == "True",
     MAIL_SSL_TLS=os.getenv("MAIL_SSL_TLS", "False") == "True",
-    USE_CREDENTIALS=True,
+    USE_CREDENTIALS=os.getenv("MAIL_USE_CREDENTIALS", "True") == "True",
     VALIDATE_CERTS=True
 )
 
 async def send_verification_email(email: EmailStr, token: str):
-    verification_link = f"http://localhost:8000/auth/verify?token={token}"
-    
-    html = f"""
-    <h3>Verify your account</h3>
-    <p>Thanks for registering with CMIS.</p>
-    <p>Please click the link below to verify your account:</p>
-    <p><a href="{verification_link}">{verification_link}</a></p>
-    <br>
-    <p>If you did not register, please ignore this email.</p>
-    """
+    verification_link = f"{notifications.BACKEND_URL}/auth/verify?token={token}"
+    subject, html = notifications.render("account_verification", verification_link=verification_link)
 
     message = MessageSchema(
-        subject="Verify your CMIS Account",
+        subject=subject,
         recipients=[email],
         body=html,
         subtype=MessageType.html
@@ -48,64 +40,18 @@ async def send_verification_email(email: EmailStr, token: str):
         print(f"Error sending email: {e}")
         return False
 
-async def send_event_registration_email(email: EmailStr, event_title: str, student_name: str = "Student"):
-    
-    # Try using Gemini for personalized content
-    import random
-    
-    # Get all keys, split by comma, and strip whitespace
-    api_keys_str = os.getenv("GEMINI_API_KEYS", "")
-    api_keys = [k.strip() for k in api_keys_str.split(",") if k.strip()]
-    
-    # Fallback to single key if no list provided
-    if not api_keys:
-        single_key = os.getenv("GEMINI_API_KEY")
-        if single_key:
-            api_keys.append(single_key)
-            
-    # Select a random key if available
-    api_key = random.choice(api_keys) if api_keys else None
-    
+async def send_event_registration_email(email: EmailStr, event_title: str, student_name: str = "Student", event_id: int = None):
+    # AI-personalized body from llm_content's per-event cache (waits at most LLM_TIMEOUT_SECONDS)
     ai_content = None
-    
-    if api_key:
-        try:
-            genai.configure(api_key=api_key)
-            model = genai.GenerativeModel('gemini-flash-latest')
-            prompt = f"""
-            Write a short, warm, and professional HTML email body for a student named '{student_name}' who just registered for the event '{event_title}'.
-            
-            Requirements:
-            - Congratulate them on registering.
-            - Mention the event title clearly.
-            - Use a friendly and encouraging tone.
-            - Keep it brief (under 100 words).
-            - Output ONLY the HTML body content (do not include <html> or <body> tags, just the inner elements like <p>, <h3>, etc).
-            - Sign off as 'The CMIS Team'.
-            """
-            response = model.generate_content(prompt)
-            ai_content = response.text
-            # Cleanup potential markdown code blocks if Gemini adds them
-            ai_content = ai_content.replace("```html", "").replace("```", "")
-        except Exception as e:
-            print(f"Gemini generation failed with key starting {api_key[:5]}...: {e}")
+    if event_id is not None:
+        ai_content = await llm_content.registration_body(event_id, event_title, student_name)
 
+    subject, html = notifications.render("registration_confirm", event_title=event_title, student_name=student_name)
     if ai_content:
         html = ai_content
-    else:
-        # Fallback Template
-        html = f"""
-        <h3>Event Registration Confirmed</h3>
-        <p>Hello {student_name},</p>
-        <p>You have successfully registered for the event: <strong>{event_title}</strong>.</p>
-        <p>We look forward to seeing you there!</p>
-        <br>
-        <p>Best regards,</p>
-        <p>The CMIS Team</p>
-        """
 
     message = MessageSchema(
-        subject=f"Registration Confirmed: {event_title}",
+        subject=subject,
         recipients=[email],
         body=html,
         subtype=MessageType.html
@@ -120,22 +66,22 @@ async def send_event_registration_email(email: EmailStr, event_title: str, stude
         print(f"Error sending registration email: {e}")
         return False
 
-async def send_feedback_request_email(email: EmailStr, event_title: str, registration_id: int):
+def render_feedback_request(event_title: str, registration_id: int, student_name: str = None):
+    """Returns (subject, html) for a feedback request"""
+    return notifications.render(
+        "feedback_request", event_title=event_title, student_name=student_name,
+        feedback_link=feedback_link(registration_id)
+    )
+
+def feedback_link(registration_id: int) -> str:
     # Feedback Link (pointing to frontend)
-    feedback_link = f"http://localhost:3000/feedback/{registration_id}"
-    
-    html = f"""
-    <h3>We'd love your feedback!</h3>
-    <p>You recently attended <strong>{event_title}</strong>.</p>
-    <p>Please take a moment to share your thoughts:</p>
-    <p><a href="{feedback_link}">Give Feedback</a></p>
-    <br>
-    <p>Best regards,</p>
-    <p>The CMIS Team</p>
-    """
+    return f"{notifications.FRONTEND_URL}/feedback/{registration_id}"
+
+async def send_feedback_request_email(email: EmailStr, event_title: str, registration_id: int, student_name: str = None):
+    subject, html = render_feedback_request(event_title, registration_id, student_name)
     
     message = MessageSchema(
-        subject=f"Feedback Request: {event_title}",
+        subject=subject,
         recipients=[email],
         body=html,
         subtype=MessageType.html
@@ -144,26 +90,18 @@ async def send_feedback_request_email(email: EmailStr, event_title: str, registr
     fm = FastMail(conf)
     try:
         await fm.send_message(message)
-        print(f"[MOCK EMAIL] Sending feedback request to {email} for event '{event_title}'. Link: {feedback_link}")
+        print(f"[MOCK EMAIL] Sending feedback request to {email} for event '{event_title}'. Link: {feedback_link(registration_id)}")
         return True
     except Exception as e:
         print(f"Error sending feedback email: {e}")
         return False
 
 async def send_reset_password_email(email: EmailStr, token: str):
-    reset_link = f"http://localhost:3000/reset-password?token={token}"
-    
-    html = f"""
-    <h3>Password Reset Request</h3>
-    <p>We received a request to reset your password.</p>
-    <p>Click the link below to reset it:</p>
-    <p><a href="{reset_link}">Reset Password</a></p>
-    <br>
-    <p>If you didn't ask for this, you can ignore this email.</p>
-    """
+    reset_link = f"{notifications.FRONTEND_URL}/reset-password?token={token}"
+    subject, html = notifications.render("password_reset", reset_link=reset_link)
 
     message = MessageSchema(
-        subject="Reset Your Password",
+        subject=subject,
         recipients=[email],
         body=html,
         subtype=MessageType.html
@@ -178,19 +116,15 @@ async def send_reset_password_email(email: EmailStr, token: str):
         print(f"Error sending password reset email: {e}")
         return False
 
+def render_guest_invitation(event_title: str):
+    """Returns (subject, html) for a guest invitation"""
+    return notifications.render("guest_invite", event_title=event_title)
+
 async def send_guest_invitation_email(email: EmailStr, event_title: str):
-    html = f"""
-    <h3>You are invited!</h3>
-    <p>We are pleased to invite you to: <strong>{event_title}</strong>.</p>
-    <p>Please consider this email as your formal invitation.</p>
-    <p>We look forward to seeing you there!</p>
-    <br>
-    <p>Best regards,</p>
-    <p>The CMIS Team</p>
-    """
+    subject, html = render_guest_invitation(event_title)
 
     message = MessageSchema(
-        subject=f"Invitation: {event_title}",
+        subject=subject,
         recipients=[email],
         body=html,
         subtype=MessageType.html
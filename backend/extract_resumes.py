@@ -0,0 +1,35 @@
+"""
+Backfills resume text: resets failed/stuck extractions to pending and runs
+them through the resume_worker process pool, waiting for the results.
+"""
+from concurrent.futures import wait
+import database, models, resume_worker
+
+def extract_resumes():
+    db = database.SessionLocal()
+    try:
+        reset = db.query(models.Resume).filter(
+            models.Resume.extraction_status.in_(["failed", "processing"])
+        ).update({"extraction_status": "pending", "extraction_attempts": 0, "extraction_next_attempt_at": None},
+                 synchronize_session=False)
+        db.commit()
+        if reset:
+            print(f"Reset {reset} failed/stuck resumes to pending")
+    finally:
+        db.close()
+
+    futures = resume_worker.requeue_pending()
+    print(f"Extracting {len(futures)} resumes with {resume_worker.MAX_WORKERS} workers...")
+    wait(futures)
+
+    db = database.SessionLocal()
+    try:
+        done = db.query(models.Resume).filter(models.Resume.extraction_status == "done").count()
+        failed = db.query(models.Resume).filter(models.Resume.extraction_status == "failed").count()
+        print(f"Done: {done}, failed: {failed}")
+    finally:
+        db.close()
+    resume_worker.shutdown()
+
+if __name__ == "__main__":
+    extract_resumes()
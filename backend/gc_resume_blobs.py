@@ -0,0 +1,174 @@
+"""
+Reclaims resume storage.
+
+1. Recounts ResumeBlob.ref_count from the Resume rows (user deletes cascade
+   to resumes without going through crud, so counters can drift).
+2. Deletes blobs with no references, plus stray files in the blob store and
+   legacy per-upload files under data/resumes that no Resume row points at.
+   Anything referenced or written within GRACE_PERIOD is left alone, so
+   in-flight uploads (which hold a reference before their Resume row is
+   committed) aren't collected.
+3. Prints a storage report (logical vs physical bytes).
+
+Running alongside uploads is safe: a blob row is deleted only while
+ref_count is 0 (uploads take their reference first), and its file is moved
+aside and unlinked only if no upload has registered the blob again since;
+otherwise the file is put back.
+
+Usage: python gc_resume_blobs.py [--dry-run]
+"""
+import datetime
+import os
+import sys
+import time
+from sqlalchemy import func, or_
+import database, models
+from resume_storage import RESUME_DIR, BLOB_DIR
+
+GRACE_PERIOD = datetime.timedelta(hours=1)
+
+def recount(db, cutoff=None):
+    """
+    Resets ref_count to the number of Resume rows. Blobs referenced after
+    `cutoff` are skipped (an upload's reference precedes its Resume row), and
+    each fix only applies if ref_count hasn't changed since it was read.
+    """
+    counts = dict(db.query(models.Resume.sha256, func.count(models.Resume.id)).filter(
+        models.Resume.sha256 != None
+    ).group_by(models.Resume.sha256).all())
+    blobs = db.query(models.ResumeBlob.sha256, models.ResumeBlob.ref_count)
+    if cutoff is not None:
+        blobs = blobs.filter(or_(models.ResumeBlob.referenced_at == None, models.ResumeBlob.referenced_at < cutoff))
+    fixed = 0
+    for sha256, ref_count in blobs.all():
+        actual = counts.get(sha256, 0)
+        if ref_count != actual:
+            fixed += db.query(models.ResumeBlob).filter(
+                models.ResumeBlob.sha256 == sha256,
+                models.ResumeBlob.ref_count == ref_count
+            ).update({"ref_count": actual}, synchronize_session=False)
+    db.flush()
+    return fixed
+
+def storage_report(db):
+    resumes, logical_bytes = db.query(
+        func.count(models.Resume.id), func.coalesce(func.sum(models.Resume.size_bytes), 0)
+    ).filter(models.Resume.sha256 != None).one()
+    blobs, physical_bytes = db.query(
+        func.count(models.ResumeBlob.sha256), func.coalesce(func.sum(models.ResumeBlob.size_bytes), 0)
+    ).filter(models.ResumeBlob.ref_count > 0).one()
+    return {
+        "resumes": resumes,
+        "unique_blobs": blobs,
+        "logical_bytes": logical_bytes,
+        "physical_bytes": physical_bytes,
+        "bytes_saved": logical_bytes - physical_bytes,
+    }
+
+def _old_enough(path, cutoff):
+    return os.path.getmtime(path) < cutoff
+
+def _remove(path, dry_run):
+    size = os.path.getsize(path)
+    if not dry_run:
+        os.remove(path)
+    return size
+
+def _unlink_blob(db, blob) -> int:
+    """
+    Removes the file of a blob whose row was just deleted (and committed).
+    An upload may have registered the same content again in the meantime and
+    be about to reuse the file, so the file is moved aside first and only
+    unlinked if no blob row has reappeared; otherwise it is put back.
+    Returns the bytes reclaimed.
+    """
+    parked = f"{blob.path}.gc"
+    try:
+        os.replace(blob.path, parked)
+    except FileNotFoundError:
+        return 0
+    reappeared = db.query(models.ResumeBlob.sha256).filter(models.ResumeBlob.sha256 == blob.sha256).first()
+    db.rollback()
+    if reappeared:
+        os.replace(parked, blob.path) # Same content, so replacing an upload's new copy is harmless
+        return 0
+    return _remove(parked, False)
+
+def collect(dry_run: bool = False):
+    db = database.SessionLocal()
+    cutoff_dt = datetime.datetime.utcnow() - GRACE_PERIOD
+    cutoff_ts = time.time() - GRACE_PERIOD.total_seconds()
+    reclaimed = files_removed = 0
+    try:
+        fixed = recount(db, cutoff_dt)
+        print(f"Recounted blob references ({fixed} corrected)")
+        if dry_run:
+            db.rollback()
+        else:
+            db.commit()
+
+        # 1. Unreferenced blobs
+        idle = or_(models.ResumeBlob.referenced_at == None, models.ResumeBlob.referenced_at < cutoff_dt)
+        dead = db.query(models.ResumeBlob).filter(
+            models.ResumeBlob.ref_count == 0,
+            models.ResumeBlob.created_at < cutoff_dt,
+            idle
+        ).all()
+        db.expunge_all()
+        for blob in dead:
+            print(f" - Unreferenced blob {blob.sha256[:12]} ({blob.size_bytes} bytes)")
+            if dry_run:
+                if os.path.exists(blob.path):
+                    reclaimed += os.path.getsize(blob.path)
+                    files_removed += 1
+                continue
+            # Conditional delete, committed before the file is touched: an upload
+            # that took a reference meanwhile makes it a no-op
+            deleted = db.query(models.ResumeBlob).filter(
+                models.ResumeBlob.sha256 == blob.sha256,
+                models.ResumeBlob.ref_count == 0,
+                idle
+            ).delete(synchronize_session=False)
+            db.commit()
+            if deleted:
+                size = _unlink_blob(db, blob)
+                reclaimed += size
+                files_removed += 1 if size else 0
+
+        # 2. Files on disk that nothing points at
+        known_blobs = {os.path.normpath(p) for (p,) in db.query(models.ResumeBlob.path).all()}
+        referenced = {os.path.normpath(p) for (p,) in db.query(models.Resume.file_path).all() if p}
+
+        for root, _, files in os.walk(BLOB_DIR):
+            for name in files:
+                path = os.path.normpath(os.path.join(root, name))
+                if path in known_blobs or path in referenced or not _old_enough(path, cutoff_ts):
+                    continue
+                print(f" - Stray file {path}")
+                reclaimed += _remove(path, dry_run)
+                files_removed += 1
+
+        if os.path.isdir(RESUME_DIR):
+            for name in os.listdir(RESUME_DIR):
+                path = os.path.normpath(os.path.join(RESUME_DIR, name))
+                if not os.path.isfile(path) or path in referenced or not _old_enough(path, cutoff_ts):
+                    continue
+                print(f" - Legacy file {path}")
+                reclaimed += _remove(path, dry_run)
+                files_removed += 1
+
+        action = "Would reclaim" if dry_run else "Reclaimed"
+        print(f"{action} {reclaimed} bytes from {files_removed} files")
+
+        report = storage_report(db)
+        print(
+            f"Storage: {report['resumes']} resumes -> {report['unique_blobs']} unique blobs, "
+            f"{report['physical_bytes']} bytes on disk for {report['logical_bytes']} bytes uploaded "
+            f"({report['bytes_saved']} bytes saved by deduplication)"
+        )
+        return report
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    collect(dry_run="--dry-run" in sys.argv)
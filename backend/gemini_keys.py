@@ -0,0 +1,193 @@
+"""
+Gemini API-key pool.
+
+Each key gets its own GenerativeServiceClient, configured through
+client_options (no process-global genai.configure), a token bucket sized to
+its rate limit, and a circuit breaker: after BREAKER_FAILURES consecutive
+failures, or immediately on a 429, the key is taken out of rotation for a
+cooldown that doubles on each re-trip. Revoked or invalid keys are parked
+for an hour. Only errors that say something about the key or the service
+(auth, quota, unavailable, timeouts) count toward the breaker; a bad or
+blocked prompt is the request's fault, not the key's. acquire() picks the
+least-loaded healthy key with tokens left and returns None when there is
+none, so callers fall back straight away instead of waiting on a bad key.
+
+Configuration: GEMINI_API_KEYS (comma separated) or GEMINI_API_KEY,
+GEMINI_KEY_RPM, GEMINI_KEY_BURST, GEMINI_BREAKER_FAILURES,
+GEMINI_BREAKER_COOLDOWN_SECONDS, GEMINI_REQUEST_TIMEOUT_SECONDS.
+"""
+import os
+import threading
+import time
+from contextlib import contextmanager
+import google.ai.generativelanguage as glm
+from google.api_core import exceptions as google_exceptions
+from google.api_core.client_options import ClientOptions
+
+RATE_PER_MINUTE = float(os.getenv("GEMINI_KEY_RPM", 15))
+BURST = float(os.getenv("GEMINI_KEY_BURST", 5))
+BREAKER_FAILURES = int(os.getenv("GEMINI_BREAKER_FAILURES", 3))
+BREAKER_COOLDOWN_SECONDS = float(os.getenv("GEMINI_BREAKER_COOLDOWN_SECONDS", 60))
+REQUEST_TIMEOUT_SECONDS = float(os.getenv("GEMINI_REQUEST_TIMEOUT_SECONDS", 20))
+MAX_COOLDOWN_SECONDS = 15 * 60
+DEAD_KEY_COOLDOWN_SECONDS = 60 * 60
+
+THROTTLED = (google_exceptions.ResourceExhausted, google_exceptions.TooManyRequests)
+DEAD_KEY = (google_exceptions.PermissionDenied, google_exceptions.Unauthenticated)
+UNAVAILABLE = (
+    google_exceptions.ServiceUnavailable, google_exceptions.DeadlineExceeded,
+    google_exceptions.InternalServerError, google_exceptions.RetryError,
+    ConnectionError, TimeoutError,
+)
+
+def _is_dead_key(error: Exception) -> bool:
+    # Invalid keys come back as 400 INVALID_ARGUMENT "API key not valid"
+    return isinstance(error, DEAD_KEY) or (
+        isinstance(error, google_exceptions.InvalidArgument) and "API key" in str(error)
+    )
+
+def _counts_against_key(error: Exception) -> bool:
+    return _is_dead_key(error) or isinstance(error, THROTTLED + UNAVAILABLE)
+
+def _response_text(response):
+    """The generated text, or None if the prompt or the answer was blocked"""
+    if response.prompt_feedback.block_reason or not response.candidates:
+        return None
+    text = "".join(part.text for part in response.candidates[0].content.parts)
+    return text or None
+
+class KeyState:
+    def __init__(self, index: int, key: str):
+        self.key = key
+        self.label = f"key-{index} (...{key[-4:]})"
+        self.tokens = BURST
+        self.refilled_at = time.monotonic()
+        self.in_flight = 0
+        self.consecutive_failures = 0
+        self.trips = 0
+        self.open_until = 0.0
+        self._client = None
+        # Metrics
+        self.requests = 0
+        self.successes = 0
+        self.failures = 0
+        self.throttled = 0
+        self.latency_total = 0.0
+        self.last_error = None
+
+    @property
+    def client(self) -> glm.GenerativeServiceClient:
+        if self._client is None:
+            self._client = glm.GenerativeServiceClient(client_options=ClientOptions(api_key=self.key))
+        return self._client
+
+    def generate_text(self, model_name: str, prompt: str):
+        """Generates with this key; None if the prompt or the answer was blocked"""
+        response = self.client.generate_content(
+            request=glm.GenerateContentRequest(
+                model=model_name if model_name.startswith("models/") else f"models/{model_name}",
+                contents=[glm.Content(role="user", parts=[glm.Part(text=prompt)])],
+            ),
+            timeout=REQUEST_TIMEOUT_SECONDS,
+        )
+        return _response_text(response)
+
+    def refill(self, now: float):
+        self.tokens = min(BURST, self.tokens + (now - self.refilled_at) * RATE_PER_MINUTE / 60)
+        self.refilled_at = now
+
+    def available(self, now: float) -> bool:
+        return self.open_until <= now and self.tokens >= 1
+
+class KeyPool:
+    def __init__(self, keys):
+        self.keys = [KeyState(i + 1, key) for i, key in enumerate(keys)]
+        self.rejected = 0 # acquire() calls that found no usable key
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls):
+        keys = [k.strip() for k in os.getenv("GEMINI_API_KEYS", "").split(",") if k.strip()]
+        if not keys and os.getenv("GEMINI_API_KEY"):
+            keys.append(os.getenv("GEMINI_API_KEY"))
+        return cls(keys)
+
+    def acquire(self):
+        """Reserves a token on the least-loaded healthy key; None if none is usable"""
+        now = time.monotonic()
+        with self._lock:
+            for state in self.keys:
+                state.refill(now)
+            candidates = [state for state in self.keys if state.available(now)]
+            if not candidates:
+                self.rejected += 1
+                return None
+            state = min(candidates, key=lambda s: (s.in_flight, -s.tokens))
+            state.tokens -= 1
+            state.in_flight += 1
+            state.requests += 1
+            return state
+
+    def release(self, state: KeyState, latency: float, error: Exception = None):
+        with self._lock:
+            state.in_flight -= 1
+            state.latency_total += latency
+            if error is None:
+                state.successes += 1
+                state.consecutive_failures = 0
+                state.trips = 0
+                return
+
+            state.failures += 1
+            state.last_error = f"{type(error).__name__}: {error}"[:200]
+            if not _counts_against_key(error):
+                return
+            state.consecutive_failures += 1
+            now = time.monotonic()
+            if _is_dead_key(error):
+                state.open_until = now + DEAD_KEY_COOLDOWN_SECONDS
+            elif isinstance(error, THROTTLED) or state.consecutive_failures >= BREAKER_FAILURES:
+                if isinstance(error, THROTTLED):
+                    state.throttled += 1
+                state.trips += 1
+                state.open_until = now + min(BREAKER_COOLDOWN_SECONDS * 2 ** (state.trips - 1), MAX_COOLDOWN_SECONDS)
+                state.consecutive_failures = 0
+
+    @contextmanager
+    def lease(self):
+        """Yields a KeyState (or None); records latency and outcome on exit"""
+        state = self.acquire()
+        if state is None:
+            yield None
+            return
+        start = time.monotonic()
+        try:
+            yield state
+        except Exception as e:
+            self.release(state, time.monotonic() - start, e)
+            raise
+        self.release(state, time.monotonic() - start)
+
+    def metrics(self) -> dict:
+        now = time.monotonic()
+        with self._lock:
+            keys = []
+            for state in self.keys:
+                state.refill(now)
+                completed = state.successes + state.failures
+                keys.append({
+                    "key": state.label,
+                    "state": "open" if state.open_until > now else "closed",
+                    "reopens_in_seconds": round(max(0.0, state.open_until - now), 1),
+                    "tokens": round(state.tokens, 2),
+                    "in_flight": state.in_flight,
+                    "requests": state.requests,
+                    "successes": state.successes,
+                    "failures": state.failures,
+                    "throttled": state.throttled,
+                    "avg_latency_ms": round(state.latency_total / completed * 1000, 1) if completed else None,
+                    "last_error": state.last_error,
+                })
+            return {"keys": keys, "rejected": self.rejected}
+
+pool = KeyPool.from_env()
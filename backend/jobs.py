@@ -0,0 +1,156 @@
+"""
+Background job execution with per-run metrics.
+
+Scheduled work is wrapped with @job(name): every call gets a RunContext the
+job uses to count what it did (rows_scanned, emails_queued) or to mark the
+run as skipped, and the outcome, duration and counters are written to
+job_runs and logged as one structured line. A failing job is recorded and
+logged instead of disappearing into the scheduler thread.
+
+Jobs may be plain functions or coroutines. Coroutine jobs run on one
+dedicated asyncio loop in its own thread, so scheduler threads never call an
+async function without awaiting it or spin up a loop per run.
+"""
+import asyncio
+import datetime
+import functools
+import inspect
+import logging
+import threading
+import time
+from sqlalchemy import func
+from database import SessionLocal
+import models, leases
+
+logger = logging.getLogger(__name__)
+
+# Per-run rows are only useful for a while
+RETENTION_DAYS = 30
+
+_loop = None
+_loop_thread = None
+_loop_lock = threading.Lock()
+
+class RunContext:
+    def __init__(self, name: str, target=None):
+        self.name = name
+        self.target = None if target is None else str(target)
+        self.rows_scanned = 0
+        self.emails_queued = 0
+        self.status = "success"
+
+    def skip(self):
+        """Marks the run as having found nothing to do"""
+        self.status = "skipped"
+
+def _event_loop():
+    global _loop, _loop_thread
+    with _loop_lock:
+        if _loop is None:
+            _loop = asyncio.new_event_loop()
+            _loop_thread = threading.Thread(target=_loop.run_forever, name="jobs-loop", daemon=True)
+            _loop_thread.start()
+        return _loop
+
+def run_coroutine(coro, timeout: float = None):
+    """Runs a coroutine on the jobs loop and waits for its result (from any thread)"""
+    return asyncio.run_coroutine_threadsafe(coro, _event_loop()).result(timeout)
+
+def _record(ctx: RunContext, started_at: datetime.datetime, duration: float, error: str = None):
+    db = SessionLocal()
+    try:
+        db.add(models.JobRun(
+            job_name=ctx.name, target=ctx.target, worker_id=leases.WORKER_ID, status=ctx.status,
+            rows_scanned=ctx.rows_scanned, emails_queued=ctx.emails_queued,
+            duration_ms=int(duration * 1000), error=error,
+            started_at=started_at, finished_at=datetime.datetime.utcnow()
+        ))
+        db.commit()
+    except Exception as e:
+        logger.error(f"Could not record run of job {ctx.name}: {e}")
+        db.rollback()
+    finally:
+        db.close()
+
+def execute(name: str, fn, *args, target=None, **kwargs):
+    """Runs fn(ctx, *args, **kwargs) and records the run; exceptions are logged, not raised"""
+    ctx = RunContext(name, target)
+    started_at = datetime.datetime.utcnow()
+    start = time.monotonic()
+    error = None
+    try:
+        if inspect.iscoroutinefunction(fn):
+            run_coroutine(fn(ctx, *args, **kwargs))
+        else:
+            fn(ctx, *args, **kwargs)
+    except Exception as e:
+        ctx.status = "failed"
+        error = f"{type(e).__name__}: {e}"[:1000]
+    duration = time.monotonic() - start
+
+    log = logger.error if error else logger.info
+    log(
+        f"job={name} target={ctx.target} status={ctx.status} rows_scanned={ctx.rows_scanned} "
+        f"emails_queued={ctx.emails_queued} duration_ms={int(duration * 1000)}"
+        + (f" error={error}" if error else "")
+    )
+    _record(ctx, started_at, duration, error)
+    return ctx
+
+def job(name: str, target_arg: int = None):
+    """
+    Decorator for job functions taking a RunContext first. The wrapped
+    callable takes the remaining arguments, so it can be handed to
+    APScheduler as is. target_arg is the index of the argument recorded as
+    the run's target.
+    """
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            target = args[target_arg] if target_arg is not None and len(args) > target_arg else None
+            return execute(name, fn, *args, target=target, **kwargs)
+        wrapper.job_name = name
+        return wrapper
+    return decorator
+
+def recent_runs(db, job_name: str = None, limit: int = 50):
+    query = db.query(models.JobRun)
+    if job_name:
+        query = query.filter(models.JobRun.job_name == job_name)
+    return query.order_by(models.JobRun.started_at.desc(), models.JobRun.id.desc()).limit(limit).all()
+
+def summary(db, since: datetime.datetime) -> list:
+    """Per job and status: run count, average/max duration and work totals since `since`"""
+    Run = models.JobRun
+    rows = db.query(
+        Run.job_name, Run.status, func.count(Run.id), func.avg(Run.duration_ms), func.max(Run.duration_ms),
+        func.sum(Run.rows_scanned), func.sum(Run.emails_queued), func.max(Run.started_at)
+    ).filter(Run.started_at >= since).group_by(Run.job_name, Run.status).order_by(Run.job_name, Run.status).all()
+    return [
+        {
+            "job_name": name, "status": status, "runs": runs,
+            "avg_duration_ms": round(avg_ms or 0, 1), "max_duration_ms": max_ms or 0,
+            "rows_scanned": scanned or 0, "emails_queued": queued or 0, "last_started_at": last,
+        }
+        for name, status, runs, avg_ms, max_ms, scanned, queued, last in rows
+    ]
+
+@job("job-runs-cleanup")
+def purge_old_runs(ctx: RunContext):
+    cutoff = datetime.datetime.utcnow() - datetime.timedelta(days=RETENTION_DAYS)
+    db = SessionLocal()
+    try:
+        ctx.rows_scanned = db.query(models.JobRun).filter(models.JobRun.started_at < cutoff).delete(synchronize_session=False)
+        db.commit()
+    finally:
+        db.close()
+
+def shutdown():
+    global _loop, _loop_thread
+    with _loop_lock:
+        if _loop is None:
+            return
+        _loop.call_soon_threadsafe(_loop.stop)
+        _loop_thread.join(timeout=5)
+        _loop.close()
+        _loop = _loop_thread = None
@@ -0,0 +1,58 @@
+"""
+Database leases for coordinating several app workers or replicas.
+
+A lease is a row in scheduler_leases; a worker holds it while holder is its
+WORKER_ID and expires_at is in the future. Acquiring and renewing are the
+same conditional UPDATE (holder is me or the lease has expired), which is
+atomic on both Postgres and SQLite, so at most one worker holds a lease at a
+time. A crashed holder simply stops renewing and the lease lapses after its
+TTL.
+"""
+import datetime
+import os
+import socket
+import uuid
+from sqlalchemy import or_
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from database import SessionLocal
+import models
+
+WORKER_ID = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+def acquire(name: str, ttl_seconds: float) -> bool:
+    """Acquires or renews the lease; True if this worker holds it afterwards"""
+    now = datetime.datetime.utcnow()
+    Lease = models.SchedulerLease
+    db = SessionLocal()
+    try:
+        insert = sqlite_insert if db.get_bind().dialect.name == "sqlite" else pg_insert
+        db.execute(insert(Lease).values(name=name).on_conflict_do_nothing(index_elements=["name"]))
+        held = db.query(Lease).filter(
+            Lease.name == name,
+            or_(Lease.holder == WORKER_ID, Lease.expires_at == None, Lease.expires_at < now)
+        ).update({
+            "holder": WORKER_ID,
+            "expires_at": now + datetime.timedelta(seconds=ttl_seconds),
+        }, synchronize_session=False)
+        if held:
+            # Keep the original acquisition time across renewals
+            db.query(Lease).filter(Lease.name == name, Lease.acquired_at == None).update(
+                {"acquired_at": now}, synchronize_session=False
+            )
+        db.commit()
+        return bool(held)
+    finally:
+        db.close()
+
+def release(name: str):
+    """Gives the lease up early (e.g. on shutdown) so another worker can take over"""
+    db = SessionLocal()
+    try:
+        db.query(models.SchedulerLease).filter(
+            models.SchedulerLease.name == name,
+            models.SchedulerLease.holder == WORKER_ID
+        ).update({"holder": None, "expires_at": None, "acquired_at": None}, synchronize_session=False)
+        db.commit()
+    finally:
+        db.close()
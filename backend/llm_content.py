@@ -0,0 +1,159 @@
+"""
+AI-written email content, generated off the request path and cached.
+
+The model writes one base body per (event, title, TEMPLATE_VERSION, name
+bucket) with a STUDENT_NAME_TOKEN placeholder; a registration only substitutes the
+(escaped) student name. Generation runs in a small thread pool; callers wait
+at most TIMEOUT_SECONDS and otherwise fall back to the static template while
+the generation finishes in the background for the next registration.
+Concurrent requests for the same key share one generation (single-flight).
+The title is part of the key, so a renamed event never gets a body written
+for (or still being generated for) its old title.
+
+LLM_PROVIDER selects the model: "gemini" (default; keys come from the
+gemini_keys pool) or "stub", a local deterministic model for tests and
+benchmarks.
+"""
+import asyncio
+import html
+import logging
+import os
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+import gemini_keys
+
+logger = logging.getLogger(__name__)
+
+# Bump when the prompt changes so cached bodies are regenerated
+TEMPLATE_VERSION = 1
+STUDENT_NAME_TOKEN = "[[STUDENT_NAME]]"
+
+PROVIDER = os.getenv("LLM_PROVIDER", "gemini")
+TIMEOUT_SECONDS = float(os.getenv("LLM_TIMEOUT_SECONDS", 5))
+NAME_BUCKETS = int(os.getenv("LLM_NAME_BUCKETS", 1)) # body variants per event
+MAX_WORKERS = int(os.getenv("LLM_WORKERS", 2))
+CACHE_SIZE = 512
+FAILURE_TTL_SECONDS = 60 # don't retry a failed generation on every registration
+
+REGISTRATION_PROMPT = """
+Write a short, warm, and professional HTML email body for a student who just registered for the event '{event_title}'.
+
+Requirements:
+- Address the student as {token} (write that placeholder exactly, it will be replaced with their name).
+- Congratulate them on registering.
+- Mention the event title clearly.
+- Use a friendly and encouraging tone.
+- Keep it brief (under 100 words).
+- Output ONLY the HTML body content (do not include <html> or <body> tags, just the inner elements like <p>, <h3>, etc).
+- Sign off as 'The CMIS Team'.
+"""
+
+class StubModel:
+    """Local stand-in for the LLM; counts calls so tests can assert on them"""
+    def __init__(self, delay: float = 0.05):
+        self.delay = delay
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def generate(self, prompt: str) -> str:
+        with self._lock:
+            self.calls += 1
+        time.sleep(self.delay)
+        return f"<p>Hello {STUDENT_NAME_TOKEN},</p><p>[stub] {html.escape(prompt.strip().splitlines()[0])}</p><p>The CMIS Team</p>"
+
+class GeminiModel:
+    def __init__(self, model_name: str = "gemini-flash-latest", pool: gemini_keys.KeyPool = None):
+        self.model_name = model_name
+        self.pool = pool or gemini_keys.pool
+
+    def generate(self, prompt: str):
+        with self.pool.lease() as key:
+            if key is None:
+                return None # No healthy key with capacity: use the fallback template
+            return key.generate_text(self.model_name, prompt)
+
+model = StubModel() if PROVIDER == "stub" else GeminiModel()
+
+_executor = ThreadPoolExecutor(max_workers=MAX_WORKERS, thread_name_prefix="llm")
+_lock = threading.Lock()
+_cache = OrderedDict() # key -> (body or None, expires_at or None)
+_inflight = {} # key -> concurrent Future
+
+def _clean(text):
+    if not text:
+        return None
+    # Cleanup potential markdown code blocks if Gemini adds them
+    text = text.replace("```html", "").replace("```", "").strip()
+    return text if STUDENT_NAME_TOKEN in text else None
+
+def name_bucket(student_name: str) -> int:
+    return zlib.crc32((student_name or "").encode()) % NAME_BUCKETS
+
+def _key(event_id: int, event_title: str, bucket: int):
+    return (event_id, event_title, TEMPLATE_VERSION, bucket)
+
+def _cached(key):
+    """(hit, body); caller holds _lock"""
+    entry = _cache.get(key)
+    if entry is None:
+        return False, None
+    body, expires_at = entry
+    if expires_at is not None and expires_at < time.monotonic():
+        del _cache[key]
+        return False, None
+    _cache.move_to_end(key)
+    return True, body
+
+def _generate(key, event_title: str):
+    body = None
+    try:
+        body = _clean(model.generate(REGISTRATION_PROMPT.format(event_title=event_title, token=STUDENT_NAME_TOKEN)))
+    except Exception as e:
+        logger.warning(f"LLM generation failed for {key}: {e}")
+    with _lock:
+        _cache[key] = (body, None if body else time.monotonic() + FAILURE_TTL_SECONDS)
+        _cache.move_to_end(key)
+        while len(_cache) > CACHE_SIZE:
+            _cache.popitem(last=False)
+        _inflight.pop(key, None)
+    return body
+
+def _submit(key, event_title: str):
+    """Returns (cached_body, None) on a hit, else (None, future) shared with other callers"""
+    with _lock:
+        hit, body = _cached(key)
+        if hit:
+            return body, None
+        future = _inflight.get(key)
+        if future is None:
+            future = _executor.submit(_generate, key, event_title)
+            _inflight[key] = future
+        return None, future
+
+def prefetch(event_id: int, event_title: str):
+    """Starts generating an event's base bodies (e.g. on event create); doesn't wait"""
+    for bucket in range(NAME_BUCKETS):
+        _submit(_key(event_id, event_title, bucket), event_title)
+
+def invalidate(event_id: int):
+    """Drops an event's cached bodies, e.g. the old title's after a rename"""
+    with _lock:
+        for key in [k for k in _cache if k[0] == event_id]:
+            del _cache[key]
+
+async def registration_body(event_id: int, event_title: str, student_name: str):
+    """Personalized HTML body, or None if the model is unavailable or too slow"""
+    body, future = _submit(_key(event_id, event_title, name_bucket(student_name)), event_title)
+    if future is not None:
+        try:
+            # shield: a timeout here must not cancel the shared generation
+            body = await asyncio.wait_for(asyncio.shield(asyncio.wrap_future(future)), TIMEOUT_SECONDS)
+        except asyncio.TimeoutError:
+            logger.info(f"LLM body for event {event_id} not ready in {TIMEOUT_SECONDS}s, using fallback")
+            return None
+    if not body:
+        return None
+    return body.replace(STUDENT_NAME_TOKEN, html.escape(student_name or "Student"))
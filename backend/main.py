@@ -4,7 +4,7 @@ from sqladmin import Admin, ModelView
 from sqladmin.authentication import AuthenticationBackend
 from starlette.requests import Request
 from starlette.responses import RedirectResponse
-import models, database, crud, auth
+import models, database, crud, auth, passwords, notifications
 
 app = FastAPI(title="CMIS Event Management")
 
@@ -14,6 +14,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"], # Keyset pagination cursor
 )
 
 @app.get("/")
@@ -21,14 +22,24 @@ def read_root():
     return {"message": "Welcome to CMIS Event Manager API"}
 
 from routers import auth_router, events, registrations, judge, ai, profile, admin, recruiter
-import models, database
+import models, database, search_index
 
 models.Base.metadata.create_all(bind=database.engine)
+search_index.ensure_search_schema(database.engine)
 
-import scheduler
+import scheduler, resume_worker, email_outbox, audit
 @app.on_event("startup")
 def startup_event():
     scheduler.start_scheduler()
+    resume_worker.start()
+    email_outbox.start()
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    scheduler.shutdown_scheduler()
+    resume_worker.shutdown()
+    await email_outbox.stop()
+    audit.shutdown()
 
 app.include_router(auth_router.router)
 app.include_router(events.router)
@@ -52,7 +63,10 @@ class AdminAuth(AuthenticationBackend):
         db = database.SessionLocal()
         try:
             user = crud.get_user_by_email(db, email)
-            if user and crud.verify_password(password, user.hashed_password):
+            if user:
+                db.expunge(user)
+            db.rollback() # Don't hold a pooled connection during bcrypt
+            if user and (await passwords.verify_password(password, user.hashed_password))[0]:
                 if user.role != "admin":
                     return False
                 request.session.update({"token": "admin-token"}) # Simplified session
@@ -99,7 +113,19 @@ class RegistrationAdmin(ModelView, model=models.Registration):
     column_list = [models.Registration.id, models.Registration.user_id, models.Registration.event_id, models.Registration.status]
     icon = "fa-solid fa-ticket"
 
+class NotificationTemplateAdmin(ModelView, model=models.NotificationTemplate):
+    column_list = [models.NotificationTemplate.id, models.NotificationTemplate.kind, models.NotificationTemplate.subject_template]
+    icon = "fa-solid fa-envelope"
+
+    async def on_model_change(self, data, model, is_created, request):
+        # Same check as PUT /admin/notification-templates; sqladmin shows the error on the form
+        try:
+            notifications.compile_template(data.get("subject_template") or "", data.get("body_template") or "")
+        except notifications.TEMPLATE_ERRORS as e:
+            raise ValueError(f"Invalid template: {e}")
+
 admin_app.add_view(UserAdmin)
 admin_app.add_view(EventAdmin)
 admin_app.add_view(SessionAdmin)
 admin_app.add_view(RegistrationAdmin)
+admin_app.add_view(NotificationTemplateAdmin)
@@ -0,0 +1,47 @@
+"""
+Makes events.position and events.date_time NOT NULL and replaces
+ix_events_position_date_time with ix_events_listing, which matches the
+listing's ORDER BY (position, date_time DESC, id DESC).
+
+NULL positions become max(position) + 1, so those events keep sorting after
+every placed event as they did on Postgres. NULL dates become 1970-01-01,
+which is also what the frontend showed for them. SQLite can't add NOT NULL
+to an existing column; there the backfill and the new index are applied and
+the model keeps the columns set.
+"""
+import datetime
+from sqlalchemy import func, text
+from database import SessionLocal, engine
+import models
+
+def migrate():
+    db = SessionLocal()
+    try:
+        Event = models.Event
+        max_position = db.query(func.max(Event.position)).scalar()
+        placed = db.query(Event).filter(Event.position == None).update(
+            {"position": (max_position if max_position is not None else -1) + 1}, synchronize_session=False
+        )
+        dated = db.query(Event).filter(Event.date_time == None).update(
+            {"date_time": datetime.datetime(1970, 1, 1)}, synchronize_session=False
+        )
+        db.commit()
+        print(f"Backfilled {placed} positions and {dated} dates")
+
+        if engine.dialect.name == "postgresql":
+            db.execute(text("ALTER TABLE events ALTER COLUMN position SET DEFAULT 0"))
+            db.execute(text("ALTER TABLE events ALTER COLUMN position SET NOT NULL"))
+            db.execute(text("ALTER TABLE events ALTER COLUMN date_time SET NOT NULL"))
+            db.commit()
+            print("Set position and date_time NOT NULL")
+
+        db.execute(text("DROP INDEX IF EXISTS ix_events_position_date_time"))
+        db.execute(text("CREATE INDEX IF NOT EXISTS ix_events_listing ON events (position, date_time DESC, id DESC)"))
+        db.commit()
+        print("Created ix_events_listing index")
+        print("Migration complete")
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    migrate()
@@ -0,0 +1,44 @@
+"""
+Moves existing per-upload resume files into the content-addressed blob
+store and builds the resume_blobs table. The original files are left in
+place; run gc_resume_blobs.py afterwards to reclaim them.
+"""
+import os
+import database, models
+from resume_storage import BLOB_DIR, store_file
+from gc_resume_blobs import recount, storage_report
+
+def migrate():
+    models.Base.metadata.create_all(bind=database.engine, tables=[models.ResumeBlob.__table__])
+    db = database.SessionLocal()
+    moved = missing = 0
+    try:
+        resumes = db.query(models.Resume).all()
+        for resume in resumes:
+            path = resume.file_path
+            if path and os.path.normpath(path).startswith(os.path.normpath(BLOB_DIR) + os.sep):
+                continue
+            if not path or not os.path.exists(path):
+                missing += 1
+                continue
+
+            stored = store_file(path)
+            resume.file_path = stored.path
+            resume.sha256 = stored.sha256
+            resume.size_bytes = stored.size_bytes
+            if not db.get(models.ResumeBlob, stored.sha256):
+                db.add(models.ResumeBlob(sha256=stored.sha256, path=stored.path, size_bytes=stored.size_bytes, ref_count=0))
+            db.flush()
+            moved += 1
+
+        recount(db)
+        db.commit()
+        print(f"Moved {moved} resumes into the blob store ({missing} files missing on disk)")
+
+        report = storage_report(db)
+        print(f"{report['resumes']} resumes now share {report['unique_blobs']} blobs ({report['bytes_saved']} bytes saved)")
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    migrate()
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Boolean, ForeignKey, DateTime, Text, JSON, UniqueConstraint, Index
+from sqlalchemy import Column, Integer, String, Boolean, ForeignKey, Date, DateTime, Text, JSON, UniqueConstraint, Index, desc, text
 from sqlalchemy.orm import relationship
 from database import Base
 import datetime
@@ -35,6 +35,7 @@ class User(Base):
     resumes = relationship("Resume", back_populates="student", cascade="all, delete-orphan")
     created_events = relationship("Event", back_populates="created_by") # Maintain event history even if creator deleted? Maybe SetNull. Leaving as is (or nullable=True in Event)
     audit_logs = relationship("AuditLog", back_populates="user", cascade="all, delete-orphan")
+    search_document = relationship("StudentSearchDocument", uselist=False, cascade="all, delete-orphan")
 
     def __str__(self):
         return f"{self.name} ({self.email})"
@@ -58,18 +59,65 @@ class Resume(Base):
     uploaded_at = Column(DateTime, default=datetime.datetime.utcnow)
     is_active = Column(Boolean, default=True)
     content_text = Column(Text, nullable=True)
+    sha256 = Column(String(64), nullable=True, index=True)
+    size_bytes = Column(Integer, nullable=True)
+
+    # Text extraction (resume_worker): pending, processing, done, failed
+    extraction_status = Column(String, default="pending", index=True)
+    extraction_attempts = Column(Integer, default=0)
+    extraction_error = Column(Text, nullable=True)
+    extracted_at = Column(DateTime, nullable=True)
+    page_count = Column(Integer, nullable=True)
+    extraction_claimed_at = Column(DateTime, nullable=True) # When it went to processing
+    extraction_next_attempt_at = Column(DateTime, nullable=True) # Pending retry not due before this
 
     student = relationship("User", back_populates="resumes")
 
+class ResumeBlob(Base):
+    """
+    One stored PDF per distinct content hash (see resume_storage). ref_count
+    tracks the Resume rows pointing at it; gc_resume_blobs.py removes blobs
+    that drop to zero. referenced_at is bumped by every new reference, so GC's
+    grace period also covers a blob an upload is re-referencing.
+    """
+    __tablename__ = "resume_blobs"
+
+    sha256 = Column(String(64), primary_key=True)
+    path = Column(String, nullable=False)
+    size_bytes = Column(Integer, nullable=False)
+    ref_count = Column(Integer, default=0, server_default="0", nullable=False)
+    created_at = Column(DateTime, default=datetime.datetime.utcnow)
+    referenced_at = Column(DateTime, default=datetime.datetime.utcnow)
+
+class StudentSearchDocument(Base):
+    """
+    Denormalized candidate text (profile + skills + active resume) that the
+    full-text index is built on. Kept in sync by search_index.refresh_student.
+    """
+    __tablename__ = "student_search_documents"
+
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    name = Column(String, nullable=True)
+    major = Column(String, nullable=True)
+    skills = Column(Text, nullable=True)
+    resume_text = Column(Text, nullable=True)
+    updated_at = Column(DateTime, default=datetime.datetime.utcnow, onupdate=datetime.datetime.utcnow)
+
 class Event(Base):
     __tablename__ = "events"
+    __table_args__ = (
+        # Listing order for /events/: exactly crud.EVENT_ORDER, so the index serves the ORDER BY
+        Index("ix_events_listing", "position", desc("date_time"), desc("id")),
+        # Feedback scheduler: unsent events by end time
+        Index("ix_events_feedback_due", "feedback_email_sent", "end_date_time"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     title = Column(String, index=True)
     description = Column(Text)
-    date_time = Column(DateTime)
+    date_time = Column(DateTime, nullable=False)
     end_date_time = Column(DateTime, nullable=True)
-    position = Column(Integer, default=0)
+    position = Column(Integer, default=0, server_default="0", nullable=False)
     
     # Logistics
     mode = Column(String, default="in_person") # in_person, virtual, hybrid
@@ -94,12 +142,30 @@ class Event(Base):
     is_active = Column(Boolean, default=True)
     feedback_email_sent = Column(Boolean, default=False)
 
+    # Seat counters (main registrations only). Maintained by crud so a seat can be
+    # reserved with a single conditional UPDATE instead of COUNT(*) + INSERT.
+    confirmed_count = Column(Integer, default=0, server_default="0")
+    waitlisted_count = Column(Integer, default=0, server_default="0")
+    pending_count = Column(Integer, default=0, server_default="0")
+
+    # Listing stats, maintained alongside the seat counters (all registration rows).
+    # Rebuild with reconcile_event_counters.py if they ever drift.
+    registrations_count = Column(Integer, default=0, server_default="0")
+    feedback_count = Column(Integer, default=0, server_default="0")
+    rating_sum = Column(Integer, default=0, server_default="0")
+
     # Relationships
     created_by = relationship("User", back_populates="created_events")
     registrations = relationship("Registration", back_populates="event", cascade="all, delete-orphan")
     ratings = relationship("JudgeRating", back_populates="event")
     sessions = relationship("EventSession", back_populates="event", cascade="all, delete-orphan")
 
+    @property
+    def average_rating(self):
+        if not self.feedback_count:
+            return 0.0
+        return (self.rating_sum or 0) / self.feedback_count
+
     def __str__(self):
         return self.title
 
@@ -147,6 +213,15 @@ class SessionSpeaker(Base):
 
 class Registration(Base):
     __tablename__ = "registrations"
+    __table_args__ = (
+        # One main (non-session) registration per user and event
+        Index(
+            "uq_registrations_user_event_main", "user_id", "event_id",
+            unique=True,
+            postgresql_where=text("session_id IS NULL"),
+            sqlite_where=text("session_id IS NULL"),
+        ),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"))
@@ -156,6 +231,8 @@ class Registration(Base):
     status = Column(String, default="pending") # pending, confirmed, waitlisted, rejected
     attended = Column(Boolean, default=False)
     created_at = Column(DateTime, default=datetime.datetime.utcnow)
+    # Bumped by any ORM or bulk UPDATE; drives the incremental analytics rollup
+    updated_at = Column(DateTime, default=datetime.datetime.utcnow, onupdate=datetime.datetime.utcnow, index=True)
 
     student = relationship("User", back_populates="registrations")
     event = relationship("Event", back_populates="registrations")
@@ -207,3 +284,116 @@ class NotificationTemplate(Base):
     subject_template = Column(String)
     body_template = Column(Text)
 
+
+class EmailJob(Base):
+    """One bulk send (email_outbox.send_bulk); progress is counted from its outbox rows"""
+    __tablename__ = "email_jobs"
+
+    id = Column(String(32), primary_key=True)
+    kind = Column(String)
+    event_id = Column(Integer, ForeignKey("events.id"), nullable=True, index=True)
+    total = Column(Integer, default=0)
+    created_by = Column(Integer, ForeignKey("users.id"), nullable=True) # None for the scheduler
+    created_at = Column(DateTime, default=datetime.datetime.utcnow)
+
+class EmailOutbox(Base):
+    """
+    Outgoing mail queue drained by email_outbox's worker.
+    status: pending, sending, sent, dead (gave up after MAX_ATTEMPTS)
+    """
+    __tablename__ = "email_outbox"
+
+    id = Column(Integer, primary_key=True, index=True)
+    kind = Column(String, index=True) # feedback_request, guest_invite, ...
+    job_id = Column(String(32), ForeignKey("email_jobs.id"), nullable=True, index=True)
+    recipient = Column(String, nullable=False)
+    subject = Column(String, nullable=False)
+    body_html = Column(Text, nullable=False)
+    status = Column(String, default="pending", nullable=False)
+    attempts = Column(Integer, default=0, nullable=False)
+    next_attempt_at = Column(DateTime, default=datetime.datetime.utcnow)
+    claim_token = Column(String, nullable=True)
+    last_error = Column(Text, nullable=True)
+    created_at = Column(DateTime, default=datetime.datetime.utcnow)
+    sent_at = Column(DateTime, nullable=True)
+
+    __table_args__ = (
+        Index("ix_email_outbox_status_next_attempt", "status", "next_attempt_at"),
+        Index("ix_email_outbox_claim_token", "claim_token"),
+    )
+
+    def __str__(self):
+        return f"{self.kind} -> {self.recipient} ({self.status})"
+
+class SchedulerLease(Base):
+    """Named lease for leader election between app workers (see leases.py)"""
+    __tablename__ = "scheduler_leases"
+
+    name = Column(String, primary_key=True)
+    holder = Column(String, nullable=True)
+    expires_at = Column(DateTime, nullable=True)
+    acquired_at = Column(DateTime, nullable=True)
+
+class JobRun(Base):
+    """One execution of a background job (jobs.py), with its work counters"""
+    __tablename__ = "job_runs"
+    __table_args__ = (Index("ix_job_runs_name_started", "job_name", "started_at"),)
+
+    id = Column(Integer, primary_key=True, index=True)
+    job_name = Column(String)
+    target = Column(String, nullable=True) # e.g. the event id for per-event jobs
+    worker_id = Column(String, nullable=True)
+    status = Column(String) # success, skipped, failed
+    rows_scanned = Column(Integer, default=0)
+    emails_queued = Column(Integer, default=0)
+    duration_ms = Column(Integer, nullable=True)
+    error = Column(Text, nullable=True)
+    started_at = Column(DateTime)
+    finished_at = Column(DateTime, nullable=True)
+
+class RefreshToken(Base):
+    """
+    Long-lived refresh token, stored as its SHA-256 only. Each use rotates it:
+    the row is marked rotated and a new one issued in the same family, so a
+    rotated token coming back means it leaked and the whole family is revoked.
+    """
+    __tablename__ = "refresh_tokens"
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), index=True)
+    token_hash = Column(String(64), unique=True, index=True)
+    family_id = Column(String(32), index=True)
+    expires_at = Column(DateTime)
+    created_at = Column(DateTime, default=datetime.datetime.utcnow)
+    rotated_at = Column(DateTime, nullable=True)
+    revoked_at = Column(DateTime, nullable=True)
+
+class DailyRollup(Base):
+    """
+    Per day and event counters for the analytics time series (rollups.py).
+    Registration counts are bucketed by the day the registration was made;
+    attendance and feedback by the day the event took place.
+    """
+    __tablename__ = "daily_rollups"
+    __table_args__ = (
+        UniqueConstraint("day", "event_id", name="uq_daily_rollups_day_event"),
+        Index("ix_daily_rollups_event", "event_id"),
+    )
+
+    id = Column(Integer, primary_key=True)
+    day = Column(Date, index=True)
+    event_id = Column(Integer, ForeignKey("events.id", ondelete="CASCADE"))
+    category = Column(String, nullable=True, index=True)
+    new_registrations = Column(Integer, default=0)
+    confirmations = Column(Integer, default=0)
+    waitlists = Column(Integer, default=0)
+    attendance = Column(Integer, default=0)
+    feedback_count = Column(Integer, default=0)
+    rating_sum = Column(Integer, default=0)
+
+class RollupWatermark(Base):
+    """How far an incremental job has processed, e.g. registrations.updated_at"""
+    __tablename__ = "rollup_watermarks"
+
+    name = Column(String, primary_key=True)
+    processed_until = Column(DateTime)
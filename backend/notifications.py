@@ -0,0 +1,195 @@
+"""
+Email templates backed by models.NotificationTemplate.
+
+Templates are Jinja2. Every kind has a built-in default (DEFAULT_TEMPLATES);
+a NotificationTemplate row with the same kind overrides it. All templates
+are compiled once into an in-memory cache that is dropped whenever a
+NotificationTemplate change is committed in this process (and after
+CACHE_TTL_SECONDS, for edits made by other processes), so sends never pay a
+DB read or a compile per recipient. Bodies are HTML and autoescaped;
+subjects are plain text.
+
+Templates are editable by admins, so they run in Jinja's immutable sandbox:
+no attribute access to internals (`__globals__`, `__class__`, ...) and no
+mutating calls. compile_template() also renders a new template once against
+sample values, so sandbox violations and runtime errors (an undefined
+variable's attribute, `{{ 1/0 }}`) are rejected when it is saved rather than
+when an email goes out.
+"""
+import logging
+import threading
+import time
+from jinja2 import TemplateError
+from jinja2.exceptions import TemplateRuntimeError
+from jinja2.sandbox import ImmutableSandboxedEnvironment
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from database import SessionLocal
+import models
+
+logger = logging.getLogger(__name__)
+
+CACHE_TTL_SECONDS = 300
+FRONTEND_URL = "http://localhost:3000"
+BACKEND_URL = "http://localhost:8000"
+
+DEFAULT_TEMPLATES = {
+    "registration_confirm": (
+        "Registration Confirmed: {{ event_title }}",
+        """
+        <h3>Event Registration Confirmed</h3>
+        <p>Hello {{ student_name }},</p>
+        <p>You have successfully registered for the event: <strong>{{ event_title }}</strong>.</p>
+        <p>We look forward to seeing you there!</p>
+        <br>
+        <p>Best regards,</p>
+        <p>The CMIS Team</p>
+        """,
+    ),
+    "feedback_request": (
+        "Feedback Request: {{ event_title }}",
+        """
+    <h3>We'd love your feedback!</h3>
+    {% if student_name %}<p>Hello {{ student_name }},</p>{% endif %}
+    <p>You recently attended <strong>{{ event_title }}</strong>.</p>
+    <p>Please take a moment to share your thoughts:</p>
+    <p><a href="{{ feedback_link }}">Give Feedback</a></p>
+    <br>
+    <p>Best regards,</p>
+    <p>The CMIS Team</p>
+    """,
+    ),
+    "guest_invite": (
+        "Invitation: {{ event_title }}",
+        """
+    <h3>You are invited!</h3>
+    <p>We are pleased to invite you to: <strong>{{ event_title }}</strong>.</p>
+    <p>Please consider this email as your formal invitation.</p>
+    <p>We look forward to seeing you there!</p>
+    <br>
+    <p>Best regards,</p>
+    <p>The CMIS Team</p>
+    """,
+    ),
+    "account_verification": (
+        "Verify your CMIS Account",
+        """
+    <h3>Verify your account</h3>
+    <p>Thanks for registering with CMIS.</p>
+    <p>Please click the link below to verify your account:</p>
+    <p><a href="{{ verification_link }}">{{ verification_link }}</a></p>
+    <br>
+    <p>If you did not register, please ignore this email.</p>
+    """,
+    ),
+    "password_reset": (
+        "Reset Your Password",
+        """
+    <h3>Password Reset Request</h3>
+    <p>We received a request to reset your password.</p>
+    <p>Click the link below to reset it:</p>
+    <p><a href="{{ reset_link }}">Reset Password</a></p>
+    <br>
+    <p>If you didn't ask for this, you can ignore this email.</p>
+    """,
+    ),
+}
+
+# Every variable a template kind is rendered with, for the trial render
+SAMPLE_CONTEXT = {
+    "event_title": "Sample Event",
+    "student_name": "Sample Student",
+    "feedback_link": f"{FRONTEND_URL}/feedback/0",
+    "verification_link": f"{BACKEND_URL}/auth/verify?token=sample",
+    "reset_link": f"{FRONTEND_URL}/reset-password?token=sample",
+}
+
+# Errors that make a stored template unusable: syntax, sandbox and runtime
+# errors are all TemplateErrors (see compile_template)
+TEMPLATE_ERRORS = (TemplateError,)
+
+_html_env = ImmutableSandboxedEnvironment(autoescape=True)
+_text_env = ImmutableSandboxedEnvironment(autoescape=False)
+
+_lock = threading.Lock()
+_compiled = {} # kind -> (subject Template, body Template)
+_loaded_at = None
+
+def compile_template(subject_template: str, body_template: str):
+    """
+    Raises TemplateSyntaxError for invalid templates, SecurityError for unsafe
+    ones and another TemplateError if the trial render fails
+    """
+    subject, body = _text_env.from_string(subject_template), _html_env.from_string(body_template)
+    try:
+        subject.render(SAMPLE_CONTEXT)
+        body.render(SAMPLE_CONTEXT)
+    except TemplateError:
+        raise
+    except Exception as e:
+        # e.g. ZeroDivisionError from {{ 1/0 }}
+        raise TemplateRuntimeError(f"{type(e).__name__}: {e}") from e
+    return subject, body
+
+def _load():
+    compiled = {kind: compile_template(*sources) for kind, sources in DEFAULT_TEMPLATES.items()}
+    db = SessionLocal()
+    try:
+        rows = db.query(
+            models.NotificationTemplate.kind,
+            models.NotificationTemplate.subject_template,
+            models.NotificationTemplate.body_template
+        ).all()
+    finally:
+        db.close()
+    for kind, subject, body in rows:
+        default_subject, default_body = DEFAULT_TEMPLATES.get(kind, ("", ""))
+        try:
+            compiled[kind] = compile_template(subject or default_subject, body or default_body)
+        except TEMPLATE_ERRORS as e:
+            logger.error(f"Notification template '{kind}' does not compile, using default: {e}")
+    return compiled
+
+def _templates(kind: str):
+    global _compiled, _loaded_at
+    with _lock:
+        if _loaded_at is None or time.monotonic() - _loaded_at > CACHE_TTL_SECONDS:
+            _compiled = _load()
+            _loaded_at = time.monotonic()
+        templates = _compiled.get(kind)
+    if templates is None:
+        raise KeyError(f"Unknown notification template: {kind}")
+    return templates
+
+def invalidate():
+    global _loaded_at
+    with _lock:
+        _loaded_at = None
+
+def render(kind: str, **context):
+    """Returns (subject, html)"""
+    subject, body = _templates(kind)
+    return subject.render(context).strip(), body.render(context)
+
+def render_batch(kind: str, contexts: list, **common):
+    """Renders one (subject, html) per context; `common` values are shared by all"""
+    subject, body = _templates(kind)
+    results = []
+    for context in contexts:
+        values = {**common, **context}
+        results.append((subject.render(values).strip(), body.render(values)))
+    return results
+
+# --- Invalidation: any committed change to notification_templates ---
+
+@event.listens_for(Session, "after_flush")
+def _track_template_changes(session, flush_context):
+    for obj in (*session.new, *session.dirty, *session.deleted):
+        if isinstance(obj, models.NotificationTemplate):
+            session.info["notification_templates_changed"] = True
+            return
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_after_commit(session):
+    if session.info.pop("notification_templates_changed", False):
+        invalidate()
@@ -0,0 +1,99 @@
+import base64
+import binascii
+import datetime
+import json
+from fastapi import HTTPException, Response
+from sqlalchemy import and_, func, or_
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 500
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+class Page(list):
+    """A list of rows plus the opaque cursor for the next page (None on the last page)"""
+    def __init__(self, items=(), next_cursor=None):
+        super().__init__(items)
+        self.next_cursor = next_cursor
+
+def _encode_value(value):
+    if isinstance(value, datetime.datetime):
+        return {"dt": value.isoformat()}
+    return value
+
+def _decode_value(value):
+    if isinstance(value, dict) and "dt" in value:
+        return datetime.datetime.fromisoformat(value["dt"])
+    return value
+
+def encode_cursor(values) -> str:
+    raw = json.dumps([_encode_value(v) for v in values], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+def decode_cursor(cursor: str, size: int) -> list:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        values = [_decode_value(v) for v in json.loads(raw)]
+    except (binascii.Error, ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    if not isinstance(values, list) or len(values) != size:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return values
+
+def _terms(order):
+    """
+    Normalizes `order` entries, (column, descending) or (column, descending,
+    null_value), to (sort expression, descending, column, null_value).
+    A nullable column must give a null_value: it is sorted as
+    COALESCE(column, null_value), so NULLs order the same on every backend
+    and a NULL cursor value still compares.
+    """
+    terms = []
+    for column, descending, *null in order:
+        null_value = null[0] if null else None
+        expression = column if null_value is None else func.coalesce(column, null_value)
+        terms.append((expression, descending, column, null_value))
+    return terms
+
+def _after(terms, values):
+    """
+    Keyset predicate: rows strictly after `values` in the ordering `terms`.
+    Mixed directions rule out a row-value comparison, so this expands to
+    (a > x) OR (a = x AND b < y) OR ...
+    """
+    clauses = []
+    for i, (expression, descending, _, _) in enumerate(terms):
+        equal = [terms[j][0] == values[j] for j in range(i)]
+        beyond = expression < values[i] if descending else expression > values[i]
+        clauses.append(and_(*equal, beyond))
+    return or_(*clauses)
+
+def paginate(query, order, cursor: str = None, limit: int = None, key=None) -> Page:
+    """
+    Applies a stable ORDER BY and, when `limit` is given, keyset pagination.
+    `order` is a list of (column, descending[, null_value]) and must end in a
+    unique column so the ordering is total. `key` extracts the ordering values
+    from a result row (defaults to reading the ordering columns as attributes
+    of the row, with NULLs replaced by their null_value).
+    """
+    terms = _terms(order)
+    query = query.order_by(*[expression.desc() if descending else expression.asc() for expression, descending, _, _ in terms])
+    if cursor:
+        query = query.filter(_after(terms, decode_cursor(cursor, len(terms))))
+    if limit is None:
+        return Page(query.all())
+
+    rows = query.limit(limit + 1).all()
+    if len(rows) <= limit:
+        return Page(rows)
+
+    rows = rows[:limit]
+    if key is None:
+        key = lambda row: [
+            null_value if getattr(row, column.key) is None else getattr(row, column.key)
+            for _, _, column, null_value in terms
+        ]
+    return Page(rows, encode_cursor(key(rows[-1])))
+
+def set_next_cursor(response: Response, page: Page):
+    if page.next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = page.next_cursor
@@ -0,0 +1,93 @@
+"""
+Password hashing off the event loop.
+
+bcrypt costs a few hundred milliseconds of CPU per hash or verify, which
+would stall every request on the worker if run inline in an async endpoint.
+hash_password() and verify_password() run it in a small bounded thread pool
+(the bcrypt C extension releases the GIL). At most MAX_PENDING operations may
+be queued or running; past that callers get a 503 with Retry-After instead
+of an ever-growing queue.
+
+BCRYPT_ROUNDS sets the work factor for new hashes. Hashes with a different
+factor still verify, and verify_password() returns a replacement hash so the
+caller can upgrade it on successful login.
+
+Configuration: BCRYPT_ROUNDS, PASSWORD_HASH_WORKERS, PASSWORD_HASH_MAX_PENDING.
+"""
+import asyncio
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from fastapi import HTTPException
+from passlib.context import CryptContext
+
+ROUNDS = int(os.getenv("BCRYPT_ROUNDS", 12))
+WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", min(4, os.cpu_count() or 1)))
+MAX_PENDING = int(os.getenv("PASSWORD_HASH_MAX_PENDING", 256))
+RETRY_AFTER_SECONDS = 1
+
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=ROUNDS)
+
+_executor = ThreadPoolExecutor(max_workers=WORKERS, thread_name_prefix="bcrypt")
+_lock = threading.Lock()
+_stats = {
+    "pending": 0, "running": 0, "max_pending": 0,
+    "completed": 0, "rejected": 0, "wait_total": 0.0, "run_total": 0.0,
+}
+
+def _timed(fn, submitted_at: float, *args):
+    started = time.monotonic()
+    with _lock:
+        _stats["running"] += 1
+        _stats["wait_total"] += started - submitted_at
+    try:
+        return fn(*args)
+    finally:
+        with _lock:
+            _stats["running"] -= 1
+            _stats["run_total"] += time.monotonic() - started
+
+async def _offload(fn, *args):
+    with _lock:
+        if _stats["pending"] >= MAX_PENDING:
+            _stats["rejected"] += 1
+            raise HTTPException(
+                status_code=503, detail="Server busy, please retry shortly",
+                headers={"Retry-After": str(RETRY_AFTER_SECONDS)}
+            )
+        _stats["pending"] += 1
+        _stats["max_pending"] = max(_stats["max_pending"], _stats["pending"])
+    try:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(_executor, _timed, fn, time.monotonic(), *args)
+    finally:
+        with _lock:
+            _stats["pending"] -= 1
+            _stats["completed"] += 1
+
+async def hash_password(password: str) -> str:
+    return await _offload(pwd_context.hash, password)
+
+async def verify_password(password: str, hashed_password: str):
+    """Returns (valid, new_hash); new_hash is set when the stored hash should be upgraded"""
+    if not password or not hashed_password:
+        return False, None
+    return await _offload(pwd_context.verify_and_update, password, hashed_password)
+
+def metrics() -> dict:
+    with _lock:
+        completed = _stats["completed"]
+        return {
+            "rounds": ROUNDS,
+            "workers": WORKERS,
+            "max_pending": MAX_PENDING,
+            "pending": _stats["pending"],
+            "running": _stats["running"],
+            "queued": max(_stats["pending"] - _stats["running"], 0),
+            "peak_pending": _stats["max_pending"],
+            "completed": completed,
+            "rejected": _stats["rejected"],
+            "avg_wait_ms": round(_stats["wait_total"] / completed * 1000, 1) if completed else None,
+            "avg_hash_ms": round(_stats["run_total"] / completed * 1000, 1) if completed else None,
+        }
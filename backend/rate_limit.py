@@ -0,0 +1,212 @@
+"""
+Sliding-window rate limits for the password endpoints.
+
+/auth/login and /auth/register each spend a bcrypt hash per call, so they
+are throttled before any password work happens: per client IP, and for login
+also per (username, client IP) pair. A rejected call gets 429 with
+Retry-After. /auth/refresh is deliberately not limited; it needs a valid
+refresh token and costs no bcrypt.
+
+The username rule counts failed logins only. Every attempt reserves a hit
+before the password is checked (so concurrent guesses can't all slip past
+the limit while bcrypt runs), and a correct password refunds it. The rule is
+scoped to the client IP so that failures from elsewhere can never lock the
+real user out of their account; guessing one account from many addresses is
+still bounded by each address's per-IP limit.
+
+Each rule keeps the timestamps of recent hits per key (a sliding log), so a
+client gets exactly `limit` calls in any `window` seconds.
+
+Backends:
+  memory  per process (default); with N workers a client gets up to N x limit
+  sqlite  one SQLite file shared by every worker on the host
+          (RATE_LIMIT_SQLITE_PATH), a local stand-in for a shared store
+
+Configuration: RATE_LIMIT_BACKEND, RATE_LIMIT_SQLITE_PATH,
+RATE_LIMIT_TRUST_PROXY (use X-Forwarded-For as the client IP),
+LOGIN_LIMIT_PER_IP, LOGIN_LIMIT_PER_USERNAME, REGISTER_LIMIT_PER_IP
+(each "<count>/<seconds>").
+"""
+import math
+import os
+import sqlite3
+import threading
+import time
+from collections import deque
+from fastapi import Depends, HTTPException, Request
+from fastapi.security import OAuth2PasswordRequestForm
+
+BACKEND = os.getenv("RATE_LIMIT_BACKEND", "memory")
+SQLITE_PATH = os.getenv("RATE_LIMIT_SQLITE_PATH", "data/rate_limit.db")
+TRUST_PROXY = os.getenv("RATE_LIMIT_TRUST_PROXY", "0") == "1"
+MAX_KEYS = 100_000 # memory backend: forget the stalest keys past this
+PRUNE_EVERY = 1000 # sqlite backend: sweep keys nobody hits any more every N hits
+
+def _parse(value: str):
+    count, seconds = value.split("/")
+    return int(count), float(seconds)
+
+class MemoryBackend:
+    def __init__(self):
+        self._hits = {} # key -> deque of timestamps
+        self._lock = threading.Lock()
+        self._max_window = 0.0
+
+    def hit(self, key: str, limit: int, window: float, now: float):
+        """Records a hit when allowed; returns (allowed, retry_after_seconds)"""
+        with self._lock:
+            self._max_window = max(self._max_window, window)
+            hits = self._hits.get(key)
+            if hits is None:
+                if len(self._hits) >= MAX_KEYS:
+                    self._prune(now)
+                hits = self._hits[key] = deque()
+            while hits and hits[0] <= now - window:
+                hits.popleft()
+            if len(hits) >= limit:
+                return False, hits[0] + window - now
+            hits.append(now)
+            return True, 0.0
+
+    def release(self, key: str, now: float):
+        """Removes the hit recorded at `now`"""
+        with self._lock:
+            hits = self._hits.get(key)
+            if hits and now in hits: # Gone if the key was pruned or reset
+                hits.remove(now)
+
+    def _prune(self, now: float):
+        for key in [k for k, hits in self._hits.items() if not hits or hits[-1] <= now - self._max_window]:
+            del self._hits[key]
+        while len(self._hits) >= MAX_KEYS:
+            del self._hits[next(iter(self._hits))]
+
+    def reset(self):
+        with self._lock:
+            self._hits.clear()
+
+class SQLiteBackend:
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+        self._max_window = 0.0
+        self._hits_since_prune = 0
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        conn = self._conn()
+        conn.execute("CREATE TABLE IF NOT EXISTS rate_limit_hits (key TEXT NOT NULL, ts REAL NOT NULL)")
+        conn.execute("CREATE INDEX IF NOT EXISTS ix_rate_limit_hits_key_ts ON rate_limit_hits (key, ts)")
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            # Autocommit mode; transactions are explicit BEGIN IMMEDIATE below
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def hit(self, key: str, limit: int, window: float, now: float):
+        conn = self._conn()
+        self._max_window = max(self._max_window, window)
+        self._hits_since_prune += 1
+        if self._hits_since_prune >= PRUNE_EVERY:
+            self._hits_since_prune = 0
+            conn.execute("DELETE FROM rate_limit_hits WHERE ts <= ?", (now - self._max_window,))
+        # IMMEDIATE takes the write lock up front so count-then-insert is atomic across workers
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute("DELETE FROM rate_limit_hits WHERE key = ? AND ts <= ?", (key, now - window))
+            count, oldest = conn.execute(
+                "SELECT COUNT(*), MIN(ts) FROM rate_limit_hits WHERE key = ?", (key,)
+            ).fetchone()
+            if count >= limit:
+                conn.execute("COMMIT")
+                return False, oldest + window - now
+            conn.execute("INSERT INTO rate_limit_hits (key, ts) VALUES (?, ?)", (key, now))
+            conn.execute("COMMIT")
+            return True, 0.0
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+
+    def release(self, key: str, now: float):
+        self._conn().execute(
+            "DELETE FROM rate_limit_hits WHERE rowid = (SELECT rowid FROM rate_limit_hits WHERE key = ? AND ts = ? LIMIT 1)",
+            (key, now)
+        )
+
+    def reset(self):
+        self._conn().execute("DELETE FROM rate_limit_hits")
+
+backend = SQLiteBackend(SQLITE_PATH) if BACKEND == "sqlite" else MemoryBackend()
+
+class Rule:
+    def __init__(self, name: str, setting: str, default: str):
+        self.name = name
+        self.limit, self.window = _parse(os.getenv(setting, default))
+        self.allowed = 0
+        self.rejected = 0
+
+    def check(self, identity: str) -> float:
+        """Raises 429 once `identity` has used up its calls in the window; returns the hit's timestamp"""
+        now = time.time()
+        allowed, retry_after = backend.hit(f"{self.name}:{identity}", self.limit, self.window, now)
+        if allowed:
+            self.allowed += 1
+            return now
+        self.rejected += 1
+        raise HTTPException(
+            status_code=429, detail="Too many attempts, please try again later",
+            headers={"Retry-After": str(max(1, math.ceil(retry_after)))}
+        )
+
+    def refund(self, identity: str, hit_at: float):
+        """Takes back the hit check() recorded at `hit_at`"""
+        backend.release(f"{self.name}:{identity}", hit_at)
+
+LOGIN_PER_IP = Rule("login-ip", "LOGIN_LIMIT_PER_IP", "20/60")
+LOGIN_PER_USERNAME = Rule("login-user", "LOGIN_LIMIT_PER_USERNAME", "10/300") # failed logins per (username, IP)
+REGISTER_PER_IP = Rule("register-ip", "REGISTER_LIMIT_PER_IP", "5/600")
+RULES = (LOGIN_PER_IP, LOGIN_PER_USERNAME, REGISTER_PER_IP)
+
+def client_ip(request: Request) -> str:
+    if TRUST_PROXY:
+        forwarded = request.headers.get("x-forwarded-for")
+        if forwarded:
+            return forwarded.split(",")[0].strip()
+    return request.client.host if request.client else "unknown"
+
+def _username(username: str) -> str:
+    return (username or "").strip().lower()
+
+class LoginAttempt:
+    """The username hit reserved for one login; refunded if the password is right"""
+    def __init__(self, identity: str, hit_at: float):
+        self.identity = identity
+        self.hit_at = hit_at
+
+    def succeeded(self):
+        LOGIN_PER_USERNAME.refund(self.identity, self.hit_at)
+
+def limit_login(request: Request, form_data: OAuth2PasswordRequestForm = Depends()) -> LoginAttempt:
+    # Same OAuth2PasswordRequestForm dependency as the endpoint, so the form is parsed once
+    ip = client_ip(request)
+    LOGIN_PER_IP.check(ip)
+    identity = f"{_username(form_data.username)}|{ip}"
+    return LoginAttempt(identity, LOGIN_PER_USERNAME.check(identity))
+
+def limit_register(request: Request):
+    REGISTER_PER_IP.check(client_ip(request))
+
+def metrics() -> dict:
+    return {
+        "backend": BACKEND,
+        "rules": [
+            {"rule": rule.name, "limit": rule.limit, "window_seconds": rule.window,
+             "allowed": rule.allowed, "rejected": rule.rejected}
+            for rule in RULES
+        ],
+    }
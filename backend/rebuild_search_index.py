@@ -0,0 +1,36 @@
+"""
+Rebuilds the full-text candidate search index from users, skills and active
+resumes. Safe to re-run; also creates the search table/indexes if missing.
+"""
+from database import SessionLocal, engine
+from sqlalchemy import text
+import models, search_index
+
+BATCH_SIZE = 500
+
+def rebuild():
+    search_index.ensure_search_schema(engine)
+
+    db = SessionLocal()
+    try:
+        user_ids = [uid for (uid,) in db.query(models.User.id).order_by(models.User.id).all()]
+        print(f"Indexing {len(user_ids)} users...")
+
+        for i, user_id in enumerate(user_ids, start=1):
+            search_index.refresh_student(db, user_id)
+            if i % BATCH_SIZE == 0:
+                db.commit()
+                print(f"  {i}/{len(user_ids)}")
+        db.commit()
+
+        if engine.dialect.name == "sqlite":
+            # Re-derive the FTS5 index from the documents table in one pass
+            db.execute(text(f"INSERT INTO {search_index.FTS_TABLE}({search_index.FTS_TABLE}) VALUES ('rebuild')"))
+            db.commit()
+
+        print("Search index rebuilt.")
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    rebuild()
@@ -0,0 +1,80 @@
+"""
+Rebuilds the per-event counter columns (seats, registrations, feedback) from the
+registrations table and reports any drift from the maintained values.
+
+    python reconcile_event_counters.py            # report drift and fix it
+    python reconcile_event_counters.py --dry-run  # report only
+"""
+import sys
+from sqlalchemy import func, case
+import database, models
+
+COUNTERS = [
+    "registrations_count",
+    "confirmed_count",
+    "waitlisted_count",
+    "pending_count",
+    "feedback_count",
+    "rating_sum",
+]
+
+def _main_status_count(status):
+    Registration = models.Registration
+    return func.sum(case(
+        ((Registration.session_id == None) & (Registration.status == status), 1),
+        else_=0
+    ))
+
+def compute_counters(db):
+    """One grouped pass over registrations -> {event_id: {counter: value}}"""
+    Registration = models.Registration
+    rows = db.query(
+        Registration.event_id,
+        func.count(Registration.id),
+        _main_status_count("confirmed"),
+        _main_status_count("waitlisted"),
+        _main_status_count("pending"),
+        func.count(Registration.feedback_rating),
+        func.coalesce(func.sum(Registration.feedback_rating), 0),
+    ).group_by(Registration.event_id).all()
+
+    return {
+        row[0]: dict(zip(COUNTERS, (int(v or 0) for v in row[1:])))
+        for row in rows
+    }
+
+def reconcile(dry_run=False):
+    db = database.SessionLocal()
+    try:
+        actual = compute_counters(db)
+        events = db.query(models.Event).all()
+        drifted = 0
+
+        for event in events:
+            expected = actual.get(event.id, dict.fromkeys(COUNTERS, 0))
+            diffs = {
+                name: (getattr(event, name), value)
+                for name, value in expected.items()
+                if (getattr(event, name) or 0) != value or getattr(event, name) is None
+            }
+            if not diffs:
+                continue
+
+            drifted += 1
+            detail = ", ".join(f"{name} {stored} -> {value}" for name, (stored, value) in diffs.items())
+            print(f"Event {event.id} ({event.title}): {detail}")
+            if not dry_run:
+                for name, (_, value) in diffs.items():
+                    setattr(event, name, value)
+
+        if drifted and not dry_run:
+            db.commit()
+
+        action = "found" if dry_run else "fixed"
+        print(f"Checked {len(events)} events, {action} drift on {drifted}.")
+        return drifted
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    reconcile(dry_run="--dry-run" in sys.argv)
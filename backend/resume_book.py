@@ -0,0 +1,108 @@
+"""
+Streaming ZIP export of a filtered event roster ("resume book").
+
+The archive is produced incrementally: the roster is read in keyset pages,
+each PDF is copied into the archive in CHUNK_SIZE pieces, and whatever the
+ZipFile has written so far is yielded straight to the client. Nothing is
+buffered beyond one chunk plus the CSV manifest rows, and no temp files are
+used. PDFs are already compressed, so entries are ZIP_STORED.
+"""
+import csv
+import io
+import re
+import zipfile
+from database import SessionLocal
+import crud, models
+
+PAGE_SIZE = 200
+CHUNK_SIZE = 64 * 1024
+
+MANIFEST_COLUMNS = [
+    "file", "student_id", "name", "email", "major", "graduation_year",
+    "skills", "registration_status", "search_rank", "resume_uploaded_at",
+]
+
+class _StreamSink(io.RawIOBase):
+    """Unseekable write target; ZipFile falls back to data descriptors"""
+    def __init__(self):
+        self._chunks = []
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+def _slug(value: str) -> str:
+    return re.sub(r"[^A-Za-z0-9]+", "_", value or "").strip("_") or "student"
+
+def _active_resumes(db, user_ids):
+    resumes = db.query(
+        models.Resume.user_id, models.Resume.file_path, models.Resume.uploaded_at
+    ).filter(
+        models.Resume.user_id.in_(user_ids),
+        models.Resume.is_active == True
+    ).all()
+    return {r.user_id: r for r in resumes}
+
+def _roster_pages(db, event_id: int, skill: str, q: str):
+    cursor = None
+    while True:
+        page = crud.get_event_registrations_filtered(
+            db, event_id, skill_query=skill, resume_query=q,
+            cursor=cursor, limit=PAGE_SIZE, load=crud.RESUME_BOOK_LOAD
+        )
+        yield page
+        if not page.next_cursor:
+            return
+        cursor = page.next_cursor
+        db.expunge_all() # Keep the identity map at one page
+
+def iter_resume_book(event_id: int, skill: str = None, q: str = None):
+    """
+    Yields the ZIP bytes. Runs in Starlette's threadpool (sync generator), so
+    blocking file reads are fine; it opens its own session because the
+    request's session is closed once the response starts.
+    """
+    db = SessionLocal()
+    sink = _StreamSink()
+    manifest = io.StringIO()
+    writer = csv.writer(manifest)
+    writer.writerow(MANIFEST_COLUMNS)
+    try:
+        with zipfile.ZipFile(sink, mode="w", compression=zipfile.ZIP_STORED) as archive:
+            index = 0
+            for page in _roster_pages(db, event_id, skill, q):
+                resumes = _active_resumes(db, [reg.user_id for reg in page])
+                for reg in page:
+                    student = reg.student
+                    resume = resumes.get(reg.user_id)
+                    arcname = ""
+                    if resume:
+                        index += 1
+                        arcname = f"resumes/{index:04d}_{_slug(student.name)}_{student.id}.pdf"
+                        try:
+                            with open(resume.file_path, "rb") as src, archive.open(arcname, mode="w") as dest:
+                                for chunk in iter(lambda: src.read(CHUNK_SIZE), b""):
+                                    dest.write(chunk)
+                                    yield sink.drain()
+                        except FileNotFoundError:
+                            arcname = "" # Missing on disk: listed in the manifest without a file
+                    writer.writerow([
+                        arcname, student.id, student.name, student.email, student.major or "",
+                        student.graduation_year or "", ", ".join(s.skill_name for s in student.skills),
+                        reg.status, getattr(reg, "search_rank", None) or "",
+                        resume.uploaded_at.isoformat() if resume and resume.uploaded_at else "",
+                    ])
+                yield sink.drain()
+
+            archive.writestr("manifest.csv", manifest.getvalue())
+        yield sink.drain()
+    finally:
+        db.close()
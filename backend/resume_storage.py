@@ -0,0 +1,164 @@
+"""
+Resume upload storage.
+
+Uploads are copied in fixed-size chunks: the size cap is enforced while
+reading, the SHA-256 is computed in the same pass, and disk writes run in
+worker threads so the event loop never blocks on I/O. Data lands in a temp
+file next to its destination and is renamed into place only once complete,
+so readers never see a partial PDF.
+
+Files are content-addressed: each distinct PDF is stored once under
+blobs/<first two hex chars>/<sha256>.pdf and shared by every Resume row with
+that hash (reference counted in models.ResumeBlob). Unreferenced blobs are
+reclaimed by gc_resume_blobs.py. An upload takes its reference before it
+looks for an existing copy of the content, so GC can never delete a blob an
+upload has just decided to reuse (see save_upload).
+"""
+import asyncio
+import hashlib
+import os
+import shutil
+import tempfile
+from dataclasses import dataclass
+from fastapi import HTTPException, Request, UploadFile
+from fastapi.responses import FileResponse, Response
+
+RESUME_DIR = "data/resumes"
+BLOB_DIR = os.path.join(RESUME_DIR, "blobs")
+TEMP_PREFIX = ".upload_"
+MAX_BYTES = int(os.getenv("RESUME_MAX_BYTES", 5 * 1024 * 1024))
+CHUNK_SIZE = 64 * 1024
+PDF_MAGIC = b"%PDF-"
+
+# Downloads: reviewers (the roles admitted by the judge and recruiter resume
+# routes) may reuse a copy briefly and then revalidate against the ETag;
+# owners always revalidate their own (re-uploadable) resume
+CACHE_CONTROL = {
+    "judge": "private, max-age=300",
+    "recruiter": "private, max-age=300",
+    "admin": "private, max-age=300",
+}
+DEFAULT_CACHE_CONTROL = "private, no-cache"
+
+@dataclass
+class StoredFile:
+    path: str
+    sha256: str
+    size_bytes: int
+    deduplicated: bool = False
+
+def blob_path(sha256: str, directory: str = BLOB_DIR) -> str:
+    return os.path.join(directory, sha256[:2], f"{sha256}.pdf")
+
+def _finalize(handle, temp_path: str, final_path: str) -> bool:
+    """Moves the temp file to final_path; returns True if that content was already stored"""
+    handle.flush()
+    os.fsync(handle.fileno())
+    handle.close()
+    if os.path.exists(final_path):
+        os.remove(temp_path)
+        return True
+    os.makedirs(os.path.dirname(final_path), exist_ok=True)
+    os.replace(temp_path, final_path)
+    return False
+
+def _discard(handle, temp_path: str):
+    handle.close()
+    try:
+        os.remove(temp_path)
+    except FileNotFoundError:
+        pass
+
+async def save_upload(upload: UploadFile, directory: str = BLOB_DIR, max_bytes: int = MAX_BYTES,
+                      reserve=None) -> StoredFile:
+    """
+    Streams `upload` into the blob store under `directory`.
+    Raises 400 if the content isn't a PDF and 413 once it exceeds max_bytes.
+    `reserve(sha256, path, size_bytes)` is called (in a worker thread) once the
+    hash is known and must commit a reference on the blob
+    (crud.reserve_resume_blob) before the existing file, if any, is reused.
+    """
+    os.makedirs(directory, exist_ok=True)
+
+    first = await upload.read(CHUNK_SIZE)
+    if not first.startswith(PDF_MAGIC):
+        raise HTTPException(status_code=400, detail="Only PDF files are allowed")
+
+    fd, temp_path = tempfile.mkstemp(dir=directory, prefix=TEMP_PREFIX, suffix=".part")
+    handle = os.fdopen(fd, "wb")
+    digest = hashlib.sha256()
+    size = 0
+    chunk = first
+    try:
+        while chunk:
+            size += len(chunk)
+            if size > max_bytes:
+                raise HTTPException(status_code=413, detail=f"Resume exceeds the {max_bytes // (1024 * 1024)}MB limit")
+            digest.update(chunk)
+            await asyncio.to_thread(handle.write, chunk)
+            chunk = await upload.read(CHUNK_SIZE)
+
+        sha256 = digest.hexdigest()
+        final_path = blob_path(sha256, directory)
+        if reserve is not None:
+            await asyncio.to_thread(reserve, sha256, final_path, size)
+        deduplicated = await asyncio.to_thread(_finalize, handle, temp_path, final_path)
+    except BaseException:
+        await asyncio.to_thread(_discard, handle, temp_path)
+        raise
+
+    return StoredFile(path=final_path, sha256=sha256, size_bytes=size, deduplicated=deduplicated)
+
+def hash_file(path: str):
+    """Returns (sha256, size_bytes) for a file already on disk."""
+    digest = hashlib.sha256()
+    size = 0
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b""):
+            digest.update(chunk)
+            size += len(chunk)
+    return digest.hexdigest(), size
+
+def store_file(path: str, directory: str = BLOB_DIR) -> StoredFile:
+    """Copies an existing file into the blob store (used by the migration)"""
+    sha256, size = hash_file(path)
+    final_path = blob_path(sha256, directory)
+    if os.path.exists(final_path):
+        return StoredFile(path=final_path, sha256=sha256, size_bytes=size, deduplicated=True)
+    os.makedirs(directory, exist_ok=True)
+    fd, temp_path = tempfile.mkstemp(dir=directory, prefix=TEMP_PREFIX, suffix=".part")
+    handle = os.fdopen(fd, "wb")
+    try:
+        with open(path, "rb") as src:
+            shutil.copyfileobj(src, handle, CHUNK_SIZE)
+        deduplicated = _finalize(handle, temp_path, final_path)
+    except BaseException:
+        _discard(handle, temp_path)
+        raise
+    return StoredFile(path=final_path, sha256=sha256, size_bytes=size, deduplicated=deduplicated)
+
+def _etag_matches(if_none_match: str, etag: str) -> bool:
+    if if_none_match.strip() == "*":
+        return True
+    # If-None-Match uses weak comparison
+    candidates = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+    return etag in candidates
+
+def resume_download(request: Request, resume, role: str = None) -> Response:
+    """
+    Serves a resume PDF with a strong ETag (the content hash), a Cache-Control
+    for the reviewer `role` (None: the owner's own download) and conditional
+    GET. Range requests (PDF viewers fetching pages lazily) and If-Range are
+    handled by FileResponse.
+    """
+    if not resume.file_path or not os.path.exists(resume.file_path):
+        raise HTTPException(status_code=404, detail="Resume file not found")
+
+    headers = {"Cache-Control": CACHE_CONTROL.get(role, DEFAULT_CACHE_CONTROL)}
+    if resume.sha256:
+        headers["ETag"] = f'"{resume.sha256}"'
+        if_none_match = request.headers.get("if-none-match")
+        if if_none_match and _etag_matches(if_none_match, headers["ETag"]):
+            return Response(status_code=304, headers=headers)
+
+    return FileResponse(resume.file_path, media_type="application/pdf", filename=resume.file_name_original, headers=headers)
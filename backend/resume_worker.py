@@ -0,0 +1,183 @@
+"""
+Off-request resume text extraction.
+
+PDF parsing is CPU-bound, so it runs in a process pool instead of on the
+event loop. Uploads only claim the resume and submit it; results are
+persisted (and the search index refreshed) from the pool's callback.
+Failures are retried with exponential backoff up to MAX_ATTEMPTS. The
+retry time is stored on the row (extraction_next_attempt_at); a timer in the
+failing process resubmits it when due, and the scheduler's periodic sweep
+resubmits every pending row that is due, so a retry whose timer died with
+its process still happens.
+
+A claim records when it was taken. If the process holding it dies, the row
+would stay "processing" forever, so claims older than CLAIM_TIMEOUT_SECONDS
+are released back to pending (counting as a failed attempt, since the PDF
+may be what killed the worker) at startup and by the sweep.
+"""
+import datetime
+import logging
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from sqlalchemy import case, func, or_
+from pypdf import PdfReader
+from database import SessionLocal
+import models, search_index, jobs
+
+logger = logging.getLogger(__name__)
+
+MAX_WORKERS = int(os.getenv("RESUME_EXTRACT_WORKERS", 2))
+MAX_ATTEMPTS = int(os.getenv("RESUME_EXTRACT_MAX_ATTEMPTS", 3))
+RETRY_DELAY_SECONDS = int(os.getenv("RESUME_EXTRACT_RETRY_SECONDS", 30))
+# Longer than any extraction takes; older claims belong to a dead process
+CLAIM_TIMEOUT_SECONDS = int(os.getenv("RESUME_EXTRACT_CLAIM_TIMEOUT_SECONDS", 600))
+# Often enough that a due retry or a stale claim doesn't wait long
+SWEEP_SECONDS = max(min(RETRY_DELAY_SECONDS, CLAIM_TIMEOUT_SECONDS // 2), 1)
+
+_executor = None
+_executor_lock = threading.Lock()
+
+def extract_pdf_text(file_path: str):
+    """Returns (text, page_count). Runs inside a pool worker process."""
+    reader = PdfReader(file_path)
+    pages = [page.extract_text() or "" for page in reader.pages]
+    return "\n".join(pages), len(pages)
+
+def _get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            # spawn: don't fork a process that holds DB connections and threads
+            _executor = ProcessPoolExecutor(
+                max_workers=MAX_WORKERS, mp_context=multiprocessing.get_context("spawn")
+            )
+        return _executor
+
+def _claim(resume_id: int):
+    """pending -> processing; returns the file path, or None if someone else has it"""
+    db = SessionLocal()
+    try:
+        claimed = db.query(models.Resume).filter(
+            models.Resume.id == resume_id,
+            models.Resume.extraction_status == "pending"
+        ).update({
+            "extraction_status": "processing",
+            "extraction_claimed_at": datetime.datetime.utcnow(),
+            "extraction_next_attempt_at": None,
+        }, synchronize_session=False)
+        db.commit()
+        if not claimed:
+            return None
+        return db.query(models.Resume.file_path).filter(models.Resume.id == resume_id).scalar()
+    finally:
+        db.close()
+
+def enqueue(resume_id: int):
+    """Submits a pending resume for extraction; returns the future (None if not claimed)"""
+    file_path = _claim(resume_id)
+    if not file_path:
+        return None
+    future = _get_executor().submit(extract_pdf_text, file_path)
+    future.add_done_callback(lambda f: _on_done(resume_id, f))
+    return future
+
+def _on_done(resume_id: int, future):
+    db = SessionLocal()
+    try:
+        resume = db.query(models.Resume).filter(models.Resume.id == resume_id).first()
+        if not resume:
+            return # Deleted while extracting
+        resume.extraction_attempts = (resume.extraction_attempts or 0) + 1
+
+        try:
+            text, page_count = future.result()
+        except Exception as e:
+            resume.extraction_error = str(e)[:1000]
+            if resume.extraction_attempts < MAX_ATTEMPTS:
+                delay = RETRY_DELAY_SECONDS * 2 ** (resume.extraction_attempts - 1)
+                resume.extraction_status = "pending"
+                resume.extraction_next_attempt_at = datetime.datetime.utcnow() + datetime.timedelta(seconds=delay)
+                logger.warning(f"Extraction failed for resume {resume_id} (attempt {resume.extraction_attempts}), retrying in {delay}s: {e}")
+                timer = threading.Timer(delay, enqueue, args=(resume_id,))
+                timer.daemon = True
+                timer.start()
+            else:
+                resume.extraction_status = "failed"
+                logger.error(f"Extraction failed for resume {resume_id}, giving up: {e}")
+            db.commit()
+            return
+
+        resume.content_text = text
+        resume.page_count = page_count
+        resume.extraction_status = "done"
+        resume.extraction_error = None
+        resume.extracted_at = datetime.datetime.utcnow()
+        if resume.is_active:
+            search_index.refresh_student(db, resume.user_id)
+        db.commit()
+        logger.info(f"Extracted {page_count} pages from resume {resume_id}")
+    except Exception as e:
+        logger.error(f"Could not persist extraction for resume {resume_id}: {e}")
+        db.rollback()
+    finally:
+        db.close()
+
+def requeue_pending():
+    """Submits every pending resume that is due (new, or its retry backoff has passed)"""
+    Resume = models.Resume
+    db = SessionLocal()
+    try:
+        resume_ids = [rid for (rid,) in db.query(Resume.id).filter(
+            Resume.extraction_status == "pending",
+            or_(Resume.extraction_next_attempt_at == None,
+                Resume.extraction_next_attempt_at <= datetime.datetime.utcnow())
+        ).all()]
+    finally:
+        db.close()
+    futures = [enqueue(rid) for rid in resume_ids]
+    return [f for f in futures if f is not None]
+
+def release_stale_claims() -> int:
+    """processing -> pending (or failed, out of attempts) for claims older than CLAIM_TIMEOUT_SECONDS"""
+    Resume = models.Resume
+    cutoff = datetime.datetime.utcnow() - datetime.timedelta(seconds=CLAIM_TIMEOUT_SECONDS)
+    attempts = func.coalesce(Resume.extraction_attempts, 0) + 1
+    db = SessionLocal()
+    try:
+        released = db.query(Resume).filter(
+            Resume.extraction_status == "processing",
+            or_(Resume.extraction_claimed_at == None, Resume.extraction_claimed_at < cutoff)
+        ).update({
+            "extraction_attempts": attempts,
+            "extraction_status": case((attempts >= MAX_ATTEMPTS, "failed"), else_="pending"),
+            "extraction_error": "Extraction worker stopped before finishing",
+            "extraction_next_attempt_at": None,
+        }, synchronize_session=False)
+        db.commit()
+        return released
+    finally:
+        db.close()
+
+@jobs.job("resume-extraction-sweep")
+def sweep(ctx: jobs.RunContext):
+    """Releases stale claims and resubmits the pending resumes that are due"""
+    ctx.rows_scanned = release_stale_claims() + len(requeue_pending())
+    if not ctx.rows_scanned:
+        ctx.skip()
+
+def start():
+    released = release_stale_claims()
+    if released:
+        logger.warning(f"Resume extraction: released {released} claims left by a stopped worker")
+    futures = requeue_pending()
+    if futures:
+        logger.info(f"Resume extraction: requeued {len(futures)} pending resumes")
+
+def shutdown():
+    global _executor
+    with _executor_lock:
+        if _executor is not None:
+            _executor.shutdown(wait=False, cancel_futures=True)
+            _executor = None
@@ -0,0 +1,202 @@
+"""
+Daily analytics rollups.
+
+daily_rollups holds one row per (day, event) with the counters the admin
+time series need, so charts read O(days x events) rows instead of scanning
+registrations. Registration counts (new, confirmed, waitlisted) are bucketed
+by the day the registration was made; attendance and feedback by the day
+the event took place. Only main registrations count: per-session rows
+(session_id set) are always inserted as confirmed and would inflate every
+counter.
+
+The job is incremental. It rebuilds the rows of every event with a
+registration updated since the last run's watermark (minus LOOKBACK, for
+transactions that committed late), plus every event whose seat counters
+(confirmed_count, waitlisted_count: main registrations only, like the
+rollups) no longer match its rollups, which is how deleted registrations
+are noticed, every event whose date moved away from its attendance rows,
+and every event whose category no longer matches the one copied into its rows.
+A deleted pending or rejected registration holds no seat, so it is only
+dropped from the rollups when the event is next rebuilt. Run
+`python rollups.py --rebuild` after the migration or to start from scratch.
+"""
+import datetime
+import os
+import sys
+from sqlalchemy import func, insert, select
+from sqlalchemy.orm import Session
+from database import SessionLocal
+import models, jobs
+
+WATERMARK = "daily_rollups"
+LOOKBACK = datetime.timedelta(minutes=int(os.getenv("ROLLUP_LOOKBACK_MINUTES", 10)))
+EVENT_BATCH_SIZE = 500
+GRANULARITIES = ("day", "week", "month")
+
+COUNTERS = ("new_registrations", "confirmations", "waitlists", "attendance", "feedback_count", "rating_sum")
+
+def _as_date(value):
+    # func.date() returns a string on SQLite and a date on Postgres
+    return datetime.date.fromisoformat(value) if isinstance(value, str) else value
+
+def _changed_events(db: Session, since) -> set:
+    Registration, Rollup, Event = models.Registration, models.DailyRollup, models.Event
+    changed = set()
+    if since is not None:
+        changed.update(event_id for (event_id,) in db.query(Registration.event_id).filter(
+            Registration.updated_at >= since
+        ).distinct())
+
+    rolled = select(
+        Rollup.event_id,
+        func.sum(Rollup.confirmations).label("confirmations"),
+        func.sum(Rollup.waitlists).label("waitlists"),
+    ).group_by(Rollup.event_id).subquery()
+    changed.update(event_id for (event_id,) in db.query(Event.id).outerjoin(
+        rolled, rolled.c.event_id == Event.id
+    ).filter(
+        (func.coalesce(rolled.c.confirmations, 0) != func.coalesce(Event.confirmed_count, 0))
+        | (func.coalesce(rolled.c.waitlists, 0) != func.coalesce(Event.waitlisted_count, 0))
+    ))
+
+    # Rescheduled events: attendance/feedback must move to the new event day
+    changed.update(event_id for (event_id,) in db.query(Rollup.event_id).join(
+        Event, Event.id == Rollup.event_id
+    ).filter(
+        (Rollup.attendance > 0) | (Rollup.feedback_count > 0),
+        Rollup.day != func.date(Event.date_time)
+    ).distinct())
+
+    # Recategorized events: the category filter reads the copy on the rollup rows
+    changed.update(event_id for (event_id,) in db.query(Rollup.event_id).join(
+        Event, Event.id == Rollup.event_id
+    ).filter(
+        Rollup.category.is_distinct_from(Event.category)
+    ).distinct())
+    return changed
+
+def _rebuild_events(db: Session, event_ids: list) -> int:
+    """Replaces the rollup rows of `event_ids`; returns how many rows were written"""
+    Registration, Event = models.Registration, models.Event
+    rows = {} # (day, event_id) -> row dict
+    categories = dict(db.query(Event.id, Event.category).filter(Event.id.in_(event_ids)))
+
+    def row(day, event_id):
+        key = (_as_date(day), event_id)
+        if key not in rows:
+            rows[key] = {"day": key[0], "event_id": event_id, "category": categories.get(event_id),
+                         **{counter: 0 for counter in COUNTERS}}
+        return rows[key]
+
+    # Registration activity, by registration day
+    for day, event_id, new, confirmed, waitlisted in db.query(
+        func.date(Registration.created_at), Registration.event_id,
+        func.count(Registration.id),
+        func.count().filter(Registration.status == "confirmed"),
+        func.count().filter(Registration.status == "waitlisted"),
+    ).filter(
+        Registration.event_id.in_(event_ids), Registration.session_id.is_(None), Registration.created_at.isnot(None)
+    ).group_by(
+        func.date(Registration.created_at), Registration.event_id
+    ):
+        bucket = row(day, event_id)
+        bucket.update(new_registrations=new, confirmations=confirmed, waitlists=waitlisted)
+
+    # Attendance and feedback, by event day
+    for day, event_id, attended, feedback, rating_sum in db.query(
+        func.date(Event.date_time), Registration.event_id,
+        func.count().filter(Registration.attended == True),
+        func.count(Registration.feedback_rating),
+        func.coalesce(func.sum(Registration.feedback_rating), 0),
+    ).join(Event, Event.id == Registration.event_id).filter(
+        Registration.event_id.in_(event_ids), Registration.session_id.is_(None), Event.date_time.isnot(None)
+    ).group_by(func.date(Event.date_time), Registration.event_id):
+        if attended or feedback:
+            bucket = row(day, event_id)
+            bucket.update(attendance=attended, feedback_count=feedback, rating_sum=rating_sum)
+
+    db.query(models.DailyRollup).filter(models.DailyRollup.event_id.in_(event_ids)).delete(synchronize_session=False)
+    if rows:
+        db.execute(insert(models.DailyRollup), list(rows.values()))
+    return len(rows)
+
+@jobs.job("analytics-rollup")
+def refresh(ctx: jobs.RunContext, rebuild: bool = False):
+    db = SessionLocal()
+    try:
+        started_at = datetime.datetime.utcnow()
+        mark = db.get(models.RollupWatermark, WATERMARK)
+        if rebuild:
+            db.query(models.DailyRollup).delete(synchronize_session=False)
+            event_ids = [event_id for (event_id,) in db.query(models.Event.id)]
+        else:
+            since = mark.processed_until - LOOKBACK if mark and mark.processed_until else None
+            event_ids = sorted(_changed_events(db, since))
+            # Rows of deleted events (SQLite doesn't enforce the cascade)
+            db.query(models.DailyRollup).filter(
+                ~models.DailyRollup.event_id.in_(select(models.Event.id))
+            ).delete(synchronize_session=False)
+        if not event_ids and mark is not None:
+            ctx.skip()
+
+        for start in range(0, len(event_ids), EVENT_BATCH_SIZE):
+            ctx.rows_scanned += _rebuild_events(db, event_ids[start:start + EVENT_BATCH_SIZE])
+
+        if mark is None:
+            db.add(models.RollupWatermark(name=WATERMARK, processed_until=started_at))
+        else:
+            mark.processed_until = started_at
+        db.commit()
+    finally:
+        db.close()
+
+def _period_start(day: datetime.date, granularity: str) -> datetime.date:
+    if granularity == "week":
+        return day - datetime.timedelta(days=day.weekday()) # Monday
+    if granularity == "month":
+        return day.replace(day=1)
+    return day
+
+def _next_period(day: datetime.date, granularity: str) -> datetime.date:
+    if granularity == "week":
+        return day + datetime.timedelta(days=7)
+    if granularity == "month":
+        return (day.replace(day=28) + datetime.timedelta(days=4)).replace(day=1)
+    return day + datetime.timedelta(days=1)
+
+def timeseries(db: Session, start: datetime.date, end: datetime.date, granularity: str = "day",
+               event_id: int = None, category: str = None) -> list:
+    """
+    One point per period from `start` to `end` (inclusive, zero-filled).
+    Reads only daily_rollups: one row per day after aggregation in SQL.
+    """
+    Rollup = models.DailyRollup
+    query = db.query(Rollup.day, *(func.sum(getattr(Rollup, counter)) for counter in COUNTERS)).filter(
+        Rollup.day >= start, Rollup.day <= end
+    )
+    if event_id is not None:
+        query = query.filter(Rollup.event_id == event_id)
+    if category:
+        query = query.filter(Rollup.category == category)
+
+    periods = {}
+    day = _period_start(start, granularity)
+    while day <= end:
+        periods[day] = dict.fromkeys(COUNTERS, 0)
+        day = _next_period(day, granularity)
+
+    for day, *values in query.group_by(Rollup.day):
+        totals = periods[_period_start(_as_date(day), granularity)]
+        for counter, value in zip(COUNTERS, values):
+            totals[counter] += value or 0
+
+    series = []
+    for period, totals in periods.items():
+        rating_sum = totals.pop("rating_sum")
+        totals["average_rating"] = round(rating_sum / totals["feedback_count"], 2) if totals["feedback_count"] else None
+        series.append({"period": period, **totals})
+    return series
+
+if __name__ == "__main__":
+    run = refresh(rebuild="--rebuild" in sys.argv)
+    print(f"Rollup {run.status}: {run.rows_scanned} rows written")
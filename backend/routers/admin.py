@@ -1,68 +1,128 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
 from sqlalchemy.orm import Session
 from sqlalchemy import func
-from typing import List
+from typing import List, Optional
 import datetime
-import crud, schemas, database, auth, models
+import crud, schemas, database, auth, models, pagination, search_index, gemini_keys, notifications, jobs, passwords, rate_limit, analytics, rollups, audit
+from jinja2 import TemplateError, TemplateSyntaxError
+from jinja2.exceptions import SecurityError
 
 router = APIRouter(prefix="/admin", tags=["admin"])
 
 @router.get("/analytics")
 def get_analytics(
     db: Session = Depends(database.get_db), 
-    current_user: models.User = Depends(auth.get_current_active_admin)
+    current_user: auth.Principal = Depends(auth.get_current_active_admin)
 ):
-    total_users = db.query(models.User).count()
-    total_events = db.query(models.Event).count()
-    total_registrations = db.query(models.Registration).count()
-    
-    # Breakdown by role
-    students = db.query(models.User).filter(models.User.role == "student").count()
-    faculty = db.query(models.User).filter(models.User.role == "faculty").count()
-    recruiters = db.query(models.User).filter(models.User.role == "recruiter").count()
-
+    counts = analytics.snapshot(db)
     return {
         "users": {
-            "total": total_users,
-            "students": students,
-            "faculty": faculty,
-            "recruiters": recruiters
+            "total": counts["users_total"],
+            "students": counts["students"],
+            "faculty": counts["faculty"],
+            "recruiters": counts["recruiters"]
         },
         "events": {
-            "total": total_events
+            "total": counts["events_total"]
         },
         "registrations": {
-            "total": total_registrations
+            "total": counts["registrations_total"]
         }
     }
 
+MAX_TIMESERIES_DAYS = 731
+
+@router.get("/analytics/timeseries")
+def get_analytics_timeseries(
+    start: Optional[datetime.date] = Query(None, alias="from"),
+    end: Optional[datetime.date] = Query(None, alias="to"),
+    granularity: str = "day",
+    event_id: Optional[int] = None,
+    category: Optional[str] = None,
+    db: Session = Depends(database.get_db),
+    current_user: auth.Principal = Depends(auth.get_current_active_admin)
+):
+    """Registrations, attendance and feedback per period, read from the daily rollups"""
+    if granularity not in rollups.GRANULARITIES:
+        raise HTTPException(status_code=400, detail=f"granularity must be one of {', '.join(rollups.GRANULARITIES)}")
+    end = end or datetime.datetime.utcnow().date()
+    start = start or end - datetime.timedelta(days=29)
+    if start > end:
+        raise HTTPException(status_code=400, detail="'from' must not be after 'to'")
+    if (end - start).days >= MAX_TIMESERIES_DAYS:
+        raise HTTPException(status_code=400, detail=f"Range is limited to {MAX_TIMESERIES_DAYS} days")
+    return {
+        "from": start, "to": end, "granularity": granularity,
+        "series": rollups.timeseries(db, start, end, granularity, event_id, category),
+    }
+
+@router.get("/ai/keys")
+def get_ai_key_metrics(current_user: auth.Principal = Depends(auth.get_current_active_admin)):
+    """Per-key usage, latency and circuit-breaker state for the Gemini key pool"""
+    return gemini_keys.pool.metrics()
+
+@router.get("/password-hashing")
+def get_password_hashing_metrics(current_user: auth.Principal = Depends(auth.get_current_active_admin)):
+    """bcrypt pool queue depth, latency and rejections"""
+    return passwords.metrics()
+
+@router.get("/rate-limits")
+def get_rate_limit_metrics(current_user: auth.Principal = Depends(auth.get_current_active_admin)):
+    """Allowed/rejected counts per rate-limit rule in this worker"""
+    return rate_limit.metrics()
+
+@router.get("/audit-writer")
+def get_audit_writer_metrics(current_user: auth.Principal = Depends(auth.get_current_active_admin)):
+    """Audit log queue depth, batches written and synchronous fallbacks in this worker"""
+    return audit.metrics()
+
+@router.get("/jobs")
+def get_job_metrics(
+    hours: int = Query(24, ge=1, le=24 * 30),
+    db: Session = Depends(database.get_db),
+    current_user: auth.Principal = Depends(auth.get_current_active_admin)
+):
+    """Background job runs per job and status over the last `hours`"""
+    since = datetime.datetime.utcnow() - datetime.timedelta(hours=hours)
+    return {"since": since, "jobs": jobs.summary(db, since)}
+
+@router.get("/jobs/runs", response_model=List[schemas.JobRun])
+def get_job_runs(
+    job_name: Optional[str] = None,
+    limit: int = Query(50, ge=1, le=500),
+    db: Session = Depends(database.get_db),
+    current_user: auth.Principal = Depends(auth.get_current_active_admin)
+):
+    return jobs.recent_runs(db, job_name, limit)
+
 @router.post("/registrations/bulk-approve")
 def bulk_approve_registrations(
     registration_ids: List[int],
     db: Session = Depends(database.get_db),
-    current_user: models.User = Depends(auth.get_current_active_admin)
+    current_user: auth.Principal = Depends(auth.get_current_active_admin)
 ):
-    # Update all to confirmed
-    db.query(models.Registration).filter(
-        models.Registration.id.in_(registration_ids)
-    ).update({"status": "confirmed"}, synchronize_session=False)
-    db.commit()
+    crud.approve_registrations(db, registration_ids)
     return {"message": f"Approved {len(registration_ids)} registrations"}
 
 @router.get("/users/pending")
 def get_pending_users(
     db: Session = Depends(database.get_db),
-    current_user: models.User = Depends(auth.get_current_active_admin)
+    current_user: auth.Principal = Depends(auth.get_current_active_admin)
 ):
     return db.query(models.User).filter(models.User.is_active == False, models.User.verification_token == None).all()
 
 @router.get("/users")
 def get_all_users(
+    response: Response,
+    cursor: Optional[str] = None,
+    limit: int = Query(pagination.DEFAULT_PAGE_SIZE, ge=1, le=pagination.MAX_PAGE_SIZE),
     db: Session = Depends(database.get_db),
-    current_user: models.User = Depends(auth.get_current_active_admin)
+    current_user: auth.Principal = Depends(auth.get_current_active_admin)
 ):
-    """List all users for Admin management"""
-    return db.query(models.User).order_by(models.User.id.desc()).all()
+    """List all users for Admin management (newest first, cursor paginated)"""
+    users = pagination.paginate(db.query(models.User), [(models.User.id, True)], cursor, limit)
+    pagination.set_next_cursor(response, users)
+    return users
 
 
 @router.post("/users/{user_id}/authorize")
@@ -71,16 +131,20 @@ def authorize_user(
     is_active: bool = True,
     role: str = None,
     db: Session = Depends(database.get_db),
-    current_user: models.User = Depends(auth.get_current_active_admin)
+    current_user: auth.Principal = Depends(auth.get_current_active_admin)
 ):
     user = db.query(models.User).filter(models.User.id == user_id).first()
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     
     print(f"[DEBUG] Authorizing User {user_id}. New Active Status: {is_active}")
+    previous = (user.is_active, user.role)
     user.is_active = is_active
     if role and role in ["student", "faculty", "recruiter", "admin", "judge"]:
         user.role = role
+    if (user.is_active, user.role) != previous:
+        # Sessions must log in again to pick up the new role/status
+        crud.revoke_user_refresh_tokens(db, user.id)
         
     db.commit()
     db.refresh(user)
@@ -90,32 +154,25 @@ def authorize_user(
 @router.get("/stats")
 def get_stats(
     db: Session = Depends(database.get_db), 
-    current_user: models.User = Depends(auth.get_current_active_admin)
+    current_user: auth.Principal = Depends(auth.get_current_active_admin)
 ):
     """
     Returns high-level stats for the Admin Dashboard task bar
     """
-    # Dynamic Stats
-    now = datetime.datetime.utcnow()
-    today_start = datetime.datetime(now.year, now.month, now.day)
-    
-    pending_approvals = db.query(models.User).filter(models.User.is_active == False, models.User.verification_token == None).count()
-    new_users_today = db.query(models.User).filter(models.User.created_at >= today_start).count()
-    # User expects total active events regardless of date (matching the dashboard list)
-    active_events = db.query(models.Event).filter(models.Event.is_active == True).count()
-    new_judges = db.query(models.User).filter(models.User.role == "judge").count()
-    
+    # Same cached single-statement snapshot as /analytics.
+    # active_events: total active events regardless of date (matching the dashboard list)
+    counts = analytics.snapshot(db)
     return {
-        "pending_requests": pending_approvals,
-        "new_users_today": new_users_today,
-        "active_events": active_events,
-        "new_judges": new_judges
+        "pending_requests": counts["pending_approvals"],
+        "new_users_today": counts["new_users_today"],
+        "active_events": counts["active_events"],
+        "new_judges": counts["judges"]
     }
 
 @router.get("/notifications")
 def get_notifications(
     db: Session = Depends(database.get_db),
-    current_user: models.User = Depends(auth.get_current_active_admin)
+    current_user: auth.Principal = Depends(auth.get_current_active_admin)
 ):
     """
     Returns list of recent system notifications
@@ -153,28 +210,93 @@ def get_notifications(
         
     return result
 
+@router.get("/notification-templates", response_model=List[schemas.NotificationTemplate])
+def get_notification_templates(
+    db: Session = Depends(database.get_db),
+    current_user: auth.Principal = Depends(auth.get_current_active_admin)
+):
+    """Effective email templates: stored overrides, else the built-in defaults"""
+    stored = {t.kind: t for t in db.query(models.NotificationTemplate).all()}
+    result = []
+    for kind, (subject, body) in notifications.DEFAULT_TEMPLATES.items():
+        override = stored.get(kind)
+        result.append({
+            "kind": kind,
+            "subject_template": override.subject_template if override else subject,
+            "body_template": override.body_template if override else body,
+            "customized": override is not None,
+        })
+    return result
+
+@router.put("/notification-templates/{kind}", response_model=schemas.NotificationTemplate)
+def update_notification_template(
+    kind: str,
+    template: schemas.NotificationTemplateUpdate,
+    db: Session = Depends(database.get_db),
+    current_user: auth.Principal = Depends(auth.get_current_active_admin)
+):
+    if kind not in notifications.DEFAULT_TEMPLATES:
+        raise HTTPException(status_code=404, detail="Unknown template kind")
+    try:
+        notifications.compile_template(template.subject_template, template.body_template)
+    except TemplateSyntaxError as e:
+        raise HTTPException(status_code=400, detail=f"Template error (line {e.lineno}): {e.message}")
+    except SecurityError as e:
+        raise HTTPException(status_code=400, detail=f"Template not allowed: {e}")
+    except TemplateError as e:
+        raise HTTPException(status_code=400, detail=f"Template error: {e}")
+
+    row = db.query(models.NotificationTemplate).filter(models.NotificationTemplate.kind == kind).first()
+    if not row:
+        row = models.NotificationTemplate(kind=kind)
+        db.add(row)
+    row.subject_template = template.subject_template
+    row.body_template = template.body_template
+    db.commit() # Compiled template cache is invalidated on commit
+    return {"kind": kind, "subject_template": row.subject_template, "body_template": row.body_template, "customized": True}
+
+@router.delete("/notification-templates/{kind}")
+def reset_notification_template(
+    kind: str,
+    db: Session = Depends(database.get_db),
+    current_user: auth.Principal = Depends(auth.get_current_active_admin)
+):
+    """Drops the stored override so the built-in default is used again"""
+    row = db.query(models.NotificationTemplate).filter(models.NotificationTemplate.kind == kind).first()
+    if row:
+        db.delete(row)
+        db.commit()
+    return {"message": f"Template '{kind}' reset to default"}
+
 @router.get("/resumes", response_model=List[schemas.ResumeDetail])
 def get_all_resumes(
+    response: Response,
+    cursor: Optional[str] = None,
+    limit: int = Query(pagination.DEFAULT_PAGE_SIZE, ge=1, le=pagination.MAX_PAGE_SIZE),
     db: Session = Depends(database.get_db),
-    current_user: models.User = Depends(auth.get_current_active_admin)
+    current_user: auth.Principal = Depends(auth.get_current_active_admin)
 ):
     """
-    Returns all active resumes with student details
+    Returns active resumes with student details (cursor paginated)
     """
-    return db.query(models.Resume).join(models.User).filter(models.Resume.is_active == True).all()
+    query = db.query(models.Resume).join(models.User).options(*crud.RESUME_DETAIL_LOAD).filter(models.Resume.is_active == True)
+    resumes = pagination.paginate(query, [(models.Resume.id, False)], cursor, limit)
+    pagination.set_next_cursor(response, resumes)
+    return resumes
 
 @router.delete("/resumes/{resume_id}")
 def delete_resume(
     resume_id: int,
     db: Session = Depends(database.get_db),
-    current_user: models.User = Depends(auth.get_current_active_admin)
+    current_user: auth.Principal = Depends(auth.get_current_active_admin)
 ):
     resume = db.query(models.Resume).filter(models.Resume.id == resume_id).first()
     if not resume:
         raise HTTPException(status_code=404, detail="Resume not found")
     
-    # Ideally delete file from disk too, but for now logic is just DB cleanup
-    # os.remove(resume.file_path) if os.path.exists
+    # The blob may be shared with other resumes; gc_resume_blobs.py removes it once unreferenced
+    crud.release_resume_blob(db, resume.sha256)
     db.delete(resume)
+    search_index.refresh_student(db, resume.user_id)
     db.commit()
     return {"message": "Resume deleted"}
@@ -2,19 +2,29 @@ from datetime import timedelta
 from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordRequestForm
 from sqlalchemy.orm import Session
-import auth, crud, schemas, database
+import auth, crud, schemas, database, passwords, rate_limit
 
 router = APIRouter(prefix="/auth", tags=["auth"])
 
 @router.post("/login", response_model=schemas.Token)
-async def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(database.get_db)):
+async def login_for_access_token(
+    form_data: OAuth2PasswordRequestForm = Depends(),
+    attempt: rate_limit.LoginAttempt = Depends(rate_limit.limit_login),
+    db: Session = Depends(database.get_db)
+):
     user = crud.get_user_by_email(db, email=form_data.username)
-    if not user or not crud.verify_password(form_data.password, user.hashed_password):
+    if user:
+        db.expunge(user) # Keeps its loaded columns across the rollback
+    db.rollback() # Return the pooled connection while bcrypt runs
+    valid, new_hash = await passwords.verify_password(form_data.password, user.hashed_password) if user else (False, None)
+    if not valid:
+        # The hit reserved by limit_login stays counted as a failure
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect username or password",
             headers={"WWW-Authenticate": "Bearer"},
         )
+    attempt.succeeded()
     
     if not user.is_active:
         if user.verification_token:
@@ -27,11 +37,26 @@ async def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends(
                 status_code=status.HTTP_403_FORBIDDEN, # Forbidden, not just bad request
                 detail="Account verified but pending Admin approval.",
             )
-    access_token_expires = timedelta(minutes=auth.ACCESS_TOKEN_EXPIRE_MINUTES)
-    access_token = auth.create_access_token(
-        data={"sub": user.email, "role": user.role}, expires_delta=access_token_expires
-    )
-    return {"access_token": access_token, "token_type": "bearer", "role": user.role, "name": user.name}
+    if new_hash:
+        # Stored hash uses an outdated work factor
+        crud.update_password_hash(db, user.id, new_hash)
+    tokens = auth.issue_tokens(db, user)
+    db.commit()
+    return tokens
+
+@router.post("/refresh", response_model=schemas.Token)
+def refresh_access_token(data: schemas.RefreshRequest, db: Session = Depends(database.get_db)):
+    """New access and refresh tokens for a valid refresh token; no password (or bcrypt) involved"""
+    return auth.rotate_refresh_token(db, data.refresh_token)
+
+@router.post("/logout")
+def logout(data: schemas.RefreshRequest, db: Session = Depends(database.get_db)):
+    """Revokes the refresh token's family (this login session) so it can't be renewed"""
+    stored = crud.get_refresh_token(db, auth.hash_refresh_token(data.refresh_token))
+    if stored:
+        crud.revoke_refresh_family(db, stored.family_id)
+        db.commit()
+    return {"message": "Logged out"}
 
 @router.post("/forgot-password")
 async def forgot_password(email: str, db: Session = Depends(database.get_db)):
@@ -56,7 +81,7 @@ async def forgot_password(email: str, db: Session = Depends(database.get_db)):
 import uuid
 import email_utils
 
-@router.post("/register")
+@router.post("/register", dependencies=[Depends(rate_limit.limit_register)])
 async def register(user: schemas.UserCreate, db: Session = Depends(database.get_db)):
     db_user = crud.get_user_by_email(db, email=user.email)
     if db_user:
@@ -65,6 +90,9 @@ async def register(user: schemas.UserCreate, db: Session = Depends(database.get_
     if not user.role:
         user.role = "student"
     
+    db.rollback() # Return the pooled connection while bcrypt runs
+    hashed_password = await passwords.hash_password(user.password)
+
     # Generate Verification Token
     token = str(uuid.uuid4())
     
@@ -75,7 +103,7 @@ async def register(user: schemas.UserCreate, db: Session = Depends(database.get_
         print(f"[DEBUG] WARNING: Password exceeds 72 bytes! Value (truncated): {user.password[:20]}...")
     
     # Create Inactive User
-    new_user = crud.create_user(db=db, user=user, verification_token=token)
+    new_user = crud.create_user(db=db, user=user, verification_token=token, hashed_password=hashed_password)
     
     # Send Verification Email (Real)
     email_sent = await email_utils.send_verification_email(user.email, token)
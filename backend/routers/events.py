@@ -1,7 +1,7 @@
-from fastapi import APIRouter, Depends, HTTPException, Query, BackgroundTasks
+from fastapi import APIRouter, Depends, HTTPException, Query, BackgroundTasks, Response
 from sqlalchemy.orm import Session
 from typing import List, Optional
-import crud, schemas, database, auth, email_utils
+import crud, schemas, database, auth, models, email_utils, email_outbox, llm_content, pagination, scheduler, audit
 
 router = APIRouter(prefix="/events", tags=["events"])
 
@@ -9,12 +9,15 @@ router = APIRouter(prefix="/events", tags=["events"])
 
 @router.get("/", response_model=List[schemas.Event])
 def read_events(
-    skip: int = 0, 
-    limit: int = 100, 
+    response: Response,
+    cursor: Optional[str] = None,
+    limit: int = Query(pagination.DEFAULT_PAGE_SIZE, ge=1, le=pagination.MAX_PAGE_SIZE),
     visibility: Optional[str] = None,
     db: Session = Depends(database.get_db)
 ):
-    return crud.get_events(db, skip=skip, limit=limit, visibility=visibility)
+    events = crud.get_events(db, cursor=cursor, limit=limit, visibility=visibility)
+    pagination.set_next_cursor(response, events)
+    return events
 
 @router.get("/{event_id}", response_model=schemas.Event)
 def read_event(event_id: int, db: Session = Depends(database.get_db)):
@@ -30,12 +33,21 @@ def update_event(
     db: Session = Depends(database.get_db),
     current_user = Depends(auth.get_current_faculty) # Admins/Faculty can edit
 ):
+    old_title = db.query(models.Event.title).filter(models.Event.id == event_id).scalar()
     db_event = crud.update_event(db, event_id=event_id, event_update=event_update)
     if not db_event:
         raise HTTPException(status_code=404, detail="Event not found")
+
+    # End time may have changed: move the feedback job
+    scheduler.schedule_event(db_event)
+
+    # The AI registration email body only depends on the title
+    if db_event.title != old_title:
+        llm_content.invalidate(db_event.id)
+        llm_content.prefetch(db_event.id, db_event.title)
     
     # Audit Log
-    crud.create_audit_log(db, current_user.id, "EVENT_UPDATED", {"event_id": db_event.id, "title": db_event.title})
+    audit.enqueue(current_user.id, "EVENT_UPDATED", {"event_id": db_event.id, "title": db_event.title})
     
     return db_event
 
@@ -57,7 +69,10 @@ def create_event(
     current_user = Depends(auth.get_current_faculty) # Admin is also Faculty
 ):
     db_event = crud.create_event(db=db, event=event, user_id=current_user.id)
-    crud.create_audit_log(db, current_user.id, "EVENT_CREATED", {"event_id": db_event.id, "title": db_event.title})
+    audit.enqueue(current_user.id, "EVENT_CREATED", {"event_id": db_event.id, "title": db_event.title})
+    scheduler.schedule_event(db_event)
+    # Pre-generate the AI registration email body so registrations only template it
+    llm_content.prefetch(db_event.id, db_event.title)
     return db_event
 
 @router.post("/{event_id}/sessions", response_model=schemas.EventSession)
@@ -85,8 +100,11 @@ def delete_event(
     if not event:
         raise HTTPException(status_code=404, detail="Event not found")
         
+    # Critical: the audit entry commits with the deletion
+    audit.add(db, current_user.id, "EVENT_DELETED", {"event_id": event_id, "title": event.title})
     crud.delete_event(db, event_id)
-    crud.create_audit_log(db, current_user.id, "EVENT_DELETED", {"event_id": event_id, "title": event.title})
+    llm_content.invalidate(event_id)
+    scheduler.cancel_feedback(event_id)
     return {"status": "success"}
 
 # --- Registration ---
@@ -115,7 +133,8 @@ def register_for_event(
             email_utils.send_event_registration_email, 
             email=current_user.email, 
             event_title=event.title, 
-            student_name=current_user.name
+            student_name=current_user.name,
+            event_id=event.id
         )
 
     return reg
@@ -134,13 +153,18 @@ def unregister_from_event(
 @router.get("/{event_id}/registrations", response_model=List[schemas.RegistrationDetail])
 def get_registrations(
     event_id: int, 
+    response: Response,
+    cursor: Optional[str] = None,
+    limit: int = Query(pagination.DEFAULT_PAGE_SIZE, ge=1, le=pagination.MAX_PAGE_SIZE),
     db: Session = Depends(database.get_db), 
     current_user = Depends(auth.get_current_faculty)
 ):
-    return crud.get_event_registrations(db, event_id)
+    registrations = crud.get_event_registrations(db, event_id, cursor=cursor, limit=limit)
+    pagination.set_next_cursor(response, registrations)
+    return registrations
 
 @router.post("/{event_id}/feedback-request", status_code=200)
-async def send_feedback_request(
+def send_feedback_request(
     event_id: int,
     db: Session = Depends(database.get_db),
     current_user = Depends(auth.get_current_faculty)
@@ -148,40 +172,41 @@ async def send_feedback_request(
     event = crud.get_event(db, event_id=event_id)
     if not event:
         raise HTTPException(status_code=404, detail="Event not found")
-        
-    registrations = crud.get_event_registrations(db, event_id)
-    count = 0
-    for reg in registrations:
-        if reg.status == "confirmed" and reg.student and reg.student.email:
-            await email_utils.send_feedback_request_email(
-                email=reg.student.email, 
-                event_title=event.title, 
-                registration_id=reg.id
-            )
-            count += 1
-            
-    event.feedback_email_sent = True
+
+    # Queued in the outbox with the flag update; poll the job for progress
+    job = email_outbox.queue_feedback_requests(db, event, created_by=current_user.id)
     db.commit()
     
-    return {"message": f"Feedback request sent to {count} attendees"}
+    return {"message": f"Feedback request queued for {job.total} attendees", "job_id": job.id, "total": job.total}
+
+@router.get("/{event_id}/feedback-request/{job_id}", response_model=schemas.EmailJobProgress)
+def get_feedback_request_progress(
+    event_id: int,
+    job_id: str,
+    db: Session = Depends(database.get_db),
+    current_user = Depends(auth.get_current_faculty)
+):
+    job = db.query(models.EmailJob).filter(models.EmailJob.id == job_id, models.EmailJob.event_id == event_id).first()
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return email_outbox.job_progress(db, job)
 
 @router.post("/{event_id}/invite", status_code=200)
-async def invite_guests(
+def invite_guests(
     event_id: int,
     invite_request: schemas.GuestInviteRequest,
-    background_tasks: BackgroundTasks,
     db: Session = Depends(database.get_db),
     current_user = Depends(auth.get_current_faculty)
 ):
     event = crud.get_event(db, event_id=event_id)
     if not event:
         raise HTTPException(status_code=404, detail="Event not found")
+
+    subject, html = email_utils.render_guest_invitation(event.title)
+    job = email_outbox.send_bulk(db, "guest_invite", [
+        {"recipient": email, "subject": subject, "body_html": html}
+        for email in invite_request.emails
+    ], event_id=event.id, created_by=current_user.id)
+    db.commit()
         
-    for email in invite_request.emails:
-        background_tasks.add_task(
-            email_utils.send_guest_invitation_email,
-            email=email,
-            event_title=event.title
-        )
-        
-    return {"message": f"Invitations sent to {len(invite_request.emails)} guests"}
+    return {"message": f"Invitations sent to {len(invite_request.emails)} guests", "job_id": job.id}
@@ -1,20 +1,39 @@
-from fastapi import APIRouter, Depends, HTTPException
-from fastapi.responses import FileResponse
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
 from sqlalchemy.orm import Session
 from typing import List, Optional
-import crud, schemas, database, auth
+import crud, schemas, database, auth, pagination, resume_storage
 
 router = APIRouter(prefix="/judge", tags=["judge"])
 
 @router.get("/events", response_model=List[schemas.Event])
-def read_events(db: Session = Depends(database.get_db), current_user = Depends(auth.get_current_judge)):
-    return crud.get_events(db)
+def read_events(
+    response: Response,
+    cursor: Optional[str] = None,
+    limit: int = Query(pagination.DEFAULT_PAGE_SIZE, ge=1, le=pagination.MAX_PAGE_SIZE),
+    db: Session = Depends(database.get_db),
+    current_user = Depends(auth.get_current_judge)
+):
+    events = crud.get_events(db, cursor=cursor, limit=limit)
+    pagination.set_next_cursor(response, events)
+    return events
 
 @router.get("/events/{event_id}/roster", response_model=List[schemas.Registration])
-def read_roster(event_id: int, skill: Optional[str] = None, db: Session = Depends(database.get_db), current_user = Depends(auth.get_current_judge)):
+def read_roster(
+    event_id: int,
+    response: Response,
+    skill: Optional[str] = None,
+    cursor: Optional[str] = None,
+    limit: int = Query(pagination.DEFAULT_PAGE_SIZE, ge=1, le=pagination.MAX_PAGE_SIZE),
+    db: Session = Depends(database.get_db),
+    current_user = Depends(auth.get_current_judge)
+):
+    # schemas.Registration carries no student details, so skip loading them
     if skill:
-        return crud.get_event_registrations_filtered(db, event_id, skill)
-    return crud.get_event_registrations(db, event_id)
+        roster = crud.get_event_registrations_filtered(db, event_id, skill, cursor=cursor, limit=limit, load=crud.REGISTRATION_LOAD)
+    else:
+        roster = crud.get_event_registrations(db, event_id, cursor=cursor, limit=limit, load=crud.REGISTRATION_LOAD)
+    pagination.set_next_cursor(response, roster)
+    return roster
 
 @router.post("/events/rate", response_model=schemas.JudgeRating)
 def rate_student(rating: schemas.JudgeRatingCreate, db: Session = Depends(database.get_db), current_user = Depends(auth.get_current_judge)):
@@ -28,9 +47,9 @@ def get_student_profile(student_id: int, db: Session = Depends(database.get_db),
     return user
 
 @router.get("/students/{student_id}/resume")
-def download_student_resume(student_id: int, db: Session = Depends(database.get_db), current_user = Depends(auth.get_current_judge)):
+def download_student_resume(student_id: int, request: Request, db: Session = Depends(database.get_db), current_user = Depends(auth.get_current_judge)):
     resume = crud.get_active_resume(db, student_id)
     if not resume:
         raise HTTPException(status_code=404, detail="No active resume found")
     
-    return FileResponse(resume.file_path, media_type="application/pdf", filename=resume.file_name_original)
+    return resume_storage.resume_download(request, resume, current_user.role)
@@ -1,20 +1,15 @@
-from fastapi import APIRouter, Depends, HTTPException, UploadFile, File
-from fastapi.responses import FileResponse
+import asyncio
+from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Request
 from sqlalchemy.orm import Session
 from typing import List
-import crud, schemas, database, auth
-import shutil
-import os
-import datetime
+import crud, schemas, database, auth, resume_worker, resume_storage
 
 router = APIRouter(prefix="/student/profile", tags=["profile"])
 
-RESUME_DIR = "data/resumes"
-os.makedirs(RESUME_DIR, exist_ok=True)
-
 @router.get("/", response_model=schemas.User)
 def get_profile(current_user = Depends(auth.get_current_user), db: Session = Depends(database.get_db)):
-    return current_user
+    # The principal only carries identity and role; the profile needs the full user
+    return crud.get_user(db, current_user.id)
 
 @router.put("/", response_model=schemas.User)
 def update_profile(profile: schemas.UserProfileUpdate, current_user = Depends(auth.get_current_user), db: Session = Depends(database.get_db)):
@@ -29,26 +24,34 @@ def delete_skill(skill_id: int, current_user = Depends(auth.get_current_user), d
     crud.remove_student_skill(db, user_id=current_user.id, skill_id=skill_id)
     return {"message": "Skill removed"}
 
+def _record_upload(db: Session, user_id: int, stored: resume_storage.StoredFile, file_name: str):
+    resume = crud.create_resume_record(
+        db, user_id=user_id, file_path=stored.path, file_name_original=file_name,
+        sha256=stored.sha256, size_bytes=stored.size_bytes, blob_reserved=True
+    )
+    # Text extraction runs in the background process pool; the upload returns immediately
+    resume_worker.enqueue(resume.id)
+    db.refresh(resume)
+    return resume
+
 @router.post("/resume", response_model=schemas.Resume)
 async def upload_resume(file: UploadFile = File(...), current_user = Depends(auth.get_current_user), db: Session = Depends(database.get_db)):
     if file.content_type != "application/pdf":
         raise HTTPException(status_code=400, detail="Only PDF files are allowed")
-    
-    # 5MB check handling would ideally happen by reading chunks, but for simplicity relying on nginx/server limits or checking size after seek
-    # Here we just proceed to save
-    
-    timestamp = datetime.datetime.now().strftime("%Y%m%d%H%M%S")
-    filename = f"user_{current_user.id}_{timestamp}.pdf"
-    file_path = os.path.join(RESUME_DIR, filename)
-    
+
+    # Size cap, PDF magic check and hashing all happen while streaming to disk;
+    # identical content is stored once in the blob store
     try:
-        with open(file_path, "wb") as buffer:
-            shutil.copyfileobj(file.file, buffer)
-    except Exception as e:
+        stored = await resume_storage.save_upload(
+            file, reserve=lambda sha256, path, size: crud.reserve_resume_blob(db, sha256, path, size)
+        )
+    except HTTPException:
+        raise
+    except OSError as e:
         raise HTTPException(status_code=500, detail=f"Could not save file: {str(e)}")
-        
-    resume = crud.create_resume_record(db, user_id=current_user.id, file_path=file_path, file_name_original=file.filename)
-    return resume
+
+    # Blocking DB work (the blob reservation above included) runs off the event loop
+    return await asyncio.to_thread(_record_upload, db, current_user.id, stored, file.filename)
 
 @router.get("/resume")
 def get_resume_metadata(current_user = Depends(auth.get_current_user), db: Session = Depends(database.get_db)):
@@ -58,9 +61,10 @@ def get_resume_metadata(current_user = Depends(auth.get_current_user), db: Sessi
     return resume
 
 @router.get("/resume/download")
-def download_resume(current_user = Depends(auth.get_current_user), db: Session = Depends(database.get_db)):
+def download_resume(request: Request, current_user = Depends(auth.get_current_user), db: Session = Depends(database.get_db)):
     resume = crud.get_active_resume(db, current_user.id)
     if not resume:
         raise HTTPException(status_code=404, detail="No active resume found")
     
-    return FileResponse(resume.file_path, media_type="application/pdf", filename=resume.file_name_original)
+    # Own resume, whatever the role: always revalidate
+    return resume_storage.resume_download(request, resume)
@@ -1,14 +1,15 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
-from typing import List
-import crud, schemas, database, auth, models
+from typing import List, Optional
+import crud, schemas, database, auth, models, pagination, resume_storage, resume_book
 
 router = APIRouter(prefix="/recruiter", tags=["recruiter"])
 
 @router.get("/events", response_model=List[schemas.Event])
 def read_sponsored_events(
     db: Session = Depends(database.get_db), 
-    current_user: models.User = Depends(auth.get_current_recruiter)
+    current_user: auth.Principal = Depends(auth.get_current_recruiter)
 ):
     # Filter events where sponsor_company matches recruiter's company (how do we know recruiter's company? 
     # For MVP, let's assume recruiter email domain or a hardcoded mapping, OR just show all for now if no company field on User)
@@ -18,32 +19,57 @@ def read_sponsored_events(
     # Implementation Plan says: "View events sponsored by their company".
     # I'll implement a simple filter: if event.sponsor_company is not None.
     
-    events = db.query(models.Event).filter(models.Event.sponsor_company != None).all()
+    events = db.query(models.Event).options(*crud.EVENT_LOAD).filter(models.Event.sponsor_company != None).all()
     # In a real app, we'd filter by current_user.company
     return events
 
 @router.get("/events/{event_id}/students", response_model=List[schemas.RegistrationDetail])
 def get_event_students(
     event_id: int, 
+    response: Response,
     skill: str = None,
     q: str = None,
+    cursor: Optional[str] = None,
+    limit: int = Query(pagination.DEFAULT_PAGE_SIZE, ge=1, le=pagination.MAX_PAGE_SIZE),
     db: Session = Depends(database.get_db), 
-    current_user: models.User = Depends(auth.get_current_recruiter)
+    current_user: auth.Principal = Depends(auth.get_current_recruiter)
 ):
     # Verify access to this event? (Skipping for MVP)
-    regs = crud.get_event_registrations_filtered(db, event_id, skill_query=skill, resume_query=q)
+    regs = crud.get_event_registrations_filtered(db, event_id, skill_query=skill, resume_query=q, cursor=cursor, limit=limit)
+    pagination.set_next_cursor(response, regs)
     return regs
 
-from fastapi.responses import FileResponse
+@router.get("/events/{event_id}/resume-book")
+def download_resume_book(
+    event_id: int,
+    skill: str = None,
+    q: str = None,
+    db: Session = Depends(database.get_db),
+    current_user: auth.Principal = Depends(auth.get_current_recruiter)
+):
+    """
+    Streams a ZIP of the active resumes for the (optionally filtered) roster
+    plus manifest.csv. Same filters as /events/{event_id}/students.
+    """
+    if not crud.get_event(db, event_id):
+        raise HTTPException(status_code=404, detail="Event not found")
+
+    return StreamingResponse(
+        resume_book.iter_resume_book(event_id, skill=skill, q=q),
+        media_type="application/zip",
+        headers={"Content-Disposition": f'attachment; filename="event_{event_id}_resume_book.zip"'}
+    )
+
 @router.get("/students/{student_id}/resume")
 def download_student_resume(
     student_id: int, 
+    request: Request,
     db: Session = Depends(database.get_db), 
-    current_user: models.User = Depends(auth.get_current_recruiter)
+    current_user: auth.Principal = Depends(auth.get_current_recruiter)
 ):
     resume = crud.get_active_resume(db, student_id)
     if not resume:
         raise HTTPException(status_code=404, detail="No active resume found")
     
-    return FileResponse(resume.file_path, media_type="application/pdf", filename=resume.file_name_original)
+    return resume_storage.resume_download(request, resume, current_user.role)
 
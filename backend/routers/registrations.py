@@ -7,7 +7,7 @@ router = APIRouter(prefix="/registrations", tags=["registrations"])
 
 @router.get("/me", response_model=List[schemas.Registration])
 def read_my_registrations(db: Session = Depends(database.get_db), current_user = Depends(auth.get_current_user)):
-    return db.query(models.Registration).filter(models.Registration.user_id == current_user.id).all()
+    return crud.get_user_registrations(db, current_user.id)
 
 @router.post("/{registration_id}/feedback")
 def submit_feedback(registration_id: int, feedback: schemas.FeedbackCreate, db: Session = Depends(database.get_db)):
@@ -17,6 +17,10 @@ def submit_feedback(registration_id: int, feedback: schemas.FeedbackCreate, db:
     
     # Check if already submitted
     if reg.feedback_rating is not None:
-         raise HTTPException(status_code=400, detail="Feedback already submitted")
+         raise HTTPException(status_code=409, detail="Feedback already submitted")
 
-    return crud.create_feedback(db, feedback, registration_id)
+    result = crud.create_feedback(db, feedback, registration_id)
+    if result is None:
+        # Another submission for this registration committed first
+        raise HTTPException(status_code=409, detail="Feedback already submitted")
+    return result
@@ -1,59 +1,191 @@
+"""
+Feedback email scheduling.
+
+Each event with an end time gets its own one-shot APScheduler job
+(feedback-<event_id>) at end_date_time; creating, editing or deleting an
+event reschedules or cancels it. At startup, and hourly as a safety net for
+events changed outside the API (sqladmin, scripts), the unsent events are
+read with an indexed column query and their jobs (re)registered.
+
+With several app workers, each runs this module but only the holder of the
+"feedback-scheduler" lease (see leases.py) runs the sweep. Per-event jobs may
+exist in more than one worker (the leader's sweep plus the worker that
+created or edited the event), so each job first claims its event inside the
+sending transaction: SELECT ... FOR UPDATE SKIP LOCKED on Postgres, a
+conditional UPDATE of feedback_email_sent on SQLite. Whichever worker wins
+sends; the others find nothing to do, so an event's work runs exactly once
+without all of it landing on the leader.
+
+The feedback and sweep jobs run through jobs.py, which records each run's
+outcome, duration and counters in job_runs.
+"""
 from apscheduler.schedulers.background import BackgroundScheduler
+from apscheduler.triggers.date import DateTrigger
+from apscheduler.jobstores.base import JobLookupError
+from datetime import datetime, timezone
 from sqlalchemy.orm import Session
 from database import SessionLocal
-import models, email_utils
-from datetime import datetime, timedelta
+import models, crud, email_outbox, leases, jobs, rollups, resume_worker
 import logging
+import os
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-def check_and_send_feedback_emails():
-    logger.info("Checking for completed events to send feedback emails...")
+# Event times are naive UTC
+_scheduler = BackgroundScheduler(timezone=timezone.utc)
+
+LEASE_NAME = "feedback-scheduler"
+LEASE_SECONDS = int(os.getenv("SCHEDULER_LEASE_SECONDS", 60))
+ROLLUP_INTERVAL_MINUTES = int(os.getenv("ROLLUP_INTERVAL_MINUTES", 15))
+_is_leader = False
+
+def _job_id(event_id: int) -> str:
+    return f"feedback-{event_id}"
+
+def _claim_event(db: Session, event_id: int):
+    """
+    Returns the event if this worker may send its feedback emails, else None.
+    The claim lasts until the caller's commit (or rollback).
+    """
+    due = (
+        models.Event.id == event_id,
+        models.Event.feedback_email_sent == False,
+        models.Event.end_date_time <= datetime.utcnow()
+    )
+    if db.get_bind().dialect.name == "postgresql":
+        # Row lock; a worker running the same job concurrently skips the row
+        return db.query(models.Event).filter(*due).with_for_update(skip_locked=True).first()
+
+    # SQLite has no row locks: flip the flag first. The UPDATE takes the
+    # database write lock, so only one worker sees rowcount 1.
+    claimed = db.query(models.Event).filter(*due).update(
+        {"feedback_email_sent": True}, synchronize_session=False
+    )
+    if not claimed:
+        return None
+    return db.query(models.Event).filter(models.Event.id == event_id).first()
+
+@jobs.job("feedback-request", target_arg=0)
+def send_feedback_for_event(ctx: jobs.RunContext, event_id: int):
+    db: Session = SessionLocal()
+    try:
+        event = _claim_event(db, event_id)
+        if not event:
+            ctx.skip() # Already sent, claimed by another worker, deleted, or moved later
+            return
+
+        # One joined (registration id, email, name) query; rows go to the outbox
+        # and the event is marked sent in the same transaction
+        job = email_outbox.queue_feedback_requests(db, event)
+        db.commit()
+        ctx.rows_scanned = ctx.emails_queued = job.total
+        logger.info(f"Queued {job.total} feedback emails for event: {event.title} (job {job.id})")
+    finally:
+        db.close() # Rolls back (and releases the claim) if anything failed
+
+def schedule_feedback(event_id: int, end_date_time, feedback_email_sent: bool = False):
+    """(Re)schedules an event's feedback job; cancels it if there is nothing to send"""
+    if end_date_time is None or feedback_email_sent:
+        cancel_feedback(event_id)
+        return
+    if end_date_time.tzinfo is None:
+        end_date_time = end_date_time.replace(tzinfo=timezone.utc)
+    _scheduler.add_job(
+        send_feedback_for_event, DateTrigger(run_date=end_date_time),
+        args=[event_id], id=_job_id(event_id), replace_existing=True,
+        misfire_grace_time=None, coalesce=True # Late is fine, skipping is not
+    )
+
+def schedule_event(event: models.Event):
+    schedule_feedback(event.id, event.end_date_time, event.feedback_email_sent)
+
+def cancel_feedback(event_id: int):
+    try:
+        _scheduler.remove_job(_job_id(event_id))
+    except JobLookupError:
+        pass
+
+@jobs.job("feedback-sweep")
+def schedule_pending_feedback(ctx: jobs.RunContext):
+    """Registers jobs for every event still waiting for feedback emails"""
     db: Session = SessionLocal()
     try:
-        now = datetime.utcnow()
-        # Find events that have ended, not active, and feedback email not sent
-        # Or just ended? Requirement: "After end time". 
-        # Let's assume active events that have passed end_date_time.
-        events = db.query(models.Event).filter(
-            models.Event.end_date_time < now,
+        pending = db.query(models.Event.id, models.Event.end_date_time).filter(
             models.Event.feedback_email_sent == False,
             models.Event.end_date_time.isnot(None)
         ).all()
-        
-        for event in events:
-            logger.info(f"Sending feedback emails for event: {event.title}")
-            confirmed_registrations = db.query(models.Registration).filter(
-                models.Registration.event_id == event.id,
-                models.Registration.status == "confirmed"
-            ).all()
-            
-            for reg in confirmed_registrations:
-                if reg.student and reg.student.email:
-                     # Using utility to send email
-                     # We need to ensure email_utils has send_feedback_request_email
-                     try:
-                        email_utils.send_feedback_request_email(
-                            email=reg.student.email,
-                            event_title=event.title,
-                            student_name=reg.student.name,
-                            registration_id=reg.id
-                        )
-                     except Exception as e:
-                         logger.error(f"Failed to send email to {reg.student.email}: {e}")
-            
-            event.feedback_email_sent = True
-            db.commit()
-            
+    finally:
+        db.close()
+    for event_id, end_date_time in pending:
+        schedule_feedback(event_id, end_date_time)
+    ctx.rows_scanned = len(pending)
+    logger.info(f"Scheduled feedback jobs for {len(pending)} events")
+
+def _renew_lease():
+    """Acquires or renews the leader lease; a new leader sweeps straight away"""
+    global _is_leader
+    was_leader = _is_leader
+    try:
+        _is_leader = leases.acquire(LEASE_NAME, LEASE_SECONDS)
     except Exception as e:
-        logger.error(f"Scheduler error: {e}")
+        logger.error(f"Scheduler lease renewal failed: {e}")
+        _is_leader = False
+    if _is_leader and not was_leader:
+        logger.info(f"Worker {leases.WORKER_ID} is now the feedback scheduler leader")
+        schedule_pending_feedback()
+    elif was_leader and not _is_leader:
+        logger.info(f"Worker {leases.WORKER_ID} lost the feedback scheduler lease")
+
+def _sweep():
+    if _is_leader:
+        schedule_pending_feedback()
+
+@jobs.job("refresh-token-cleanup")
+def purge_expired_refresh_tokens(ctx: jobs.RunContext):
+    db: Session = SessionLocal()
+    try:
+        ctx.rows_scanned = crud.delete_expired_refresh_tokens(db, datetime.utcnow())
+        db.commit()
     finally:
         db.close()
 
+def _refresh_rollups():
+    if _is_leader:
+        rollups.refresh()
+
+def _sweep_resume_extraction():
+    if _is_leader:
+        resume_worker.sweep()
+
+def _daily_cleanup():
+    if _is_leader:
+        jobs.purge_old_runs()
+        purge_expired_refresh_tokens()
+
+def is_leader() -> bool:
+    return _is_leader
+
 def start_scheduler():
-    scheduler = BackgroundScheduler()
-    # Run every 5 minutes
-    scheduler.add_job(check_and_send_feedback_emails, 'interval', minutes=5)
-    scheduler.start()
+    _renew_lease()
+    # Renew well inside the TTL so a healthy leader never lapses
+    _scheduler.add_job(_renew_lease, 'interval', seconds=max(LEASE_SECONDS // 3, 1), id="scheduler-lease", replace_existing=True)
+    _scheduler.add_job(_sweep, 'interval', hours=1, id="feedback-sweep", replace_existing=True)
+    _scheduler.add_job(_refresh_rollups, 'interval', minutes=ROLLUP_INTERVAL_MINUTES, id="analytics-rollup", replace_existing=True)
+    _scheduler.add_job(_sweep_resume_extraction, 'interval', seconds=resume_worker.SWEEP_SECONDS, id="resume-extraction-sweep", replace_existing=True)
+    _scheduler.add_job(_daily_cleanup, 'interval', days=1, id="daily-cleanup", replace_existing=True)
+    _scheduler.start()
     logger.info("Feedback Scheduler started.")
+
+def shutdown_scheduler():
+    global _is_leader
+    if _scheduler.running:
+        _scheduler.shutdown(wait=False)
+    if _is_leader:
+        # Hand over now instead of making the next leader wait out the TTL
+        _is_leader = False
+        try:
+            leases.release(LEASE_NAME)
+        except Exception as e:
+            logger.error(f"Scheduler lease release failed: {e}")
+    jobs.shutdown()
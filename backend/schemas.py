@@ -50,6 +50,9 @@ class Resume(ResumeBase):
     file_name_original: str
     uploaded_at: datetime
     is_active: bool
+    size_bytes: Optional[int] = None
+    extraction_status: Optional[str] = None
+    page_count: Optional[int] = None
     class Config:
         orm_mode = True
 
@@ -101,6 +104,10 @@ class Token(BaseModel):
     token_type: str
     role: str
     name: str
+    refresh_token: Optional[str] = None
+
+class RefreshRequest(BaseModel):
+    refresh_token: str
 
 class TokenData(BaseModel):
     email: Optional[str] = None
@@ -193,6 +200,10 @@ class Event(EventBase):
     created_by_id: Optional[int]
     is_frozen: bool
     is_active: bool
+
+    confirmed_count: Optional[int] = 0
+    waitlisted_count: Optional[int] = 0
+    pending_count: Optional[int] = 0
     
     sessions: List[EventSession] = []
 
@@ -225,6 +236,10 @@ class RegistrationDetail(Registration):
     feedback_rating: Optional[int] = None
     feedback_comments: Optional[str] = None
 
+    # Set when the roster was filtered by a search query
+    search_rank: Optional[float] = None
+    search_highlight: Optional[str] = None
+
 # --- Feedback & Rating ---
 
 class FeedbackBase(BaseModel):
@@ -258,3 +273,38 @@ class JudgeRating(JudgeRatingBase):
 
 class GuestInviteRequest(BaseModel):
     emails: List[str]
+
+class NotificationTemplateUpdate(BaseModel):
+    subject_template: str
+    body_template: str
+
+class NotificationTemplate(NotificationTemplateUpdate):
+    kind: str
+    customized: bool = False
+
+class EmailJobProgress(BaseModel):
+    job_id: str
+    event_id: Optional[int] = None
+    kind: str
+    total: int
+    pending: int
+    sending: int
+    sent: int
+    dead: int
+    done: bool
+    created_at: datetime
+
+class JobRun(BaseModel):
+    id: int
+    job_name: str
+    target: Optional[str] = None
+    worker_id: Optional[str] = None
+    status: str
+    rows_scanned: int
+    emails_queued: int
+    duration_ms: Optional[int] = None
+    error: Optional[str] = None
+    started_at: datetime
+    finished_at: Optional[datetime] = None
+    class Config:
+        orm_mode = True
@@ -0,0 +1,221 @@
+"""
+Full-text candidate search over models.StudentSearchDocument.
+
+Postgres: GIN expression indexes on weighted tsvectors, queried with to_tsquery.
+SQLite:   an external-content FTS5 table kept in sync by triggers, queried with MATCH.
+
+Queries accept plain terms (prefix matched, all must match) and "quoted phrases".
+"""
+import html
+import re
+from sqlalchemy import DDL, BigInteger, Float, Index, cast, event, func, literal_column, select, table, column, text
+from sqlalchemy.orm import Session
+import models
+
+Document = models.StudentSearchDocument
+FTS_TABLE = "student_search_fts"
+HIGHLIGHT_START, HIGHLIGHT_END = "<mark>", "</mark>"
+# The database marks matches with these control characters (STX/ETX, ASCII so
+# any server encoding takes them); the snippet is HTML-escaped before they
+# become <mark> tags, since names and resume text are user supplied
+_MATCH_START, _MATCH_END = "\x02", "\x03"
+
+# --- Postgres: weighted document vector + GIN indexes ---
+
+# Rendered as SQL literals (not bind parameters) so query expressions match the
+# index expressions exactly and the planner can use the GIN indexes.
+def _pg_vector(col, config):
+    return func.to_tsvector(text(f"'{config}'::regconfig"), func.coalesce(col, text("''")))
+
+def _pg_document_vector():
+    def weighted(col, weight):
+        return func.setweight(_pg_vector(col, "english"), text(f"'{weight}'::\"char\""))
+    return (
+        weighted(Document.name, "A")
+        .op("||")(weighted(Document.skills, "A"))
+        .op("||")(weighted(Document.major, "B"))
+        .op("||")(weighted(Document.resume_text, "C"))
+    )
+
+def _pg_skills_vector():
+    return _pg_vector(Document.skills, "simple")
+
+Index("ix_student_search_documents_fts", _pg_document_vector(), postgresql_using="gin").ddl_if(dialect="postgresql")
+Index("ix_student_search_documents_skills_fts", _pg_skills_vector(), postgresql_using="gin").ddl_if(dialect="postgresql")
+
+# --- SQLite: FTS5 external-content table + sync triggers ---
+
+_COLUMNS = "name, major, skills, resume_text"
+_NEW = "new.user_id, new.name, new.major, new.skills, new.resume_text"
+_OLD = "old.user_id, old.name, old.major, old.skills, old.resume_text"
+
+SQLITE_DDL = [
+    f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5("
+    f"{_COLUMNS}, content='student_search_documents', content_rowid='user_id', tokenize='porter unicode61')",
+    f"CREATE TRIGGER IF NOT EXISTS student_search_ai AFTER INSERT ON student_search_documents BEGIN "
+    f"INSERT INTO {FTS_TABLE}(rowid, {_COLUMNS}) VALUES ({_NEW}); END",
+    f"CREATE TRIGGER IF NOT EXISTS student_search_ad AFTER DELETE ON student_search_documents BEGIN "
+    f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, {_COLUMNS}) VALUES ('delete', {_OLD}); END",
+    f"CREATE TRIGGER IF NOT EXISTS student_search_au AFTER UPDATE ON student_search_documents BEGIN "
+    f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, {_COLUMNS}) VALUES ('delete', {_OLD}); "
+    f"INSERT INTO {FTS_TABLE}(rowid, {_COLUMNS}) VALUES ({_NEW}); END",
+]
+
+for statement in SQLITE_DDL:
+    event.listen(Document.__table__, "after_create", DDL(statement).execute_if(dialect="sqlite"))
+
+def ensure_search_schema(engine):
+    """Creates the search table and dialect-specific indexes on existing databases"""
+    Document.__table__.create(bind=engine, checkfirst=True)
+    with engine.begin() as conn:
+        if engine.dialect.name == "sqlite":
+            for statement in SQLITE_DDL:
+                conn.execute(text(statement))
+        else:
+            for index in Document.__table__.indexes:
+                index.create(bind=conn, checkfirst=True)
+
+# --- Keeping documents in sync ---
+
+def refresh_student(db: Session, user_id: int):
+    """
+    Rebuilds one student's search document from their profile, skills and
+    active resume. Runs inside the caller's transaction; the caller commits.
+    """
+    db.flush() # SessionLocal doesn't autoflush; make pending profile/skill/resume rows visible
+
+    profile = db.query(models.User.name, models.User.major).filter(models.User.id == user_id).first()
+    if not profile:
+        return None
+
+    skills = [name for (name,) in db.query(models.StudentProfileSkill.skill_name).filter(
+        models.StudentProfileSkill.user_id == user_id
+    ).order_by(models.StudentProfileSkill.id).all() if name]
+
+    resume_text = db.query(models.Resume.content_text).filter(
+        models.Resume.user_id == user_id,
+        models.Resume.is_active == True
+    ).order_by(models.Resume.uploaded_at.desc()).limit(1).scalar()
+
+    doc = db.query(Document).filter(Document.user_id == user_id).first()
+    if not doc:
+        doc = Document(user_id=user_id)
+        db.add(doc)
+    doc.name = profile.name
+    doc.major = profile.major
+    doc.skills = " ".join(skills)
+    doc.resume_text = resume_text
+    return doc
+
+# --- Query parsing ---
+
+_TOKEN = re.compile(r'"([^"]+)"|(\S+)')
+_WORD = re.compile(r"\w+")
+
+def parse_query(q: str):
+    """'python "machine learning"' -> [('python',), ('machine', 'learning')]"""
+    parts = []
+    for phrase, term in _TOKEN.findall(q or ""):
+        words = tuple(w.lower() for w in _WORD.findall(phrase or term))
+        if words:
+            parts.append(words)
+    return parts
+
+def _fts5_match(parts, column_name=None):
+    clauses = []
+    for words in parts:
+        if len(words) == 1:
+            clauses.append(f'"{words[0]}"*')
+        else:
+            clauses.append('"' + " ".join(words) + '"')
+    expr = " AND ".join(clauses)
+    return f"{column_name} : ({expr})" if column_name else expr
+
+def _pg_tsquery(parts):
+    clauses = []
+    for words in parts:
+        if len(words) == 1:
+            clauses.append(f"{words[0]}:*")
+        else:
+            clauses.append("(" + " <-> ".join(words) + ")")
+    return " & ".join(clauses)
+
+# --- Search ---
+
+# Ranks are floats (float4 from ts_rank); cursors page on this many decimal
+# places, as an integer, so the keyset comparison is exact
+RANK_KEY_SCALE = 1_000_000
+
+def _rank_key(rank):
+    return cast(func.round(cast(rank, Float) * RANK_KEY_SCALE), BigInteger)
+
+def ranked_matches(db: Session, q: str = None, skill: str = None):
+    """
+    Subquery of (user_id, rank, rank_key) for students matching the free-text
+    query `q` and/or the skill filter `skill`. Higher rank is a better match;
+    rank_key is the rank at fixed precision, for ordering and cursors.
+    Returns None when neither yields a searchable term.
+    """
+    text_parts, skill_parts = parse_query(q), parse_query(skill)
+    if not text_parts and not skill_parts:
+        return None
+
+    if db.get_bind().dialect.name == "sqlite":
+        fts = table(FTS_TABLE, column("rowid"))
+        match = " AND ".join(
+            f"({m})" for m in (
+                _fts5_match(text_parts) if text_parts else None,
+                _fts5_match(skill_parts, "skills") if skill_parts else None,
+            ) if m
+        )
+        # bm25 is lower-is-better; weights follow the column order name, major, skills, resume_text
+        rank = -func.bm25(literal_column(FTS_TABLE), 10.0, 2.0, 10.0, 1.0)
+        return select(fts.c.rowid.label("user_id"), rank.label("rank"), _rank_key(rank).label("rank_key")).select_from(fts).where(
+            literal_column(FTS_TABLE).op("MATCH")(match)
+        ).subquery("search_matches")
+
+    conditions = []
+    rank = None
+    if skill_parts:
+        skill_query = func.to_tsquery(text("'simple'::regconfig"), _pg_tsquery(skill_parts))
+        conditions.append(_pg_skills_vector().op("@@")(skill_query))
+        rank = func.ts_rank(_pg_skills_vector(), skill_query)
+    if text_parts:
+        text_query = func.to_tsquery(text("'english'::regconfig"), _pg_tsquery(text_parts))
+        conditions.append(_pg_document_vector().op("@@")(text_query))
+        rank = func.ts_rank(_pg_document_vector(), text_query)
+    return select(
+        Document.user_id.label("user_id"), rank.label("rank"), _rank_key(rank).label("rank_key")
+    ).where(*conditions).subquery("search_matches")
+
+def _snippet_html(snippet):
+    if snippet is None:
+        return None
+    return html.escape(snippet).replace(_MATCH_START, HIGHLIGHT_START).replace(_MATCH_END, HIGHLIGHT_END)
+
+def highlights(db: Session, user_ids, q: str):
+    """{user_id: escaped HTML snippet} for the given page of results, matches wrapped in <mark>"""
+    parts = parse_query(q)
+    if not parts or not user_ids:
+        return {}
+
+    if db.get_bind().dialect.name == "sqlite":
+        rows = db.execute(
+            text(
+                f"SELECT rowid, snippet({FTS_TABLE}, -1, :start, :end, '…', 16) FROM {FTS_TABLE} "
+                f"WHERE {FTS_TABLE} MATCH :match AND rowid IN ({', '.join(str(int(u)) for u in user_ids)})"
+            ),
+            {"start": _MATCH_START, "end": _MATCH_END, "match": _fts5_match(parts)}
+        ).all()
+        return {user_id: _snippet_html(snippet) for user_id, snippet in rows}
+
+    options = f"StartSel={_MATCH_START}, StopSel={_MATCH_END}, MaxFragments=2, MaxWords=20, MinWords=5"
+    document = func.concat_ws(" ", Document.name, Document.skills, Document.major, Document.resume_text)
+    rows = db.query(
+        Document.user_id,
+        func.ts_headline(
+            text("'english'::regconfig"), document,
+            func.to_tsquery(text("'english'::regconfig"), _pg_tsquery(parts)), options
+        )
+    ).filter(Document.user_id.in_(user_ids)).all()
+    return {user_id: _snippet_html(snippet) for user_id, snippet in rows}
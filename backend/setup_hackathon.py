@@ -7,7 +7,7 @@ from fpdf import FPDF
 import database, models, schemas
 
 
-from pypdf import PdfReader
+from resume_worker import extract_pdf_text
 
 # Initialize Password Context
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
@@ -52,10 +52,7 @@ def generate_rich_pdf_resume(filename, user_name, role_title, skills, experience
 
 def extract_text_from_pdf(filepath):
     try:
-        reader = PdfReader(filepath)
-        text = ""
-        for page in reader.pages:
-            text += page.extract_text()
+        text, _ = extract_pdf_text(filepath)
         return text
     except Exception as e:
         print(f"Error extracting text from {filepath}: {e}")
@@ -135,13 +132,15 @@ def setup_scenario():
             file_name_original="bd_backend_resume.pdf",
             uploaded_at=datetime.datetime.now(),
             is_active=True,
-            content_text=bd_text
+            content_text=bd_text,
+            extraction_status="done"
         )
         db.add(db_resume_bd)
         db.commit()
     else:
          print("BD already has an active resume. Updating content...")
          existing_resume_bd.content_text = bd_text
+         existing_resume_bd.extraction_status = "done"
          db.commit()
 
     # Gomz - Front End Developer
@@ -162,13 +161,15 @@ def setup_scenario():
             file_name_original="gomz_frontend_resume.pdf",
             uploaded_at=datetime.datetime.now(),
             is_active=True,
-            content_text=gomz_text
+            content_text=gomz_text,
+            extraction_status="done"
         )
         db.add(db_resume_gomz)
         db.commit()
     else:
          print("Gomz already has an active resume. Updating content...")
          existing_resume_gomz.content_text = gomz_text
+         existing_resume_gomz.extraction_status = "done"
          db.commit()
 
     # 4. Register Users for Event
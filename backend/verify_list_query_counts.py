@@ -0,0 +1,111 @@
+"""
+Counts the SQL statements each list endpoint runs and checks the count stays
+the same as the lists grow, i.e. that serializing nested objects (students,
+their skills and resumes, event sessions) doesn't fall back to one lazy load
+per row. Runs against whatever DATABASE_URL points to, e.g.
+
+    DATABASE_URL=sqlite:///./lists.db python verify_list_query_counts.py
+"""
+import datetime
+import uuid
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+from database import SessionLocal, engine
+from routers import events, judge, recruiter, admin, registrations
+import models, auth, pagination, search_index
+
+SIZES = (5, 50)
+
+statements = 0
+
+@event.listens_for(engine, "before_cursor_execute")
+def _count(conn, cursor, statement, parameters, context, executemany):
+    global statements
+    statements += 1
+
+def setup():
+    """An admin, plus an event whose roster the batches below fill"""
+    models.Base.metadata.create_all(bind=engine)
+    search_index.ensure_search_schema(engine)
+    db = SessionLocal()
+    try:
+        admin_user = models.User(email=f"{uuid.uuid4().hex[:8]}@example.com", name="List Admin", role="admin", is_active=True)
+        event_row = models.Event(title="List Test Event", description="", date_time=datetime.datetime.utcnow())
+        db.add_all([admin_user, event_row])
+        db.commit()
+        return admin_user.id, admin_user.email, event_row.id
+    finally:
+        db.close()
+
+def add_rows(admin_id: int, event_id: int, count: int):
+    """`count` registered students with skills and a resume, and `count` events with sessions the admin registered for"""
+    db = SessionLocal()
+    try:
+        now = datetime.datetime.utcnow()
+        for i in range(count):
+            tag = uuid.uuid4().hex[:8]
+            student = models.User(email=f"{tag}@example.com", name=f"Student {tag}", role="student", is_active=True)
+            student.skills = [models.StudentProfileSkill(skill_name="python"), models.StudentProfileSkill(skill_name="sql")]
+            student.resumes = [models.Resume(file_path=f"{tag}.pdf", file_name_original=f"{tag}.pdf", is_active=True)]
+            db.add(student)
+            db.add(models.Registration(student=student, event_id=event_id, status="confirmed"))
+            db.flush()
+            search_index.refresh_student(db, student.id)
+
+            other = models.Event(title=f"List Test {tag}", description="", date_time=now, sponsor_company="Lists Inc")
+            other.sessions = [models.EventSession(title="Session", start_time=now, end_time=now)]
+            db.add(other)
+            db.add(models.Registration(user_id=admin_id, event=other, status="confirmed"))
+        db.commit()
+    finally:
+        db.close()
+
+def count_statements(client, url, headers):
+    global statements
+    client.get(url, headers=headers)  # warm the principal cache
+    statements = 0
+    response = client.get(url, headers=headers)
+    assert response.status_code == 200, response.text
+    return statements, len(response.json())
+
+def main():
+    admin_id, email, event_id = setup()
+    app = FastAPI()
+    for module in (events, judge, recruiter, admin, registrations):
+        app.include_router(module.router)
+    client = TestClient(app)
+    token = auth.create_access_token({"sub": email, "uid": admin_id, "role": "admin"})
+    headers = {"Authorization": f"Bearer {token}"}
+
+    limit = f"limit={pagination.MAX_PAGE_SIZE}"
+    urls = [
+        f"/events/?{limit}",
+        f"/judge/events?{limit}",
+        "/recruiter/events",
+        f"/events/{event_id}/registrations?{limit}",
+        f"/judge/events/{event_id}/roster?{limit}",
+        f"/judge/events/{event_id}/roster?skill=python&{limit}",
+        f"/recruiter/events/{event_id}/students?{limit}",
+        f"/recruiter/events/{event_id}/students?skill=python&{limit}",
+        f"/admin/resumes?{limit}",
+        "/registrations/me",
+    ]
+    counts = {url: [] for url in urls}
+    added = 0
+    for size in SIZES:
+        add_rows(admin_id, event_id, size - added)
+        added = size
+        for url in urls:
+            counts[url].append(count_statements(client, url, headers))
+
+    failed = []
+    for url, runs in counts.items():
+        print(f"GET {url}: " + ", ".join(f"{n} statements for {rows} rows" for n, rows in runs))
+        if len({n for n, _ in runs}) != 1 or runs[0][1] == runs[-1][1]:
+            failed.append(url)
+    assert not failed, f"statement count grows with the list size: {failed}"
+    print("PASS")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,51 @@
+"""
+Checks that a registration burst only costs one LLM generation per event.
+Runs against the local stub model (LLM_PROVIDER=stub), no API keys needed.
+"""
+import os
+os.environ["LLM_PROVIDER"] = "stub"
+os.environ.setdefault("LLM_TIMEOUT_SECONDS", "0.5")
+
+import asyncio
+import time
+import llm_content
+
+REGISTRATIONS = 1000
+EVENTS = 3
+
+async def burst():
+    names = [f"Student {i}" for i in range(REGISTRATIONS)]
+    start = time.perf_counter()
+    bodies = await asyncio.gather(*(
+        llm_content.registration_body(i % EVENTS + 1, f"Event {i % EVENTS + 1}", name)
+        for i, name in enumerate(names)
+    ))
+    elapsed = time.perf_counter() - start
+
+    calls = llm_content.model.calls
+    personalized = sum(1 for name, body in zip(names, bodies) if body and name in body)
+    print(f"{REGISTRATIONS} registrations across {EVENTS} events in {elapsed:.2f}s")
+    print(f"LLM calls: {calls} (expected {EVENTS * llm_content.NAME_BUCKETS}), personalized bodies: {personalized}")
+    assert calls == EVENTS * llm_content.NAME_BUCKETS
+    assert personalized == REGISTRATIONS
+
+    # Prefetched on create: the first registration is a cache hit
+    llm_content.prefetch(99, "Prefetched Event")
+    await asyncio.sleep(llm_content.model.delay * 3)
+    start = time.perf_counter()
+    body = await llm_content.registration_body(99, "Prefetched Event", "Ada <script>")
+    print(f"Prefetched body served in {(time.perf_counter() - start) * 1000:.2f}ms, name escaped: {'&lt;script&gt;' in body}")
+    assert "&lt;script&gt;" in body
+
+    # A model slower than the timeout falls back immediately instead of waiting
+    llm_content.model.delay = llm_content.TIMEOUT_SECONDS * 2
+    start = time.perf_counter()
+    body = await llm_content.registration_body(100, "Slow Event", "Grace")
+    waited = time.perf_counter() - start
+    print(f"Slow model: fell back after {waited:.2f}s (timeout {llm_content.TIMEOUT_SECONDS}s)")
+    assert body is None and waited < llm_content.TIMEOUT_SECONDS + 1
+    print("PASS")
+
+if __name__ == "__main__":
+    asyncio.run(burst())
+    os._exit(0) # don't wait for the deliberately slow stub generation
@@ -0,0 +1,76 @@
+"""
+Counts SQL statements per authenticated request with and without the
+principal cache, and checks that a role change is seen immediately.
+Runs against whatever DATABASE_URL points to, e.g.
+
+    DATABASE_URL=sqlite:///./principal.db python verify_principal_cache.py
+"""
+import uuid
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+from database import SessionLocal, engine
+from routers import registrations, recruiter
+import models, auth
+
+REQUESTS = 50
+
+statements = 0
+
+@event.listens_for(engine, "before_cursor_execute")
+def _count(conn, cursor, statement, parameters, context, executemany):
+    global statements
+    statements += 1
+
+def setup():
+    models.Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    try:
+        user = models.User(email=f"{uuid.uuid4().hex[:8]}@principal.test", name="Principal Test", role="recruiter", is_active=True)
+        db.add(user)
+        db.commit()
+        return user.id, user.email
+    finally:
+        db.close()
+
+def statements_per_request(client, url, headers, cached):
+    global statements
+    total = 0
+    for _ in range(REQUESTS):
+        if not cached:
+            auth._user_cache.clear()
+        statements = 0
+        response = client.get(url, headers=headers)
+        assert response.status_code == 200, response.text
+        total += statements
+    return total / REQUESTS
+
+def main():
+    user_id, email = setup()
+    app = FastAPI()
+    app.include_router(registrations.router)
+    app.include_router(recruiter.router)
+    client = TestClient(app)
+    token = auth.create_access_token({"sub": email, "uid": user_id, "role": "recruiter"})
+    headers = {"Authorization": f"Bearer {token}"}
+
+    url = "/registrations/me"
+    uncached = statements_per_request(client, url, headers, cached=False)
+    cached = statements_per_request(client, url, headers, cached=True)
+    print(f"GET {url}: {uncached:.2f} statements/request without the cache, {cached:.2f} with it")
+    assert cached == uncached - 1
+
+    # A committed role change drops the cached principal straight away
+    assert client.get("/recruiter/events", headers=headers).status_code != 403
+    db = SessionLocal()
+    try:
+        db.query(models.User).filter(models.User.id == user_id).first().role = "student"
+        db.commit()
+    finally:
+        db.close()
+    status = client.get("/recruiter/events", headers=headers).status_code
+    print(f"After demotion to student: GET /recruiter/events -> {status}")
+    assert status == 403
+
+if __name__ == "__main__":
+    main()
@@ -61,11 +61,7 @@ export default function AdminDashboard() {
 
     const fetchEvents = async () => {
         try {
-            const res = await api.get("/events/");
-            if (res.ok) {
-                const data = await res.json();
-                setEvents(data);
-            }
+            setEvents(await api.getAll("/events/"));
         } catch (err) {
             console.error("Failed to load events", err);
         }
@@ -161,15 +157,10 @@ export default function AdminDashboard() {
 
     const handleViewAnalytics = async (eventId: number) => {
         try {
-            const res = await api.get(`/events/${eventId}/registrations`);
-            if (res.ok) {
-                const data = await res.json();
-                setRegistrations(data);
-                setSelectedEventId(eventId);
-                setShowAnalyticsModal(true);
-            } else {
-                alert("Failed to fetch analytics data");
-            }
+            const data = await api.getAll(`/events/${eventId}/registrations`);
+            setRegistrations(data);
+            setSelectedEventId(eventId);
+            setShowAnalyticsModal(true);
         } catch (err) {
             console.error(err);
             alert("Error fetching analytics");
@@ -178,15 +169,10 @@ export default function AdminDashboard() {
 
     const handleViewRegistrations = async (eventId: number) => {
         try {
-            const res = await api.get(`/events/${eventId}/registrations`);
-            if (res.ok) {
-                const data = await res.json();
-                setRegistrations(data);
-                setSelectedEventId(eventId);
-                setShowRegistrationsModal(true);
-            } else {
-                alert("Failed to fetch registrations");
-            }
+            const data = await api.getAll(`/events/${eventId}/registrations`);
+            setRegistrations(data);
+            setSelectedEventId(eventId);
+            setShowRegistrationsModal(true);
         } catch (err) {
             console.error(err);
             alert("Error fetching registrations");
@@ -195,39 +181,34 @@ export default function AdminDashboard() {
 
     const handleDownloadRegistrations = async (eventId: number) => {
         try {
-            const res = await api.get(`/events/${eventId}/registrations`);
-            if (res.ok) {
-                const data: Registration[] = await res.json();
-                if (data.length === 0) {
-                    alert("No registrations to download.");
-                    return;
-                }
-
-                // Convert to CSV
-                const headers = ["ID", "Name", "Email", "Status"];
-                const rows = data.map(r => [
-                    r.id,
-                    r.student?.name || "Unknown",
-                    r.student?.email || "Unknown",
-                    r.status
-                ]);
-
-                const csvContent = [
-                    headers.join(","),
-                    ...rows.map(row => row.join(","))
-                ].join("\n");
-
-                const blob = new Blob([csvContent], { type: "text/csv" });
-                const url = window.URL.createObjectURL(blob);
-                const a = document.createElement("a");
-                a.href = url;
-                a.download = `registrations_event_${eventId}.csv`;
-                document.body.appendChild(a);
-                a.click();
-                a.remove();
-            } else {
-                alert("Failed to fetch registrations");
+            const data: Registration[] = await api.getAll(`/events/${eventId}/registrations`);
+            if (data.length === 0) {
+                alert("No registrations to download.");
+                return;
             }
+
+            // Convert to CSV
+            const headers = ["ID", "Name", "Email", "Status"];
+            const rows = data.map(r => [
+                r.id,
+                r.student?.name || "Unknown",
+                r.student?.email || "Unknown",
+                r.status
+            ]);
+
+            const csvContent = [
+                headers.join(","),
+                ...rows.map(row => row.join(","))
+            ].join("\n");
+
+            const blob = new Blob([csvContent], { type: "text/csv" });
+            const url = window.URL.createObjectURL(blob);
+            const a = document.createElement("a");
+            a.href = url;
+            a.download = `registrations_event_${eventId}.csv`;
+            document.body.appendChild(a);
+            a.click();
+            a.remove();
         } catch (err) {
             console.error(err);
             alert("Error downloading registrations");
@@ -35,11 +35,8 @@ export default function ResumeListModal({ isOpen, onClose }: ResumeListModalProp
     const fetchResumes = async () => {
         setLoading(true);
         try {
-            const res = await api.get('/admin/resumes');
-            if (res.ok) {
-                const data = await res.json();
-                setResumes(data);
-            }
+            const data = await api.getAll('/admin/resumes');
+            setResumes(data);
         } catch (e) {
             console.error("Failed to fetch resumes", e);
         } finally {
@@ -29,13 +29,8 @@ export default function UserManagementModal({ isOpen, onClose }: UserManagementM
     const fetchUsers = async () => {
         setLoading(true);
         try {
-            const res = await api.get('/admin/users');
-            if (res.ok) {
-                const data = await res.json();
-                setUsers(data);
-            } else {
-                alert("Failed to load users");
-            }
+            const data = await api.getAll('/admin/users');
+            setUsers(data);
         } catch (e) {
             console.error(e);
         } finally {
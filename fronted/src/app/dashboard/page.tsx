@@ -2,7 +2,7 @@
 
 import React, { useEffect, useState } from "react";
 import { useRouter } from "next/navigation";
-import { api } from "../../utils/api";
+import { api, storeTokens, logout } from "../../utils/api";
 import { DndContext, closestCenter, KeyboardSensor, PointerSensor, useSensor, useSensors } from '@dnd-kit/core';
 import { arrayMove, SortableContext, sortableKeyboardCoordinates, rectSortingStrategy } from '@dnd-kit/sortable';
 import { SortableEventCard } from './SortableEventCard';
@@ -169,9 +169,7 @@ export default function UnifiedDashboard() {
 
             if (res.ok) {
                 const data = await res.json();
-                localStorage.setItem("token", data.access_token);
-                localStorage.setItem("role", data.role);
-                localStorage.setItem("name", data.name);
+                storeTokens(data);
 
                 setRole(data.role);
                 setName(data.name);
@@ -201,12 +199,9 @@ export default function UnifiedDashboard() {
 
     const fetchEvents = async () => {
         try {
-            const res = await api.get("/events/");
-            if (res.ok) {
-                const data = await res.json();
-                setEvents(data);
-                setFilteredEvents(data);
-            }
+            const data = await api.getAll("/events/");
+            setEvents(data);
+            setFilteredEvents(data);
         } catch (err) {
             console.error(err);
         }
@@ -321,8 +316,8 @@ export default function UnifiedDashboard() {
                                 <>
                                     <span className="text-gray-400 text-sm hidden sm:block">Welcome, <span className="text-white font-semibold">{name}</span></span>
                                     <button
-                                        onClick={() => {
-                                            localStorage.clear();
+                                        onClick={async () => {
+                                            await logout();
                                             setRole(null);
                                             setName(null);
                                             router.push("/dashboard");
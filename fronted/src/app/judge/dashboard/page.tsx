@@ -13,8 +13,11 @@ export default function JudgeDashboard() {
     }, []);
 
     const fetchEvents = async () => {
-        const res = await api.get("/judge/events");
-        if (res.ok) setEvents(await res.json());
+        try {
+            setEvents(await api.getAll("/judge/events"));
+        } catch (err) {
+            console.error("Failed to load events", err);
+        }
     };
 
     return (
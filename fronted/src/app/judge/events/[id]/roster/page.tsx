@@ -19,8 +19,11 @@ export default function EventRoster() {
         let url = `/judge/events/${eventId}/roster`;
         if (skill) url += `?skill=${skill}`;
 
-        const res = await api.get(url);
-        if (res.ok) setRegistrations(await res.json());
+        try {
+            setRegistrations(await api.getAll(url));
+        } catch (err) {
+            console.error(err);
+        }
     };
 
     const handleSearch = (e: React.KeyboardEvent) => {
@@ -1,6 +1,6 @@
 "use client";
 import React, { useState, Suspense } from "react";
-import { api } from "../../utils/api";
+import { api, storeTokens } from "../../utils/api";
 import { useRouter, useSearchParams } from "next/navigation";
 
 function LoginForm() {
@@ -83,9 +83,7 @@ function LoginForm() {
 
             if (res.ok) {
                 const data = await res.json();
-                localStorage.setItem("token", data.access_token);
-                localStorage.setItem("role", data.role);
-                localStorage.setItem("name", data.name);
+                storeTokens(data);
 
                 const role = data.role;
 
@@ -27,8 +27,11 @@ export default function StudentDashboard() {
     }, []);
 
     const fetchEvents = async () => {
-        const res = await api.get("/events/");
-        if (res.ok) setEvents(await res.json());
+        try {
+            setEvents(await api.getAll("/events/"));
+        } catch (err) {
+            console.error("Failed to load events", err);
+        }
     };
 
     const fetchMyRegs = async () => {
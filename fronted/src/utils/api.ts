@@ -1,5 +1,86 @@
 const API_URL = process.env.NEXT_PUBLIC_API_URL || "http://localhost:8000";
 
+// Tokens returned by /auth/login and /auth/refresh
+export function storeTokens(data: any) {
+    localStorage.setItem("token", data.access_token);
+    if (data.refresh_token) {
+        localStorage.setItem("refresh_token", data.refresh_token);
+    }
+    localStorage.setItem("role", data.role);
+    localStorage.setItem("name", data.name);
+}
+
+// One refresh at a time: parallel 401s share it, since each refresh token
+// is single-use and replaying it logs the session out
+let refreshInFlight: Promise<boolean> | null = null;
+
+// Tabs share the tokens through localStorage, so a refresh also takes a lock
+// across tabs. A tab that waited for it finds the refresh token already
+// replaced by the tab that held it and just uses the new tokens.
+const REFRESH_LOCK = 'auth-refresh';
+
+async function exchangeRefreshToken(refreshToken: string): Promise<boolean> {
+    if (localStorage.getItem('refresh_token') !== refreshToken) {
+        return localStorage.getItem('refresh_token') !== null;
+    }
+    const res = await fetch(`${API_URL}/auth/refresh`, {
+        method: 'POST',
+        headers: { 'Content-Type': 'application/json' },
+        body: JSON.stringify({ refresh_token: refreshToken }),
+    });
+    if (!res.ok) {
+        // Another tab (without the lock, e.g. an older browser) may have won the race
+        if (localStorage.getItem('refresh_token') !== refreshToken) {
+            return localStorage.getItem('refresh_token') !== null;
+        }
+        localStorage.removeItem('refresh_token');
+        return false;
+    }
+    storeTokens(await res.json());
+    return true;
+}
+
+function refreshAccessToken(): Promise<boolean> {
+    if (typeof window === 'undefined') {
+        return Promise.resolve(false);
+    }
+    const refreshToken = localStorage.getItem('refresh_token');
+    if (!refreshToken) {
+        return Promise.resolve(false);
+    }
+    if (!refreshInFlight) {
+        refreshInFlight = (async () => {
+            try {
+                if (navigator.locks) {
+                    return await navigator.locks.request(REFRESH_LOCK, () => exchangeRefreshToken(refreshToken));
+                }
+                return await exchangeRefreshToken(refreshToken);
+            } catch {
+                return false;
+            } finally {
+                refreshInFlight = null;
+            }
+        })();
+    }
+    return refreshInFlight;
+}
+
+export async function logout() {
+    const refreshToken = localStorage.getItem('refresh_token');
+    if (refreshToken) {
+        try {
+            await fetch(`${API_URL}/auth/logout`, {
+                method: 'POST',
+                headers: { 'Content-Type': 'application/json' },
+                body: JSON.stringify({ refresh_token: refreshToken }),
+            });
+        } catch {
+            // Logging out locally still works; the token simply expires
+        }
+    }
+    localStorage.clear();
+}
+
 async function fetchWithAuth(url: string, options: RequestInit = {}) {
     // In a real app we'd attach the token from cookies/storage if needed manually,
     // but if we rely on HttpOnly cookies, the browser handles it automatically for same-origin (via proxy) or CORS with credentials.
@@ -30,21 +111,30 @@ async function fetchWithAuth(url: string, options: RequestInit = {}) {
     // I will use LocalStorage for now as it's more robust for a "working solution" without proxy config mess.
     // I will add a comment explaining this deviation or fit it.
 
-    const token = typeof window !== 'undefined' ? localStorage.getItem('token') : null;
+    const send = () => {
+        const token = typeof window !== 'undefined' ? localStorage.getItem('token') : null;
 
-    const headers = {
-        'Content-Type': 'application/json',
-        ...options.headers,
-    } as any;
+        const headers = {
+            'Content-Type': 'application/json',
+            ...options.headers,
+        } as any;
 
-    if (token) {
-        headers['Authorization'] = `Bearer ${token}`;
-    }
+        if (token) {
+            headers['Authorization'] = `Bearer ${token}`;
+        }
 
-    const res = await fetch(`${API_URL}${url}`, {
-        ...options,
-        headers,
-    });
+        return fetch(`${API_URL}${url}`, {
+            ...options,
+            headers,
+        });
+    };
+
+    let res = await send();
+
+    // Access tokens are short-lived: renew once with the refresh token and retry
+    if (res.status === 401 && await refreshAccessToken()) {
+        res = await send();
+    }
 
     if (res.status === 401) {
         // Optional: Clear token if invalid, but let component decide to redirect
@@ -57,8 +147,27 @@ async function fetchWithAuth(url: string, options: RequestInit = {}) {
     return res;
 }
 
+// Paginated list endpoints return the next page's cursor in this header
+const NEXT_CURSOR_HEADER = 'X-Next-Cursor';
+
+async function fetchAllPages(url: string) {
+    const items: any[] = [];
+    let cursor: string | null = null;
+    do {
+        const sep = url.includes('?') ? '&' : '?';
+        const res = await fetchWithAuth(cursor ? `${url}${sep}cursor=${encodeURIComponent(cursor)}` : url);
+        if (!res.ok) {
+            throw new Error(`Request to ${url} failed with status ${res.status}`);
+        }
+        items.push(...(await res.json()));
+        cursor = res.headers.get(NEXT_CURSOR_HEADER);
+    } while (cursor);
+    return items;
+}
+
 export const api = {
     get: (url: string) => fetchWithAuth(url),
+    getAll: (url: string) => fetchAllPages(url),
     post: (url: string, body: any) => fetchWithAuth(url, { method: 'POST', body: JSON.stringify(body) }),
     put: (url: string, body: any) => fetchWithAuth(url, { method: 'PUT', body: JSON.stringify(body) }),
     delete: (url: string) => fetchWithAuth(url, { method: 'DELETE' }),